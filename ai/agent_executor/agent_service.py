@@ -1,30 +1,52 @@
 import os
+import re
+import time
 import asyncio
-from typing import List, Dict, Any, Optional
+from collections import deque
+from functools import cached_property
+from itertools import islice
+from typing import List, Dict, Any, Optional, FrozenSet, Tuple, Deque
 from dataclasses import dataclass, field
-from datetime import datetime
 from langchain.agents import initialize_agent, AgentType
-from langchain_openai import ChatOpenAI
 from langchain.tools import BaseTool
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, get_buffer_string
 import logging
+from tools.tool_registry import DedupTool, ToolCallDeduplicator, ToolRegistry
+from llm_engine.llm_service import make_http_async_client
 
 logger = logging.getLogger(__name__)
 
+# Intent keywords, checked in priority order (practice before lesson); each
+# group compiles to one alternation so a query is scanned once per intent
+_INTENT_PATTERNS = [
+    ("practice", re.compile("latihan|soal")),
+    ("lesson", re.compile("materi|pelajaran|ajar")),
+]
+
+class AgentError(Exception):
+    """Agent failure carrying the HTTP status the API should answer with."""
+    status_code = 500
+
+
+class ToolError(AgentError):
+    """Invalid tool selection in an agent request."""
+    status_code = 400
+
+
 # ---------------- Skill & Memory Data Classes ----------------
-@dataclass
+@dataclass(slots=True)
 class SkillRecord:
     topic: str
     mastery: float = 0.0  # 0–100
     practice_count: int = 0
-    last_updated: float = field(default_factory=lambda: datetime.utcnow().timestamp())
+    last_updated: float = field(default_factory=time.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationMemoryEntry:
     role: str
     text: str
-    timestamp: float = field(default_factory=lambda: datetime.utcnow().timestamp())
+    timestamp: float = field(default_factory=time.time)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
@@ -39,126 +61,237 @@ class AgentService:
     """
 
     def __init__(self):
-        self.llm = ChatGroq(
-            temperature=0,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model_name="llama3-8b-8192"
-        )
         self.agents = {}
+        self._agent_cache: Dict[Tuple[AgentType, FrozenSet[str]], Any] = {}
+        self._tool_dedup = ToolCallDeduplicator()
+        self._wrapped_tools: Dict[int, DedupTool] = {}
         self.tool_registry = None  # Will be injected from main app
+        self.semantic_cache = None  # Will be injected from main app
+        self.llm_cache = None  # Optional exact-match LangChain cache for the agent LLM, injected from main app
+        # LangChain's stdout tracer writes every step synchronously; keep it off unless debugging
+        self.verbose = os.getenv("AGENT_VERBOSE", "false").lower() in {"1", "true", "yes"}
 
         # tambahan untuk fitur baru
         self.skills: Dict[str, Dict[str, SkillRecord]] = {}
-        self.extended_memory: Dict[str, List[ConversationMemoryEntry]] = {}
+        self.extended_memory: Dict[str, Deque[ConversationMemoryEntry]] = {}
+        self.extended_memory_max_entries = int(os.getenv("AGENT_EXTENDED_MEMORY_MAX_ENTRIES", "500"))
+        self.memory_max_entries = int(os.getenv("AGENT_MEMORY_MAX_ENTRIES", "200"))
+
+    @cached_property
+    def llm(self):
+        # Imported on first use so the provider SDK is not loaded at module import
+        from langchain_groq import ChatGroq
+
+        return ChatGroq(
+            temperature=0,
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            model_name="llama3-8b-8192",
+            http_async_client=make_http_async_client(),
+            cache=self.llm_cache,
+        )
 
     def set_tool_registry(self, tool_registry):
         self.tool_registry = tool_registry
+        self._agent_cache.clear()
+        self._wrapped_tools.clear()
+        self._tool_dedup.clear()
+        for conversation in self.agents.values():
+            conversation["agent"] = None
+
+    def set_llm_cache(self, llm_cache):
+        self.llm_cache = llm_cache
+        # The LLM and the agents built on it pick the cache up when next created
+        self.__dict__.pop("llm", None)
+        self._agent_cache.clear()
+        for conversation in self.agents.values():
+            conversation["agent"] = None
+
+    def _get_available_tools(self) -> List[BaseTool]:
+        """Registry tools wrapped once each so concurrent identical calls are deduplicated."""
+        wrapped = []
+        for tool in self.tool_registry.get_tools():
+            dedup_tool = self._wrapped_tools.get(id(tool))
+            if dedup_tool is None or dedup_tool.inner is not tool:
+                dedup_tool = DedupTool(tool, self._tool_dedup)
+                self._wrapped_tools[id(tool)] = dedup_tool
+            wrapped.append(dedup_tool)
+        return wrapped
+
+    def _get_agent(self, selected_tools: List[BaseTool], agent_type: AgentType):
+        """Return the agent for this tool set, building it on first use."""
+        key = (agent_type, frozenset(tool.name for tool in selected_tools))
+        agent = self._agent_cache.get(key)
+        if agent is None:
+            agent = initialize_agent(
+                tools=selected_tools,
+                llm=self.llm,
+                agent=agent_type,
+                verbose=self.verbose,
+                handle_parsing_errors=True
+            )
+            self._agent_cache[key] = agent
+        return agent
+
+    def set_semantic_cache(self, semantic_cache):
+        self.semantic_cache = semantic_cache
+
+    async def warmup(self) -> None:
+        """Prime the agent LLM's connection pool before the first request."""
+        try:
+            await self.llm.ainvoke([HumanMessage(content="ping")])
+        except Exception as e:
+            logger.warning(f"Agent LLM warmup failed: {str(e)}")
 
     async def execute(self, query: str, tools: Optional[List[str]] = None) -> Dict[str, Any]:
         try:
             if not self.tool_registry:
-                raise Exception("Tool registry not initialized")
+                raise AgentError("Tool registry not initialized")
 
-            available_tools = self.tool_registry.get_tools()
+            available_tools = self._get_available_tools()
             if tools:
                 selected_tools = [tool for tool in available_tools if tool.name in tools]
                 if not selected_tools:
-                    raise Exception(f"No valid tools found from requested list: {tools}")
+                    raise ToolError(f"No valid tools found from requested list: {tools}")
             else:
                 selected_tools = available_tools
 
-            agent = initialize_agent(
-                tools=selected_tools,
-                llm=self.llm,
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=True,
-                handle_parsing_errors=True
-            )
-
+            tool_names = [tool.name for tool in selected_tools]
+            cache_namespace = "agent:" + ",".join(sorted(tool_names))
+            if self.semantic_cache:
+                cached = await self.semantic_cache.lookup(query, cache_namespace)
+                if cached is not None:
+                    return {
+                        "result": cached,
+                        "tools_used": tool_names,
+                        "query": query
+                    }
+
+            agent = self._get_agent(selected_tools, AgentType.ZERO_SHOT_REACT_DESCRIPTION)
             result = await agent.arun(query)
+            if self.semantic_cache:
+                await self.semantic_cache.store(query, result, cache_namespace)
             return {
                 "result": result,
-                "tools_used": [tool.name for tool in selected_tools],
+                "tools_used": tool_names,
                 "query": query
             }
 
+        except AgentError:
+            raise
         except Exception as e:
             logger.error(f"Error executing agent: {str(e)}")
-            raise Exception(f"Agent execution failed: {str(e)}")
-
-    async def execute_with_memory(self, query: str, conversation_id: str, tools: Optional[List[str]] = None) -> Dict[str, Any]:
+            raise AgentError(f"Agent execution failed: {str(e)}")
+
+    async def execute_with_memory(
+        self,
+        query: str,
+        conversation_id: str,
+        tools: Optional[List[str]] = None,
+        chat_history: Optional[List[BaseMessage]] = None,
+    ) -> Dict[str, Any]:
         try:
             if not self.tool_registry:
-                raise Exception("Tool registry not initialized")
+                raise AgentError("Tool registry not initialized")
 
             if conversation_id not in self.agents:
                 self.agents[conversation_id] = {
-                    "memory": [],
+                    "memory": deque(maxlen=self.memory_max_entries),
+                    "count": 0,
                     "agent": None
                 }
 
-            available_tools = self.tool_registry.get_tools()
+            available_tools = self._get_available_tools()
             if tools:
                 selected_tools = [tool for tool in available_tools if tool.name in tools]
                 if not selected_tools:
-                    raise Exception(f"No valid tools found from requested list: {tools}")
+                    raise ToolError(f"No valid tools found from requested list: {tools}")
             else:
                 selected_tools = available_tools
 
             if not self.agents[conversation_id]["agent"]:
-                self.agents[conversation_id]["agent"] = initialize_agent(
-                    tools=selected_tools,
-                    llm=self.llm,
-                    agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
-                    verbose=True,
-                    handle_parsing_errors=True
+                self.agents[conversation_id]["agent"] = self._get_agent(
+                    selected_tools, AgentType.CONVERSATIONAL_REACT_DESCRIPTION
                 )
 
             self.agents[conversation_id]["memory"].append({
                 "query": query,
                 "timestamp": asyncio.get_event_loop().time()
             })
+            self.agents[conversation_id]["count"] += 1
+
+            cache_namespace = f"conv:{conversation_id}"
+            if self.semantic_cache:
+                cached = await self.semantic_cache.lookup(query, cache_namespace)
+                if cached is not None:
+                    return {
+                        "result": cached,
+                        "conversation_id": conversation_id,
+                        "memory_length": self.agents[conversation_id]["count"],
+                        "tools_used": [tool.name for tool in selected_tools]
+                    }
 
             agent = self.agents[conversation_id]["agent"]
-            result = await agent.arun(query)
+            result = await agent.arun(input=query, chat_history=get_buffer_string(chat_history or []))
+            if self.semantic_cache:
+                await self.semantic_cache.store(query, result, cache_namespace)
 
             return {
                 "result": result,
                 "conversation_id": conversation_id,
-                "memory_length": len(self.agents[conversation_id]["memory"]),
+                "memory_length": self.agents[conversation_id]["count"],
                 "tools_used": [tool.name for tool in selected_tools]
             }
 
+        except AgentError:
+            raise
         except Exception as e:
             logger.error(f"Error executing agent with memory: {str(e)}")
-            raise Exception(f"Agent execution with memory failed: {str(e)}")
+            raise AgentError(f"Agent execution with memory failed: {str(e)}")
 
-    async def execute_chain(self, queries: List[str], tools: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    async def execute_chain(self, queries: List[str], tools: Optional[List[str]] = None, max_concurrency: int = 10) -> List[Dict[str, Any]]:
         try:
-            results = []
-            for i, query in enumerate(queries):
-                result = await self.execute(query, tools)
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def run(query: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.execute(query, tools)
+
+            results = await asyncio.gather(*[run(query) for query in queries])
+            for i, result in enumerate(results):
                 result["chain_position"] = i + 1
-                results.append(result)
-            return results
+            return list(results)
+        except AgentError:
+            raise
         except Exception as e:
             logger.error(f"Error executing agent chain: {str(e)}")
-            raise Exception(f"Agent chain execution failed: {str(e)}")
+            raise AgentError(f"Agent chain execution failed: {str(e)}")
 
     async def get_conversation_history(self, conversation_id: str) -> List[Dict[str, Any]]:
         try:
             if conversation_id not in self.agents:
                 return []
-            return self.agents[conversation_id]["memory"]
+            return list(self.agents[conversation_id]["memory"])
         except Exception as e:
             logger.error(f"Error getting conversation history: {str(e)}")
             raise Exception(f"Failed to get conversation history: {str(e)}")
 
+    async def get_recent(self, conversation_id: str, n: int = 10) -> List[Dict[str, Any]]:
+        try:
+            if conversation_id not in self.agents or n <= 0:
+                return []
+            memory = self.agents[conversation_id]["memory"]
+            return list(islice(memory, max(0, len(memory) - n), None))
+        except Exception as e:
+            logger.error(f"Error getting recent conversation history: {str(e)}")
+            raise Exception(f"Failed to get recent conversation history: {str(e)}")
+
     async def clear_conversation(self, conversation_id: str) -> bool:
         try:
             if conversation_id in self.agents:
                 del self.agents[conversation_id]
                 logger.info(f"Cleared conversation: {conversation_id}")
+            if self.semantic_cache:
+                self.semantic_cache.clear(f"conv:{conversation_id}")
             return True
         except Exception as e:
             logger.error(f"Error clearing conversation: {str(e)}")
@@ -197,24 +330,29 @@ class AgentService:
         rec = self.get_skill(conversation_id, topic)
         rec.mastery = max(0, min(100, rec.mastery + delta_mastery))
         rec.practice_count += 1
-        rec.last_updated = datetime.utcnow().timestamp()
+        rec.last_updated = time.time()
         return rec
 
     # ---- Extended memory ----
     def add_to_memory(self, conversation_id: str, role: str, text: str, metadata: Optional[Dict[str, Any]] = None):
         if conversation_id not in self.extended_memory:
-            self.extended_memory[conversation_id] = []
+            self.extended_memory[conversation_id] = deque(maxlen=self.extended_memory_max_entries)
         self.extended_memory[conversation_id].append(
             ConversationMemoryEntry(role=role, text=text, metadata=metadata or {})
         )
 
+    def _history_messages(self, conversation_id: str) -> List[BaseMessage]:
+        return [
+            HumanMessage(content=entry.text) if entry.role == "user" else AIMessage(content=entry.text)
+            for entry in self.extended_memory.get(conversation_id, [])
+        ]
+
     # ---- Clarification ----
     async def detect_intent(self, query: str) -> Dict[str, Any]:
         lowered = query.lower()
-        if any(w in lowered for w in ["latihan", "soal"]):
-            return {"intent": "practice", "ambiguous": False}
-        if any(w in lowered for w in ["materi", "pelajaran", "ajar"]):
-            return {"intent": "lesson", "ambiguous": False}
+        for intent, pattern in _INTENT_PATTERNS:
+            if pattern.search(lowered):
+                return {"intent": intent, "ambiguous": False}
         if len(query.split()) < 2:
             return {"intent": "unknown", "ambiguous": True, "clarify": "Bisa jelaskan lebih detail maksud Anda?"}
         return {"intent": "ask", "ambiguous": False}
@@ -240,28 +378,58 @@ class AgentService:
             self.add_to_memory(conversation_id, "agent", str(response), {"type": "practice"})
             return {"status": "practice", "questions": response}
 
-        # fallback ke agent bawaan
-        result = await self.execute_with_memory(query, conversation_id)
+        # fallback ke agent bawaan; riwayat dikirim sebagai pesan terpisah,
+        # bukan disisipkan ke prompt sistem, agar prefix prompt tetap statis
+        history = self._history_messages(conversation_id)[:-1]
+        result = await self.execute_with_memory(query, conversation_id, chat_history=history)
         return {"status": "agent", "result": result}
 
     # ---- Conversation loop ----
     async def conversation_loop(self, conversation_id: str = "default"):
-        print("=== Mulai percakapan dengan Agent AI (ketik 'exit' untuk berhenti) ===")
-        while True:
-            query = input("User: ")
-            if query.lower() in ["exit", "quit"]:
-                print("Percakapan selesai.")
-                break
-            result = await self.execute_with_decision(query, conversation_id)
-            if result["status"] == "clarify":
-                print(f"Agent (clarify): {result['question']}")
-            elif result["status"] == "lesson":
-                print(f"Agent (lesson): {result['content']}")
-            elif result["status"] == "practice":
-                print("Agent (practice):")
-                for q in result["questions"]:
-                    print("-", q)
-            elif result["status"] == "agent":
-                print(f"Agent: {result['result']['result']}")
-            else:
-                print("Agent: (no response)")
+        # stdin dibaca di thread terpisah dan output dirender lewat antrean,
+        # sehingga event loop tetap bebas melayani request lain
+        output: asyncio.Queue = asyncio.Queue(maxsize=100)
+
+        async def render():
+            while True:
+                line = await output.get()
+                await asyncio.to_thread(print, line)
+                output.task_done()
+
+        renderer = asyncio.create_task(render())
+        try:
+            await output.put("=== Mulai percakapan dengan Agent AI (ketik 'exit' untuk berhenti) ===")
+            while True:
+                await output.join()
+                query = await asyncio.to_thread(input, "User: ")
+                if query.lower() in ["exit", "quit"]:
+                    await output.put("Percakapan selesai.")
+                    break
+                try:
+                    result = await self.execute_with_decision(query, conversation_id)
+                except Exception as e:
+                    # Satu giliran yang gagal tidak boleh mengakhiri sesi
+                    logger.error(f"Conversation turn failed: {str(e)}")
+                    await output.put(f"Agent (error): {str(e)}")
+                    continue
+                if result["status"] == "clarify":
+                    await output.put(f"Agent (clarify): {result['question']}")
+                elif result["status"] == "lesson":
+                    await output.put(f"Agent (lesson): {result['content']}")
+                elif result["status"] == "practice":
+                    await output.put("Agent (practice):")
+                    for q in result["questions"]:
+                        await output.put(f"- {q}")
+                elif result["status"] == "agent":
+                    await output.put(f"Agent: {result['result']['result']}")
+                else:
+                    await output.put("Agent: (no response)")
+            await output.join()
+        finally:
+            renderer.cancel()
+
+
+if __name__ == "__main__":
+    service = AgentService()
+    service.set_tool_registry(ToolRegistry())
+    asyncio.run(service.conversation_loop())
@@ -4,18 +4,23 @@ import os
 import json
 import time
 import logging
-from typing import Dict, Set, Optional, List
+from typing import Any, Dict, Set, Optional, List
 from dataclasses import dataclass, asdict
 
 from fastapi import Request, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
+from middleware.clock import now_s
+
 from .models import UserRole, Permission, APIKeyInfo
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+_ROLE_BY_VALUE = {role.value: role for role in UserRole}
+_PERMISSION_BY_VALUE = {perm.value: perm for perm in Permission}
+
 
 @dataclass
 class APIKeyConfig:
@@ -44,11 +49,16 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
     Keys can be configured via environment variables or a configuration file.
     """
 
-    def __init__(self, app, protected_prefix: str = "/external/") -> None:
+    def __init__(self, app, protected_prefix: str = "/external/", state: Optional[Any] = None) -> None:
         super().__init__(app)
         self.protected_prefix = protected_prefix
         self.api_keys: Dict[str, APIKeyInfo] = {}
         self._load_api_keys()
+        # Secondary index so admin endpoints resolve a key_id without scanning all keys
+        self.key_id_to_key: Dict[str, str] = {info.key_id: key for key, info in self.api_keys.items()}
+        # Publish the live instance (e.g. on app.state) so admin endpoints manage the same keys
+        if state is not None:
+            state.api_key_middleware = self
 
     def _load_api_keys(self) -> None:
         """Load API keys from environment variables and configuration."""
@@ -138,13 +148,13 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
             return None
         
         # Check expiration
-        if key_info.expires_at and time.time() > key_info.expires_at:
+        if key_info.expires_at and now_s() > key_info.expires_at:
             logger.warning(f"API key validation failed: Expired key {key_info.key_id}")
             return None
         
         # Update usage statistics
         key_info.usage_count += 1
-        key_info.last_used_at = int(time.time())
+        key_info.last_used_at = now_s()
         
         logger.debug(f"API key validation successful for key {key_info.key_id}")
         return key_info
@@ -201,8 +211,8 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
 
         # Add key info to request state for use in route handlers
         request.state.api_key_info = key_info
-        request.state.user_roles = [UserRole(role) for role in key_info.roles if role in [r.value for r in UserRole]]
-        request.state.user_permissions = [Permission(perm) for perm in key_info.permissions if perm in [p.value for p in Permission]]
+        request.state.user_roles = [_ROLE_BY_VALUE[role] for role in key_info.roles if role in _ROLE_BY_VALUE]
+        request.state.user_permissions = [_PERMISSION_BY_VALUE[perm] for perm in key_info.permissions if perm in _PERMISSION_BY_VALUE]
 
         return await call_next(request)
 
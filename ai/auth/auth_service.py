@@ -2,20 +2,93 @@ from __future__ import annotations
 
 import os
 import json
+import base64
+import time
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
 import httpx
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+except Exception:
+    h2 = None
+# Optional faster JSON parser; orjson.JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
 from fastapi import HTTPException, status
-from jose import jwt, JWTError
+from jose import JWTError
 
 from .models import UserRole, Permission, TokenPayload, User
-from .user_service import user_service_singleton, SECRET_KEY, ALGORITHM
+from .user_service import user_service_singleton
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+_json_loads = orjson.loads if orjson is not None else json.loads
+_ROLE_BY_VALUE = {role.value: role for role in UserRole}
+_VALID_PERMISSION_VALUES = frozenset(perm.value for perm in Permission)
+
+
+# base64 padding indexed by len % 4 (JWT segments are unpadded)
+_B64_PAD = (b'', b'===', b'==', b'=')
+
+
+@lru_cache(maxsize=10_000)
+def _decode_payload_segment(segment: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+    """Base64/JSON-decode a JWT payload segment once per distinct segment; returns (claims, exp)."""
+    try:
+        raw = segment.encode('ascii')
+        claims = _json_loads(base64.urlsafe_b64decode(raw + _B64_PAD[len(raw) & 3]))
+    except Exception:
+        return None
+    if not isinstance(claims, dict):
+        return None
+    return claims, claims.get('exp')
+
+
+@lru_cache(maxsize=256)
+def _role_values_for_csv(roles: str) -> Tuple[str, ...]:
+    """Known role names of a stored comma-separated roles string (few distinct values, so cached)."""
+    return tuple(role for role in roles.split(',') if role in _ROLE_BY_VALUE)
+
+
+class _FrequencySketch:
+    """
+    Count-min sketch of recent key frequencies, used as a TinyLFU admission filter.
+    Counters saturate at 255 and are halved every `10 * width` increments so old
+    popularity fades.
+    """
+
+    def __init__(self, width: int, depth: int = 4) -> None:
+        self.width = max(width, 1)
+        self.depth = depth
+        self._rows = [bytearray(self.width) for _ in range(depth)]
+        self._additions = 0
+        self._sample_size = 10 * self.width
+
+    def _slots(self, digest: bytes):
+        for i in range(self.depth):
+            yield i, int.from_bytes(digest[i * 4:(i + 1) * 4], "little") % self.width
+
+    def increment(self, digest: bytes) -> None:
+        for i, slot in self._slots(digest):
+            if self._rows[i][slot] < 255:
+                self._rows[i][slot] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            for row in self._rows:
+                row[:] = bytes(count >> 1 for count in row)
+            self._additions //= 2
+
+    def estimate(self, digest: bytes) -> int:
+        return min(self._rows[i][slot] for i, slot in self._slots(digest))
+
 
 class AuthService:
     """Enhanced client for external Auth Service to verify JWT and fetch user info/roles."""
@@ -32,87 +105,112 @@ class AuthService:
         self.cache_enabled: bool = os.getenv("AUTH_CACHE_ENABLED", "false").lower() == "true"
         self.cache_ttl: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))  # 5 minutes default
         
-        # Simple in-memory cache for token validation results
-        self._token_cache: Dict[str, Dict[str, Any]] = {}
-        self._cache_timestamps: Dict[str, float] = {}
+        self.cache_max_entries: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "50000"))
+
+        # Bounded LRU of (monotonic expiry, result) keyed by a 16-byte BLAKE2b digest of the token, with
+        # TinyLFU admission so one-off tokens cannot evict frequently used ones.
+        # Only touched from the event loop without awaiting, so no lock is needed.
+        self._token_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._token_sketch = _FrequencySketch(self.cache_max_entries)
+
+        # One pooled client shared by verify/refresh/revoke so auth calls reuse connections;
+        # HTTP/2 multiplexes concurrent verifications over a single connection
+        self.http2: bool = h2 is not None and os.getenv("AUTH_SERVICE_HTTP2", "false").lower() in {"1", "true", "yes"}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get or create the shared HTTP client for the auth service."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("AUTH_SERVICE_MAX_CONNECTIONS", "200")),
+                    max_keepalive_connections=int(os.getenv("AUTH_SERVICE_MAX_KEEPALIVE_CONNECTIONS", "100")),
+                ),
+            )
+        return self._client
 
-    def _is_token_cached(self, token: str) -> bool:
-        """Check if token validation result is cached and not expired."""
-        if not self.cache_enabled:
-            return False
-        
-        if token not in self._token_cache:
-            return False
-        
-        cache_time = self._cache_timestamps.get(token, 0)
-        return (datetime.now(timezone.utc).timestamp() - cache_time) < self.cache_ttl
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _token_digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
 
     def _cache_token_result(self, token: str, result: Dict[str, Any]) -> None:
         """Cache token validation result."""
         if not self.cache_enabled:
             return
-        
-        self._token_cache[token] = result
-        self._cache_timestamps[token] = datetime.now(timezone.utc).timestamp()
+
+        digest = self._token_digest(token)
+        if digest not in self._token_cache and len(self._token_cache) >= self.cache_max_entries:
+            # Admit only if the candidate is seen more often than the LRU victim
+            victim = next(iter(self._token_cache))
+            if self._token_sketch.estimate(digest) <= self._token_sketch.estimate(victim):
+                return
+            self._token_cache.popitem(last=False)
+
+        self._token_cache[digest] = (time.monotonic() + self.cache_ttl, result)
+        self._token_cache.move_to_end(digest)
 
     def _get_cached_token_result(self, token: str) -> Optional[Dict[str, Any]]:
-        """Get cached token validation result."""
-        if not self._is_token_cached(token):
+        """Get cached token validation result if present and not expired."""
+        if not self.cache_enabled:
             return None
-        
-        return self._token_cache.get(token)
+
+        digest = self._token_digest(token)
+        self._token_sketch.increment(digest)
+        entry = self._token_cache.get(digest)
+        if entry is None:
+            return None
+
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self._token_cache[digest]
+            return None
+
+        self._token_cache.move_to_end(digest)
+        return result
+
+    def _evict_token(self, token: str) -> None:
+        self._token_cache.pop(self._token_digest(token), None)
+        user_service_singleton.invalidate_access_token(token)
 
     def _validate_token_structure(self, token: str) -> bool:
         """Enhanced JWT token structure validation."""
-        if not token:
+        # Cheapest check first: empty or oversized (8KB limit)
+        if not token or len(token) > 8192:
             return False
         
-        # JWT tokens have 3 parts separated by dots
-        parts = token.split('.')
-        if len(parts) != 3:
-            return False
-        
-        # Basic validation of each part
-        for part in parts:
-            if not part or len(part) == 0:
-                return False
-        
-        # Check if token is not too long (basic security check)
-        if len(token) > 8192:  # 8KB limit
-            return False
-        
-        return True
+        # JWT tokens have 3 non-empty parts separated by dots; str.count/in stay in C
+        # and avoid building a list for garbage tokens
+        return (
+            token.count('.') == 2
+            and token[0] != '.'
+            and token[-1] != '.'
+            and '..' not in token
+        )
     
     def _decode_jwt_payload(self, token: str) -> Optional[Dict[str, Any]]:
         """Decode JWT payload without verification (for basic structure check)."""
-        try:
-            import base64
-            import json
-            
-            # Split token
-            parts = token.split('.')
-            if len(parts) != 3:
-                return None
-            
-            # Decode payload (add padding if needed)
-            payload = parts[1]
-            # Add padding if needed
-            missing_padding = len(payload) % 4
-            if missing_padding:
-                payload += '=' * (4 - missing_padding)
-            
-            decoded_bytes = base64.urlsafe_b64decode(payload)
-            return json.loads(decoded_bytes.decode('utf-8'))
-        except Exception:
+        parts = token.split('.', 2)
+        if len(parts) < 3:
             return None
+        decoded = _decode_payload_segment(parts[1])
+        return decoded[0] if decoded else None
     
     def _check_token_expiration(self, token: str) -> bool:
         """Check if token is expired based on exp claim."""
-        payload = self._decode_jwt_payload(token)
-        if not payload:
+        parts = token.split('.', 2)
+        decoded = _decode_payload_segment(parts[1]) if len(parts) == 3 else None
+        if not decoded or not decoded[0]:
             return False
         
-        exp = payload.get('exp')
+        exp = decoded[1]
         if not exp:
             # No expiration claim, assume valid for now
             return True
@@ -128,7 +226,7 @@ class AuthService:
             roles = [roles]
         
         # Filter out invalid roles
-        valid_roles = [role for role in roles if role in [r.value for r in UserRole]]
+        valid_roles = [role for role in roles if role in _ROLE_BY_VALUE]
         data["roles"] = valid_roles
         
         # Normalize permissions to list[str]
@@ -137,7 +235,7 @@ class AuthService:
             permissions = [permissions]
         
         # Filter out invalid permissions
-        valid_permissions = [perm for perm in permissions if perm in [p.value for p in Permission]]
+        valid_permissions = [perm for perm in permissions if perm in _VALID_PERMISSION_VALUES]
         data["permissions"] = valid_permissions
         
         # Ensure required fields exist
@@ -192,7 +290,7 @@ class AuthService:
         if not self._configured:
             # Use local authentication if external service is not configured
             try:
-                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                payload = user_service_singleton.decode_access_token(token)
                 email: str = payload.get("email")
                 if email is None:
                     raise JWTError("Invalid token: email missing")
@@ -205,14 +303,13 @@ class AuthService:
                 if db_user is None or str(db_user.id) != user_id:
                     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user in token")
                 
-                user_roles = [UserRole(role) for role in db_user.roles.split(',') if role in [r.value for r in UserRole]]
                 user_permissions = user_service_singleton.get_user_permissions(db_user)
 
                 user_data = {
                     "sub": str(db_user.id),
                     "email": db_user.email,
                     "username": db_user.username,
-                    "roles": [role.value for role in user_roles],
+                    "roles": list(_role_values_for_csv(db_user.roles or "")),
                     "permissions": user_permissions,
                     "is_active": db_user.is_active,
                     "metadata": {}
@@ -232,16 +329,16 @@ class AuthService:
             "Content-Type": "application/json"
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            try:
-                logger.debug(f"Token verification: Calling auth service at {url}")
-                resp = await client.get(url, headers=headers)
-            except httpx.RequestError as exc:
-                logger.error(f"Token verification failed: Auth service unreachable - {exc}")
-                raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY, 
-                    detail=f"Auth service unreachable: {exc}"
-                ) from exc
+        client = self._get_client()
+        try:
+            logger.debug(f"Token verification: Calling auth service at {url}")
+            resp = await client.get(url, headers=headers)
+        except httpx.RequestError as exc:
+            logger.error(f"Token verification failed: Auth service unreachable - {exc}")
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY, 
+                detail=f"Auth service unreachable: {exc}"
+            ) from exc
 
         if resp.status_code == 401:
             logger.warning("Token verification failed: Invalid or expired token from auth service")
@@ -265,7 +362,7 @@ class AuthService:
             )
 
         try:
-            data = resp.json()
+            data = _json_loads(resp.content)
             logger.debug("Token verification: Successfully received response from auth service")
         except json.JSONDecodeError as exc:
             logger.error(f"Token verification failed: Invalid JSON response from auth service - {exc}")
@@ -299,14 +396,14 @@ class AuthService:
         headers = {"Content-Type": "application/json"}
         payload = {"refresh_token": refresh_token}
         
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            try:
-                resp = await client.post(url, headers=headers, json=payload)
-            except httpx.RequestError as exc:
-                raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY, 
-                    detail=f"Auth service unreachable: {exc}"
-                ) from exc
+        client = self._get_client()
+        try:
+            resp = await client.post(url, headers=headers, json=payload)
+        except httpx.RequestError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY, 
+                detail=f"Auth service unreachable: {exc}"
+            ) from exc
 
         if resp.status_code != 200:
             raise HTTPException(
@@ -315,7 +412,7 @@ class AuthService:
             )
 
         try:
-            data = resp.json()
+            data = _json_loads(resp.content)
         except json.JSONDecodeError:
             raise HTTPException(
                 status_code=status.HTTP_502_BAD_GATEWAY, 
@@ -332,8 +429,7 @@ class AuthService:
         if not self._configured:
             # In development mode, just remove from cache
             if os.getenv("ENVIRONMENT", "").lower() == "development":
-                self._token_cache.pop(token, None)
-                self._cache_timestamps.pop(token, None)
+                self._evict_token(token)
                 return True
             
             # If not configured and not development, we can't revoke a token we didn't issue
@@ -342,22 +438,20 @@ class AuthService:
         url = f"{self.base_url.rstrip('/')}/revoke"
         headers = {"Authorization": f"Bearer {token}"}
         
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            try:
-                resp = await client.post(url, headers=headers)
-            except httpx.RequestError:
-                return False
+        client = self._get_client()
+        try:
+            resp = await client.post(url, headers=headers)
+        except httpx.RequestError:
+            return False
 
         # Remove from cache regardless of response
-        self._token_cache.pop(token, None)
-        self._cache_timestamps.pop(token, None)
+        self._evict_token(token)
         
         return resp.status_code == 200
 
     def clear_cache(self) -> None:
         """Clear the token cache."""
         self._token_cache.clear()
-        self._cache_timestamps.clear()
 
 
 auth_service_singleton = AuthService()
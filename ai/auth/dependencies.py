@@ -1,7 +1,11 @@
 from __future__ import annotations
 
-from typing import List, Optional, Union, Callable, Any
-from functools import wraps
+import os
+import hashlib
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional, Tuple, Union, Callable, Any
+from functools import lru_cache, wraps
 
 from fastapi import Depends, Header, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -13,6 +17,44 @@ from .models import User, UserRole, Permission, TokenPayload, AccessControlResul
 # Security scheme for OpenAPI documentation
 security_scheme = HTTPBearer(auto_error=False)
 
+# User already resolved for the current request (set by RBACMiddleware or by the first
+# get_current_user call), so the same token is verified at most once per request.
+# Each request runs in its own task and context, so the value never leaks across requests.
+current_user: ContextVar[Optional[User]] = ContextVar("current_user", default=None)
+
+# Enum members by value, so token data is filtered and converted with one dict lookup
+_ROLE_BY_VALUE = {role.value: role for role in UserRole}
+_PERMISSION_BY_VALUE = {perm.value: perm for perm in Permission}
+
+# Users built from verified token data, keyed by a digest of the token (LRU-bounded)
+# so live credentials are not kept in memory. An entry is reused only while
+# verification keeps returning the same data.
+_user_cache: "OrderedDict[bytes, Tuple[dict, User]]" = OrderedDict()
+_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "1024"))
+
+
+def _user_from_token_data(token: str, user_data: dict) -> User:
+    key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    cached = _user_cache.get(key)
+    if cached is not None and cached[0] == user_data:
+        _user_cache.move_to_end(key)
+        return cached[1]
+
+    user = User(
+        id=user_data.get("sub", user_data.get("user_id", "")),
+        email=user_data.get("email", ""),
+        username=user_data.get("username"),
+        roles=[_ROLE_BY_VALUE[role] for role in user_data.get("roles", []) if role in _ROLE_BY_VALUE],
+        permissions=[_PERMISSION_BY_VALUE[perm] for perm in user_data.get("permissions", []) if perm in _PERMISSION_BY_VALUE],
+        is_active=user_data.get("is_active", True),
+        metadata=user_data.get("metadata", {})
+    )
+    if _USER_CACHE_MAX_ENTRIES > 0:
+        _user_cache[key] = (user_data, user)
+        if len(_user_cache) > _USER_CACHE_MAX_ENTRIES:
+            _user_cache.popitem(last=False)
+    return user
+
 
 async def get_current_user(
     authorization: str | None = Header(default=None),
@@ -22,6 +64,10 @@ async def get_current_user(
     
     Returns a User object with roles and permissions.
     """
+    user = current_user.get()
+    if user is not None:
+        return user
+
     # Try to get token from Authorization header first, then from credentials
     token = None
     if authorization and authorization.lower().startswith("bearer "):
@@ -38,17 +84,10 @@ async def get_current_user(
     # Verify token with external auth service
     user_data = await auth_service_singleton.verify_token(token)
     
-    # Convert to User model
-    user = User(
-        id=user_data.get("sub", user_data.get("user_id", "")),
-        email=user_data.get("email", ""),
-        username=user_data.get("username"),
-        roles=[UserRole(role) for role in user_data.get("roles", []) if role in [r.value for r in UserRole]],
-        permissions=[Permission(perm) for perm in user_data.get("permissions", []) if perm in [p.value for p in Permission]],
-        is_active=user_data.get("is_active", True),
-        metadata=user_data.get("metadata", {})
-    )
-    
+    # Convert to User model and remember it for the rest of this request, so stacked
+    # guards declared with different signatures (e.g. get_current_user_optional) reuse it
+    user = _user_from_token_data(token, user_data)
+    current_user.set(user)
     return user
 
 
@@ -63,6 +102,8 @@ async def get_current_user_optional(
         return None
 
 
+# Cached so repeated calls with the same requirements share one dependency in FastAPI's graph
+@lru_cache(maxsize=None)
 def require_roles(*required_roles: Union[str, UserRole]) -> Callable:
     """Dependency factory to enforce role-based access control.
     
@@ -83,10 +124,12 @@ def require_roles(*required_roles: Union[str, UserRole]) -> Callable:
         else:
             roles.append(role)
     
+    required = frozenset(roles)
+    role_names = [role.value for role in roles]
+    
     async def dependency(user: User = Depends(get_current_user)) -> User:
-        if not user.has_any_role(roles):
-            role_names = [role.value for role in roles]
-            user_role_names = [role.value for role in user.roles]
+        if user.role_set.isdisjoint(required):
+            user_role_names = list(user.role_values)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
                 detail=f"Insufficient role. Required: {role_names}, User has: {user_role_names}"
@@ -96,6 +139,7 @@ def require_roles(*required_roles: Union[str, UserRole]) -> Callable:
     return dependency
 
 
+@lru_cache(maxsize=None)
 def require_permissions(*required_permissions: Union[str, Permission]) -> Callable:
     """Dependency factory to enforce permission-based access control.
     
@@ -116,10 +160,12 @@ def require_permissions(*required_permissions: Union[str, Permission]) -> Callab
         else:
             permissions.append(perm)
     
+    required = frozenset(permissions)
+    perm_names = [perm.value for perm in permissions]
+    
     async def dependency(user: User = Depends(get_current_user)) -> User:
-        if not user.has_any_permission(permissions):
-            perm_names = [perm.value for perm in permissions]
-            user_perms = [perm.value for perm in user.get_all_permissions()]
+        if user.permission_set.isdisjoint(required):
+            user_perms = list(user.permission_values)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
                 detail=f"Insufficient permissions. Required: {perm_names}, User has: {user_perms}"
@@ -129,6 +175,7 @@ def require_permissions(*required_permissions: Union[str, Permission]) -> Callab
     return dependency
 
 
+@lru_cache(maxsize=None)
 def require_all_permissions(*required_permissions: Union[str, Permission]) -> Callable:
     """Dependency factory to enforce that user has ALL required permissions.
     
@@ -149,14 +196,12 @@ def require_all_permissions(*required_permissions: Union[str, Permission]) -> Ca
         else:
             permissions.append(perm)
     
+    required = frozenset(permissions)
+    
     async def dependency(user: User = Depends(get_current_user)) -> User:
-        missing_permissions = []
-        for perm in permissions:
-            if not user.has_permission(perm):
-                missing_permissions.append(perm.value)
-        
-        if missing_permissions:
-            user_perms = [perm.value for perm in user.get_all_permissions()]
+        if not user.permission_set >= required:
+            missing_permissions = [perm.value for perm in permissions if perm not in user.permission_set]
+            user_perms = list(user.permission_values)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, 
                 detail=f"Missing permissions: {missing_permissions}, User has: {user_perms}"
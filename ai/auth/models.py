@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import List, Set, Dict, Any, Optional
+from functools import cached_property, lru_cache
+from types import MappingProxyType
+from typing import List, Set, Dict, Any, Optional, FrozenSet, Mapping
+import numpy as np
 from pydantic import BaseModel, Field, EmailStr
 
 
@@ -51,72 +54,61 @@ class Permission(str, Enum):
     EXTERNAL_API_ACCESS = "external_api_access"
 
 
+# Students can only read content and create questions
+_STUDENT_PERMISSIONS: FrozenSet[Permission] = frozenset({
+    Permission.READ_USER,
+    Permission.READ_COURSE,
+    Permission.READ_CONTENT,
+    Permission.CREATE_QUESTION,
+    Permission.READ_QUESTION,
+})
+
+# Teachers can also manage courses and content
+_TEACHER_PERMISSIONS: FrozenSet[Permission] = _STUDENT_PERMISSIONS | {
+    Permission.CREATE_COURSE,
+    Permission.UPDATE_COURSE,
+    Permission.CREATE_CONTENT,
+    Permission.UPDATE_CONTENT,
+    Permission.UPDATE_QUESTION,
+    Permission.READ_ANALYTICS,
+    Permission.READ_REPORTS,
+    Permission.MANAGE_TOOLS,
+    Permission.MANAGE_AGENTS,
+}
+
+
 class RolePermissions:
     """Maps roles to their permissions."""
     
-    ROLE_PERMISSIONS: Dict[UserRole, Set[Permission]] = {
-        UserRole.ADMIN: {
-            # Admin has all permissions
-            Permission.CREATE_USER,
-            Permission.READ_USER,
-            Permission.UPDATE_USER,
-            Permission.DELETE_USER,
-            Permission.CREATE_COURSE,
-            Permission.READ_COURSE,
-            Permission.UPDATE_COURSE,
-            Permission.DELETE_COURSE,
-            Permission.CREATE_CONTENT,
-            Permission.READ_CONTENT,
-            Permission.UPDATE_CONTENT,
-            Permission.DELETE_CONTENT,
-            Permission.CREATE_QUESTION,
-            Permission.READ_QUESTION,
-            Permission.UPDATE_QUESTION,
-            Permission.DELETE_QUESTION,
-            Permission.READ_ANALYTICS,
-            Permission.READ_REPORTS,
-            Permission.MANAGE_SYSTEM,
-            Permission.MANAGE_TOOLS,
-            Permission.MANAGE_AGENTS,
-            Permission.EXTERNAL_API_ACCESS,
-        },
-        UserRole.TEACHER: {
-            # Teachers can manage courses and content
-            Permission.READ_USER,
-            Permission.CREATE_COURSE,
-            Permission.READ_COURSE,
-            Permission.UPDATE_COURSE,
-            Permission.CREATE_CONTENT,
-            Permission.READ_CONTENT,
-            Permission.UPDATE_CONTENT,
-            Permission.CREATE_QUESTION,
-            Permission.READ_QUESTION,
-            Permission.UPDATE_QUESTION,
-            Permission.READ_ANALYTICS,
-            Permission.READ_REPORTS,
-            Permission.MANAGE_TOOLS,
-            Permission.MANAGE_AGENTS,
-        },
-        UserRole.STUDENT: {
-            # Students can only read content and create questions
-            Permission.READ_USER,
-            Permission.READ_COURSE,
-            Permission.READ_CONTENT,
-            Permission.CREATE_QUESTION,
-            Permission.READ_QUESTION,
-        }
-    }
+    # Read-only, so cached unions and masks derived from it cannot go stale
+    ROLE_PERMISSIONS: Mapping[UserRole, FrozenSet[Permission]] = MappingProxyType({
+        # Admin has all permissions, including any added to Permission later
+        UserRole.ADMIN: frozenset(Permission),
+        UserRole.TEACHER: _TEACHER_PERMISSIONS,
+        UserRole.STUDENT: _STUDENT_PERMISSIONS,
+    })
     
     @classmethod
-    def get_permissions(cls, role: UserRole) -> Set[Permission]:
+    def get_permissions(cls, role: UserRole) -> FrozenSet[Permission]:
         """Get permissions for a specific role."""
-        return cls.ROLE_PERMISSIONS.get(role, set())
+        return cls.ROLE_PERMISSIONS.get(role, frozenset())
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def union_for(cls, roles: FrozenSet[UserRole]) -> FrozenSet[Permission]:
+        """Union of the permissions of several roles, cached per distinct role combination."""
+        return frozenset().union(*(cls.get_permissions(role) for role in roles))
     
     @classmethod
     def has_permission(cls, role: UserRole, permission: Permission) -> bool:
         """Check if a role has a specific permission."""
-        return permission in cls.get_permissions(role)
+        return bool(ROLE_MASK.get(role, 0) & PERMISSION_BIT.get(permission, 0))
     
+    @staticmethod
+    def batch_check(masks: np.ndarray, permission: Permission) -> np.ndarray:
+        """Vectorized has_permission over a uint64 array of permission masks (see PERMISSION_BIT)."""
+        return (masks & np.uint64(PERMISSION_BIT.get(permission, 0))) != 0
+
     @classmethod
     def get_roles_with_permission(cls, permission: Permission) -> List[UserRole]:
         """Get all roles that have a specific permission."""
@@ -126,6 +118,29 @@ class RolePermissions:
         ]
 
 
+# One bit per permission; a set of permissions is the OR of its bits, so membership
+# and overlap checks are a single integer AND. Masks fit a uint64 while there are
+# at most 64 permissions.
+PERMISSION_BIT: Dict[Permission, int] = {perm: 1 << index for index, perm in enumerate(Permission)}
+
+
+def permission_mask(permissions) -> int:
+    """Bitmask of an iterable of permissions (unknown values are ignored)."""
+    mask = 0
+    for perm in permissions:
+        mask |= PERMISSION_BIT.get(perm, 0)
+    return mask
+
+
+ROLE_MASK: Dict[UserRole, int] = {
+    role: permission_mask(perms) for role, perms in RolePermissions.ROLE_PERMISSIONS.items()
+}
+
+# One bit per role, stored in users.roles_mask; new roles must be appended to UserRole
+# so existing bits keep their meaning
+ROLE_BIT: Dict[UserRole, int] = {role: 1 << index for index, role in enumerate(UserRole)}
+
+
 class UserBase(BaseModel):
     email: EmailStr = Field(..., description="User email")
     username: Optional[str] = Field(None, description="Username")
@@ -135,6 +150,10 @@ class UserCreate(UserBase):
     password: str = Field(..., min_length=8, description="User password")
 
 
+# Cached User views derived from roles/permissions; dropped when either field is reassigned
+_USER_DERIVED_ATTRS = ("role_set", "direct_permission_set", "permission_bits", "permission_set", "role_values", "permission_values")
+
+
 class User(UserBase):
     id: int = Field(..., description="User ID")
     is_active: bool = Field(True, description="Whether user is active")
@@ -145,37 +164,64 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "roles" or name == "permissions":
+            for attr in _USER_DERIVED_ATTRS:
+                self.__dict__.pop(attr, None)
+
     def has_role(self, role: UserRole) -> bool:
         """Check if user has a specific role."""
-        return role in self.roles
+        return role in self.role_set
     
     def has_any_role(self, roles: List[UserRole]) -> bool:
         """Check if user has any of the specified roles."""
-        return any(role in self.roles for role in roles)
+        return not self.role_set.isdisjoint(roles)
     
     def has_permission(self, permission: Permission) -> bool:
-        """Check if user has a specific permission."""
-        # Check direct permissions first
-        if permission in self.permissions:
-            return True
-        
-        # Check role-based permissions
-        for role in self.roles:
-            if RolePermissions.has_permission(role, permission):
-                return True
-        
-        return False
+        """Check if user has a specific permission (role-based or direct)."""
+        return bool(self.permission_bits & PERMISSION_BIT.get(permission, 0))
     
     def has_any_permission(self, permissions: List[Permission]) -> bool:
         """Check if user has any of the specified permissions."""
-        return any(self.has_permission(perm) for perm in permissions)
+        return bool(self.permission_bits & permission_mask(permissions))
     
     def get_all_permissions(self) -> Set[Permission]:
         """Get all permissions for this user (role-based + direct)."""
-        all_permissions = set(self.permissions)
+        return set(self.permission_set)
+
+    @cached_property
+    def role_set(self) -> frozenset[UserRole]:
+        """Roles as a frozenset for O(1) membership checks."""
+        return frozenset(self.roles)
+
+    @cached_property
+    def direct_permission_set(self) -> frozenset[Permission]:
+        """Directly granted permissions as a frozenset."""
+        return frozenset(self.permissions)
+
+    @cached_property
+    def permission_bits(self) -> int:
+        """Bitmask of all role-based and direct permissions (see PERMISSION_BIT)."""
+        mask = permission_mask(self.permissions)
         for role in self.roles:
-            all_permissions.update(RolePermissions.get_permissions(role))
-        return all_permissions
+            mask |= ROLE_MASK.get(role, 0)
+        return mask
+
+    @cached_property
+    def permission_set(self) -> frozenset[Permission]:
+        """All role-based and direct permissions as a frozenset, computed once per instance."""
+        return self.direct_permission_set | RolePermissions.union_for(self.role_set)
+
+    @cached_property
+    def role_values(self) -> tuple[str, ...]:
+        """Role names, computed once per instance for response payloads."""
+        return tuple(role.value for role in self.roles)
+
+    @cached_property
+    def permission_values(self) -> tuple[str, ...]:
+        """Names of all role-based and direct permissions, computed once per instance."""
+        return tuple(perm.value for perm in self.permission_set)
 
 
 class UserInDB(User):
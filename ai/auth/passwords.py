@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+# Kept free of database imports so hash-pool workers only load bcrypt
+BCRYPT_ROUNDS = int(os.getenv("AUTH_BCRYPT_ROUNDS", "12"))
+# bcrypt only uses the first 72 bytes of a password (passlib truncated silently too)
+_BCRYPT_MAX_BYTES = 72
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8")[:_BCRYPT_MAX_BYTES], bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("ascii")
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Check a password against a bcrypt hash; raises ValueError for a malformed hash."""
+    return bcrypt.checkpw(plain_password.encode("utf-8")[:_BCRYPT_MAX_BYTES], hashed_password.encode("ascii"))
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored hash was made with fewer rounds than BCRYPT_ROUNDS (rehash on next login)."""
+    try:
+        return int(hashed_password.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """Get or create the process pool that runs bcrypt off the event loop."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=int(os.getenv("AUTH_HASH_WORKERS", str(os.cpu_count() or 1))))
+    return _pool
+
+
+def shutdown_hash_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
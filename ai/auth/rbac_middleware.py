@@ -11,7 +11,10 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 from .models import UserRole, Permission, User, AccessControlResult
-from .dependencies import get_current_user_optional, check_access_control
+from .dependencies import get_current_user_optional, check_access_control, current_user
+
+_ROLE_BY_VALUE = {role.value: role for role in UserRole}
+_PERMISSION_BY_VALUE = {perm.value: perm for perm in Permission}
 
 
 @dataclass
@@ -187,7 +190,7 @@ class RBACMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
         
         # Get current user (optional, won't raise exception if not authenticated)
-        user = await get_current_user_optional(request)
+        user = await get_current_user_optional(request.headers.get("authorization"), None)
         
         if not user:
             return JSONResponse(
@@ -225,6 +228,7 @@ class RBACMiddleware(BaseHTTPMiddleware):
         # Add user info to request state for use in route handlers
         request.state.current_user = user
         request.state.access_result = access_result
+        current_user.set(user)
         
         return await call_next(request)
 
@@ -243,6 +247,10 @@ def rbac_protect(
     This decorator can be used to add protection to individual routes
     without relying on the middleware's automatic pattern matching.
     """
+    # Convert string roles/permissions to enums once, at decoration time
+    roles = [_ROLE_BY_VALUE[role] if isinstance(role, str) else role for role in required_roles or ()]
+    permissions = [_PERMISSION_BY_VALUE[perm] if isinstance(perm, str) else perm for perm in required_permissions or ()]
+
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -257,25 +265,8 @@ def rbac_protect(
                 # If no request found, call the original function
                 return await func(*args, **kwargs)
             
-            # Convert string roles/permissions to enums
-            roles = []
-            if required_roles:
-                for role in required_roles:
-                    if isinstance(role, str):
-                        roles.append(UserRole(role))
-                    else:
-                        roles.append(role)
-            
-            permissions = []
-            if required_permissions:
-                for perm in required_permissions:
-                    if isinstance(perm, str):
-                        permissions.append(Permission(perm))
-                    else:
-                        permissions.append(perm)
-            
             # Get current user
-            user = await get_current_user_optional(request)
+            user = await get_current_user_optional(request.headers.get("authorization"), None)
             
             if not user and not allow_anonymous:
                 raise HTTPException(
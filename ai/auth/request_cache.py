@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+# Per-request memo of authorization-related calls (token validation, rate-limit
+# checks). Bound by RequestCacheMiddleware; outside a request nothing is cached.
+_cache: ContextVar[Optional[Dict[Any, Any]]] = ContextVar("authz_cache", default=None)
+
+
+def begin_request() -> Any:
+    """Start a fresh request-scoped cache; returns the token for end_request."""
+    return _cache.set({})
+
+
+def end_request(token: Any) -> None:
+    _cache.reset(token)
+
+
+def token_hash(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+def request_memoize(key_fn: Callable[..., Any]) -> Callable:
+    """Memoize an async function for the current request.
+
+    `key_fn` receives the same arguments as the wrapped function and returns a
+    hashable key. Concurrent calls with the same key share one in-flight call;
+    failures are not cached.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache = _cache.get()
+            if cache is None:
+                return await func(*args, **kwargs)
+
+            key = key_fn(*args, **kwargs)
+            future = cache.get(key)
+            if future is None:
+                future = asyncio.ensure_future(func(*args, **kwargs))
+                cache[key] = future
+            try:
+                return await asyncio.shield(future)
+            except Exception:
+                cache.pop(key, None)
+                raise
+        return wrapper
+    return decorator
+
+
+class RequestCacheMiddleware:
+    """ASGI middleware that binds a fresh request-scoped cache to every HTTP request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = begin_request()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end_request(token)
@@ -1,16 +1,25 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+import hmac
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Optional
 from datetime import datetime, timezone, timedelta
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, select, update, bindparam, Column, Integer, BigInteger, String, DateTime, Boolean
+from sqlalchemy.orm import sessionmaker, declarative_base, validates
 from sqlalchemy.exc import IntegrityError
-from passlib.context import CryptContext
 from jose import jwt
+import numpy as np
 
-from .models import UserRole, Permission, TokenPayload
+from cache.ttl_cache import TTLCache
+
+from .models import UserRole, Permission, TokenPayload, RolePermissions, ROLE_MASK, ROLE_BIT, PERMISSION_BIT
+from .passwords import hash_password, verify_password, needs_rehash, get_hash_pool
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
@@ -24,68 +33,292 @@ class DBUser(Base):
     username = Column(String, unique=True, index=True, nullable=True)
     hashed_password = Column(String, nullable=False)
     roles = Column(String, default=UserRole.STUDENT.value) # Stored as comma-separated string
+    # Same roles as ROLE_BIT bits; kept in sync with `roles` on every ORM write
+    # (bulk or raw-SQL edits of roles need scripts/migrate_roles_mask.py)
+    roles_mask = Column(BigInteger, default=ROLE_BIT[UserRole.STUDENT])
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    @validates("roles")
+    def _sync_roles_mask(self, key, roles):
+        self.roles_mask = roles_mask_from_csv(roles or "")
+        return roles
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+_ROLE_VALUES = frozenset(role.value for role in UserRole)
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    """Immutable snapshot of a users row; safe to cache and share across sessions."""
+    id: int
+    email: str
+    username: Optional[str]
+    hashed_password: str = field(repr=False)
+    roles: Optional[str]
+    roles_mask: Optional[int]
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, db_user: DBUser) -> "UserRecord":
+        return cls(
+            id=db_user.id,
+            email=db_user.email,
+            username=db_user.username,
+            hashed_password=db_user.hashed_password,
+            roles=db_user.roles,
+            roles_mask=db_user.roles_mask,
+            is_active=db_user.is_active,
+        )
+
+
+# Users found by email/username, cached briefly; cleared on any write through UserService
+USER_LOOKUP_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_LOOKUP_CACHE_TTL_SECONDS", "30"))
+_USER_LOOKUP_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_LOOKUP_CACHE_MAX_ENTRIES", "10000"))
+_user_by_email = TTLCache(_USER_LOOKUP_CACHE_MAX_ENTRIES)
+_user_by_username = TTLCache(_USER_LOOKUP_CACHE_MAX_ENTRIES)
+
+
+# Per-user permission masks used by batch_authorize are rebuilt at least this often, so
+# users registered by other workers and roles changed outside this process show up
+USER_MASK_TTL_SECONDS = float(os.getenv("AUTH_USER_MASK_TTL_SECONDS", "30"))
+
+
+# bcrypt verification and JWT decoding are cached briefly so repeated logins and
+# token checks skip the crypto. Passwords are keyed by an HMAC under a per-process
+# random key, so neither the password nor an unsalted hash of it is held in memory.
+CRYPTO_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CRYPTO_CACHE_TTL_SECONDS", "60"))
+_CRYPTO_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CRYPTO_CACHE_MAX_ENTRIES", "10000"))
+_verify_cache = TTLCache(_CRYPTO_CACHE_MAX_ENTRIES)
+_jwt_cache = TTLCache(_CRYPTO_CACHE_MAX_ENTRIES)
+_verify_cache_key = os.urandom(32)
+
+
+def _password_key(plain_password: str, hashed_password: str) -> tuple[bytes, str]:
+    return hmac.new(_verify_cache_key, plain_password.encode("utf-8"), hashlib.sha256).digest(), hashed_password
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+@lru_cache(maxsize=256)
+def roles_mask_from_csv(roles: str) -> int:
+    """ROLE_BIT mask of a comma-separated role string (unknown roles are ignored)."""
+    mask = 0
+    for role in roles.split(','):
+        if role in _ROLE_VALUES:
+            mask |= ROLE_BIT[UserRole(role)]
+    return mask
+
+
+# Role bit -> permission mask of that role
+_ROLE_PERMS_MASK: dict[int, int] = {ROLE_BIT[role]: ROLE_MASK.get(role, 0) for role in UserRole}
+
+
+@lru_cache(maxsize=64)
+def _mask_for_roles_mask(roles_mask: int) -> int:
+    """Permission bitmask granted by a roles_mask (few distinct values, so cached)."""
+    mask = 0
+    while roles_mask:
+        bit = roles_mask & -roles_mask
+        mask |= _ROLE_PERMS_MASK.get(bit, 0)
+        roles_mask ^= bit
+    return mask
+
+
+@lru_cache(maxsize=64)
+def _permissions_for_roles_mask(roles_mask: int) -> tuple[str, ...]:
+    """Permission names granted by a roles_mask, in a stable order."""
+    mask = _mask_for_roles_mask(roles_mask)
+    return tuple(sorted(p.value for p, bit in PERMISSION_BIT.items() if mask & bit))
+
 class UserService:
+    # Built once; SQLAlchemy's compiled cache then reuses the SQL for every lookup
+    _by_email_stmt = select(DBUser).where(DBUser.email == bindparam("email"))
+    _by_username_stmt = select(DBUser).where(DBUser.username == bindparam("username"))
+    _by_ids_stmt = select(DBUser).where(DBUser.id.in_(bindparam("ids", expanding=True)))
+
     def __init__(self, database_url: str):
-        self.engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        if database_url.startswith("sqlite"):
+            engine_kwargs = {"connect_args": {"check_same_thread": False}}
+        else:
+            engine_kwargs = {
+                "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "20")),
+                "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+                "pool_pre_ping": True,
+            }
+        self.engine = create_engine(database_url, **engine_kwargs)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         Base.metadata.create_all(bind=self.engine)
+        # Role-based permission mask per user, indexed by user id; rebuilt lazily after local
+        # registrations and once it is older than USER_MASK_TTL_SECONDS
+        self._user_mask_array: Optional[np.ndarray] = None
+        self._user_mask_built_at = 0.0
 
     def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+        return hash_password(password)
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        key = _password_key(plain_password, hashed_password)
+        cached = _verify_cache.get(key)
+        if cached is not None:
+            return cached
+        result = verify_password(plain_password, hashed_password)
+        _verify_cache.set(key, result, CRYPTO_CACHE_TTL_SECONDS)
+        return result
+
+    async def ahash_password(self, password: str) -> str:
+        """get_password_hash run in the hash process pool, for async handlers."""
+        return await asyncio.get_running_loop().run_in_executor(get_hash_pool(), hash_password, password)
+
+    async def averify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """verify_password run in the hash process pool on a cache miss, for async handlers."""
+        key = _password_key(plain_password, hashed_password)
+        cached = _verify_cache.get(key)
+        if cached is not None:
+            return cached
+        result = await asyncio.get_running_loop().run_in_executor(
+            get_hash_pool(), verify_password, plain_password, hashed_password
+        )
+        _verify_cache.set(key, result, CRYPTO_CACHE_TTL_SECONDS)
+        return result
+
+    def decode_access_token(self, token: str) -> dict:
+        """Verify and decode a locally issued JWT; raises JWTError like jwt.decode."""
+        key = _token_key(token)
+        payload = _jwt_cache.get(key)
+        if payload is not None:
+            return payload
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Never keep a payload past its own expiry
+        ttl = CRYPTO_CACHE_TTL_SECONDS
+        exp = payload.get("exp")
+        if exp is not None:
+            ttl = min(ttl, float(exp) - time.time())
+        _jwt_cache.set(key, payload, ttl)
+        return payload
+
+    def invalidate_access_token(self, token: str) -> None:
+        _jwt_cache.pop(_token_key(token))
 
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.now(timezone.utc) + expires_delta
-        else:
-            expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire.timestamp(), "iat": datetime.now(timezone.utc).timestamp()})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-        return encoded_jwt
+        now = int(time.time())
+        lifetime = int(expires_delta.total_seconds()) if expires_delta else ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        to_encode = {**data, "exp": now + lifetime, "iat": now}
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-    def get_user_by_email(self, email: str) -> Optional[DBUser]:
+    def get_user_by_email(self, email: str) -> Optional[UserRecord]:
+        record = _user_by_email.get(email)
+        if record is None:
+            with self.SessionLocal() as session:
+                db_user = session.execute(self._by_email_stmt, {"email": email}).scalars().first()
+            if db_user is None:
+                return None
+            record = self._remember_user(db_user)
+        return record
+
+    def get_user_by_username(self, username: str) -> Optional[UserRecord]:
+        record = _user_by_username.get(username)
+        if record is None:
+            with self.SessionLocal() as session:
+                db_user = session.execute(self._by_username_stmt, {"username": username}).scalars().first()
+            if db_user is None:
+                return None
+            record = self._remember_user(db_user)
+        return record
+
+    @staticmethod
+    def _remember_user(db_user: DBUser) -> UserRecord:
+        record = UserRecord.from_row(db_user)
+        _user_by_email.set(record.email, record, USER_LOOKUP_CACHE_TTL_SECONDS)
+        if record.username:
+            _user_by_username.set(record.username, record, USER_LOOKUP_CACHE_TTL_SECONDS)
+        return record
+
+    @staticmethod
+    def _forget_users() -> None:
+        """Drop cached lookups after a write (writes are rare, so everything is dropped)."""
+        _user_by_email.clear()
+        _user_by_username.clear()
+
+    def get_users_by_ids(self, user_ids: Iterable[int]) -> list[DBUser]:
+        """Fetch several users in one query; unknown ids are skipped."""
+        ids = list(dict.fromkeys(user_ids))
+        if not ids:
+            return []
         with self.SessionLocal() as session:
-            return session.query(DBUser).filter(DBUser.email == email).first()
+            return list(session.execute(self._by_ids_stmt, {"ids": ids}).scalars().all())
 
-    def get_user_by_username(self, username: str) -> Optional[DBUser]:
+    def update_password_hash(self, user_id: int, hashed_password: str) -> None:
         with self.SessionLocal() as session:
-            return session.query(DBUser).filter(DBUser.username == username).first()
+            session.execute(update(DBUser).where(DBUser.id == user_id).values(hashed_password=hashed_password))
+            session.commit()
+        self._forget_users()
+
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        return needs_rehash(hashed_password)
 
-    def register_user(self, email: str, password: str, username: Optional[str] = None) -> DBUser:
+    async def arehash_password(self, user_id: int, plain_password: str) -> None:
+        """Store a fresh hash at the current cost after a successful login with an older hash."""
+        hashed_password = await self.ahash_password(plain_password)
+        await asyncio.to_thread(self.update_password_hash, user_id, hashed_password)
+
+    def register_user(
+        self, email: str, password: str, username: Optional[str] = None, hashed_password: Optional[str] = None
+    ) -> DBUser:
+        """Create a user; pass hashed_password when the hash was already computed (e.g. by ahash_password)."""
         with self.SessionLocal() as session:
-            hashed_password = self.get_password_hash(password)
+            if hashed_password is None:
+                hashed_password = self.get_password_hash(password)
             db_user = DBUser(email=email, hashed_password=hashed_password, username=username)
             try:
                 session.add(db_user)
                 session.commit()
                 session.refresh(db_user)
+                self._user_mask_array = None
+                self._forget_users()
                 return db_user
             except IntegrityError:
                 session.rollback()
                 raise ValueError("Email or username already registered")
 
-    def get_user_permissions(self, user: DBUser) -> list[str]:
-        # This is a simplified example. In a real app, you'd fetch permissions based on roles.
-        # For now, let's assume a default set or derive from roles.
-        # If roles are stored as a comma-separated string:
-        user_roles = [UserRole(role) for role in user.roles.split(',') if role in [r.value for r in UserRole]]
-        all_permissions = set()
-        for role in user_roles:
-            all_permissions.update(Permission.get_permissions(role))
-        return [p.value for p in all_permissions]
+    def get_user_permissions(self, user: DBUser | UserRecord) -> list[str]:
+        roles_mask = user.roles_mask
+        if roles_mask is None:
+            roles_mask = roles_mask_from_csv(user.roles or "")
+        return list(_permissions_for_roles_mask(roles_mask))
+
+    def _user_masks(self) -> np.ndarray:
+        masks = self._user_mask_array
+        if masks is None or time.monotonic() - self._user_mask_built_at >= USER_MASK_TTL_SECONDS:
+            with self.SessionLocal() as session:
+                rows = session.execute(select(DBUser.id, DBUser.roles_mask, DBUser.roles)).all()
+            masks = np.zeros(max((row[0] for row in rows), default=-1) + 1, dtype=np.uint64)
+            for user_id, roles_mask, roles in rows:
+                if roles_mask is None:
+                    roles_mask = roles_mask_from_csv(roles or "")
+                masks[user_id] = _mask_for_roles_mask(roles_mask)
+            self._user_mask_array = masks
+            self._user_mask_built_at = time.monotonic()
+        return masks
+
+    def batch_authorize(self, user_ids: Iterable[int], permission: Permission) -> np.ndarray:
+        """
+        Boolean array: whether each user holds `permission` through their roles (unknown ids are False).
+
+        Answers come from a snapshot of all users' roles that can lag other workers'
+        registrations and out-of-process role edits by up to USER_MASK_TTL_SECONDS.
+        """
+        masks = self._user_masks()
+        ids = np.fromiter(user_ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < masks.size)
+        allowed = np.zeros(ids.shape, dtype=bool)
+        allowed[known] = RolePermissions.batch_check(masks[ids[known]], permission)
+        return allowed
 
 user_service_singleton = UserService(DATABASE_URL)
@@ -0,0 +1,85 @@
+import numpy as np
+
+# Optional Numba dependency; fall back to a NumPy matrix-vector product
+try:
+    from numba import njit, prange  # type: ignore
+except Exception:  # pragma: no cover
+    njit = None  # type: ignore
+    prange = range  # type: ignore
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores(cache: np.ndarray, q: np.ndarray, out: np.ndarray) -> None:
+        n, d = cache.shape
+        for i in prange(n):
+            s = np.float32(0.0)
+            for j in range(d):
+                s += cache[i, j] * q[j]
+            out[i] = s
+
+    @njit(parallel=True, cache=True)
+    def _int8_dot_scores(cache: np.ndarray, scales: np.ndarray, q: np.ndarray, out: np.ndarray) -> None:
+        n, d = cache.shape
+        for i in prange(n):
+            s = np.int32(0)
+            for j in range(d):
+                s += np.int32(cache[i, j]) * np.int32(q[j])
+            out[i] = s * scales[i]
+else:
+    _dot_scores = None
+    _int8_dot_scores = None
+
+
+def cosine_scores(cache: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Score every row of `cache` against `q`.
+
+    Both inputs must already be L2-normalized, so the dot product equals the
+    cosine similarity.
+
+    Args:
+        cache: Contiguous float32 matrix of shape (N, d)
+        q: float32 query vector of shape (d,)
+
+    Returns:
+        float32 array of shape (N,) with one score per row
+    """
+    if _dot_scores is None:
+        return cache @ q
+    cache = np.ascontiguousarray(cache, dtype=np.float32)
+    q = np.ascontiguousarray(q, dtype=np.float32)
+    out = np.empty(cache.shape[0], dtype=np.float32)
+    _dot_scores(cache, q, out)
+    return out
+
+
+def quantize_int8(vector: np.ndarray) -> tuple[np.ndarray, float]:
+    """Symmetric per-vector int8 quantization; returns (codes, scale) with vector ≈ codes * scale."""
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = peak / 127.0 if peak > 0 else 1.0
+    codes = np.round(vector / scale).astype(np.int8)
+    return codes, scale
+
+
+def int8_scores(cache: np.ndarray, scales: np.ndarray, q: np.ndarray, q_scale: float) -> np.ndarray:
+    """
+    Approximate dot products between int8-quantized rows and an int8 query.
+
+    Args:
+        cache: Contiguous int8 matrix of shape (N, d)
+        scales: float32 per-row scales of shape (N,)
+        q: int8 query codes of shape (d,)
+        q_scale: Scale of the query codes
+
+    Returns:
+        float32 array of shape (N,) with one score per row
+    """
+    if _int8_dot_scores is None:
+        raw = cache.astype(np.int32) @ q.astype(np.int32)
+        return (raw * scales * q_scale).astype(np.float32)
+    cache = np.ascontiguousarray(cache, dtype=np.int8)
+    q = np.ascontiguousarray(q, dtype=np.int8)
+    out = np.empty(cache.shape[0], dtype=np.float32)
+    _int8_dot_scores(cache, np.ascontiguousarray(scales, dtype=np.float32), q, out)
+    return out * np.float32(q_scale)
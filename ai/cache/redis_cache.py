@@ -1,12 +1,14 @@
 import os
 import json
 import hashlib
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 
 from redis import asyncio as aioredis
 
 
 _redis_client: Optional[aioredis.Redis] = None
+# Same server, but returns raw bytes (for binary payloads such as embeddings)
+_redis_bytes_client: Optional[aioredis.Redis] = None
 
 
 def _get_ttl_seconds() -> int:
@@ -16,8 +18,7 @@ def _get_ttl_seconds() -> int:
         return 600
 
 
-def get_redis_client() -> Optional[aioredis.Redis]:
-    global _redis_client
+def _get_redis_url() -> Optional[str]:
     redis_url = os.getenv("REDIS_URL") or os.getenv("REDIS_HOST")
     if not redis_url:
         return None
@@ -31,12 +32,29 @@ def get_redis_client() -> Optional[aioredis.Redis]:
         scheme = "rediss" if os.getenv("REDIS_TLS", "false").lower() in {"1", "true", "yes"} else "redis"
         auth = f":{password}@" if password else ""
         redis_url = f"{scheme}://{auth}{host}:{port}/{db}"
+    return redis_url
+
 
+def get_redis_client() -> Optional[aioredis.Redis]:
+    global _redis_client
+    redis_url = _get_redis_url()
+    if not redis_url:
+        return None
     if _redis_client is None:
         _redis_client = aioredis.from_url(redis_url, decode_responses=True)
     return _redis_client
 
 
+def get_redis_bytes_client() -> Optional[aioredis.Redis]:
+    global _redis_bytes_client
+    redis_url = _get_redis_url()
+    if not redis_url:
+        return None
+    if _redis_bytes_client is None:
+        _redis_bytes_client = aioredis.from_url(redis_url, decode_responses=False)
+    return _redis_bytes_client
+
+
 def make_cache_key(prefix: str, *parts: Any) -> str:
     hasher = hashlib.sha256()
     for part in parts:
@@ -82,5 +100,35 @@ async def cache_set_json(key: str, value: Any, ttl_seconds: Optional[int] = None
     await cache_set_text(key, payload, ttl_seconds)
 
 
+async def cache_get_bytes(key: str) -> Optional[bytes]:
+    client = get_redis_bytes_client()
+    if not client:
+        return None
+    return await client.get(key)
 
 
+async def cache_set_bytes(key: str, value: bytes, ttl_seconds: Optional[int] = None) -> None:
+    client = get_redis_bytes_client()
+    if not client:
+        return
+    await client.set(key, value, ex=ttl_seconds or _get_ttl_seconds())
+
+
+async def cache_mget_bytes(keys: List[str]) -> List[Optional[bytes]]:
+    """Fetch several binary values in one MGET; missing entries are None."""
+    client = get_redis_bytes_client()
+    if not client or not keys:
+        return [None] * len(keys)
+    return list(await client.mget(keys))
+
+
+async def cache_mset_bytes(items: Dict[str, bytes], ttl_seconds: Optional[int] = None) -> None:
+    """Store several binary values with a TTL in one pipelined round trip."""
+    client = get_redis_bytes_client()
+    if not client or not items:
+        return
+    ttl = ttl_seconds or _get_ttl_seconds()
+    pipe = client.pipeline(transaction=False)
+    for key, value in items.items():
+        pipe.set(key, value, ex=ttl)
+    await pipe.execute()
@@ -0,0 +1,313 @@
+import os
+import time
+import bisect
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Optional FAISS dependency; fall back to a linear scan when unavailable
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None  # type: ignore
+
+# Optional scikit-learn dependency for PCA dimensionality reduction
+try:
+    from sklearn.decomposition import PCA  # type: ignore
+except Exception:  # pragma: no cover
+    PCA = None  # type: ignore
+
+from cache.cache_similarity import cosine_scores, int8_scores, quantize_int8
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name: str, default: str = "true") -> bool:
+    return os.getenv(name, default).lower() in {"1", "true", "yes"}
+
+
+class _Namespace:
+    """Vectors and responses cached under one namespace (e.g. a tool set)."""
+
+    __slots__ = ("vectors", "scales", "responses", "created_at", "start", "index", "matrix", "scale_array", "pca")
+
+    def __init__(self) -> None:
+        # Entries before `start` are evicted but still in the index until the next compaction
+        self.start = 0
+        self.vectors: List[np.ndarray] = []
+        self.scales: List[float] = []  # Per-vector scales when stored as int8
+        self.scale_array: Optional[np.ndarray] = None
+        self.responses: List[Any] = []
+        self.created_at: List[float] = []
+        self.index = None
+        self.matrix: Optional[np.ndarray] = None
+        self.pca = None
+
+
+class SemanticCache:
+    """
+    Response cache keyed by query embeddings.
+
+    A lookup embeds the query, L2-normalizes it and returns the response stored
+    for the nearest cached query when their cosine similarity is at least
+    `threshold`. Entries expire after `ttl_seconds` and each namespace keeps at
+    most `max_entries` entries (oldest evicted first). At most
+    SEMANTIC_CACHE_MAX_NAMESPACES namespaces are kept, least recently used
+    dropped first.
+
+    Entries are stored in insertion order, so evicted entries always form a
+    prefix: eviction just moves a marker past them and searches skip them. The
+    namespace is compacted (and its index rebuilt) only once the evicted share
+    exceeds SEMANTIC_CACHE_COMPACT_RATIO.
+
+    With FAISS installed each namespace is searched through an HNSW graph
+    (SEMANTIC_CACHE_INDEX=hnsw, the default) or an exact flat index
+    (SEMANTIC_CACHE_INDEX=flat). When SEMANTIC_CACHE_PCA_COMPONENTS is set and
+    scikit-learn is available, a namespace fits a PCA projection once it holds
+    enough vectors and stores reduced vectors from then on.
+
+    SEMANTIC_CACHE_QUANTIZATION=int8 stores vectors as int8 codes with a
+    per-vector scale (4x smaller than float32) and scores them with an int8
+    dot product instead of a FAISS index, so accuracy can be compared against
+    the default float32 path.
+    """
+
+    def __init__(
+        self,
+        embedding_service=None,
+        threshold: Optional[float] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        model: Optional[str] = None,
+    ):
+        self.embedding_service = embedding_service  # Injected
+        self.enabled = _env_flag("SEMANTIC_CACHE_ENABLED")
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+        self.model = model or os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+        self.index_type = os.getenv("SEMANTIC_CACHE_INDEX", "hnsw").lower()
+        self.hnsw_m = int(os.getenv("SEMANTIC_CACHE_HNSW_M", "32"))
+        self.hnsw_ef_construction = int(os.getenv("SEMANTIC_CACHE_HNSW_EF_CONSTRUCTION", "200"))
+        self.hnsw_ef_search = int(os.getenv("SEMANTIC_CACHE_HNSW_EF_SEARCH", "64"))
+        self.pca_components = int(os.getenv("SEMANTIC_CACHE_PCA_COMPONENTS", "0"))
+        self.quantization = os.getenv("SEMANTIC_CACHE_QUANTIZATION", "none").lower()
+        self.compact_ratio = float(os.getenv("SEMANTIC_CACHE_COMPACT_RATIO", "0.25"))
+        self.max_namespaces = int(os.getenv("SEMANTIC_CACHE_MAX_NAMESPACES", "1024"))
+        # Least recently used first
+        self._namespaces: "OrderedDict[str, _Namespace]" = OrderedDict()
+        self.cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def set_embedding_service(self, embedding_service) -> None:
+        self.embedding_service = embedding_service
+
+    async def _embed(self, query: str) -> np.ndarray:
+        if not self.embedding_service:
+            raise Exception("Embedding service not initialized")
+        embedding = await self.embedding_service.generate_embedding(query, self.model)
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+    def _project(self, ns: _Namespace, vector: np.ndarray) -> np.ndarray:
+        """Map a full-size query vector into the namespace's search space."""
+        if ns.pca is None:
+            return vector
+        return self._normalize_rows(ns.pca.transform(vector.reshape(1, -1)))[0]
+
+    def _maybe_fit_pca(self, ns: _Namespace) -> None:
+        """Fit the PCA projection once a namespace holds enough samples."""
+        if ns.pca is not None or PCA is None or self.pca_components <= 0:
+            return
+        if len(ns.vectors) - ns.start < self.pca_components or ns.vectors[0].shape[0] <= self.pca_components:
+            return
+        self._drop_evicted(ns)
+        pca = PCA(n_components=self.pca_components)
+        reduced = self._normalize_rows(pca.fit_transform(self._dequantize(ns)))
+        ns.vectors, ns.scales = [], []
+        for vector in reduced:
+            self._append_vector(ns, vector)
+        ns.pca = pca
+        self._rebuild(ns)
+
+    def _append_vector(self, ns: _Namespace, vector: np.ndarray) -> None:
+        if self.quantization == "int8":
+            codes, scale = quantize_int8(vector)
+            ns.vectors.append(codes)
+            ns.scales.append(scale)
+        else:
+            ns.vectors.append(vector)
+
+    def _dequantize(self, ns: _Namespace) -> np.ndarray:
+        matrix = np.vstack(ns.vectors).astype(np.float32)
+        if self.quantization == "int8":
+            matrix *= np.asarray(ns.scales, dtype=np.float32)[:, None]
+        return matrix
+
+    def _new_index(self, dim: int):
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(dim)
+        index = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.hnsw_ef_construction
+        index.hnsw.efSearch = self.hnsw_ef_search
+        return index
+
+    def _rebuild(self, ns: _Namespace) -> None:
+        """Rebuild the search structures of a namespace after inserts or evictions."""
+        ns.index = None
+        if self.quantization == "int8":
+            ns.matrix = np.vstack(ns.vectors) if ns.vectors else None
+            ns.scale_array = np.asarray(ns.scales, dtype=np.float32)
+            return
+        ns.matrix = np.vstack(ns.vectors).astype(np.float32) if ns.vectors else None
+        if faiss is not None and ns.matrix is not None:
+            ns.index = self._new_index(ns.matrix.shape[1])
+            ns.index.add(ns.matrix)
+
+    def _evict(self, ns: _Namespace, now: float) -> None:
+        """Evict expired entries and those beyond max_entries (always the oldest ones)."""
+        start = max(
+            ns.start,
+            bisect.bisect_right(ns.created_at, now - self.ttl_seconds),
+            len(ns.created_at) - self.max_entries,
+        )
+        if start == ns.start:
+            return
+        self.cache_stats["evictions"] += start - ns.start
+        ns.start = start
+        if start > len(ns.created_at) * self.compact_ratio:
+            self._drop_evicted(ns)
+            self._rebuild(ns)
+
+    @staticmethod
+    def _drop_evicted(ns: _Namespace) -> None:
+        start, ns.start = ns.start, 0
+        del ns.vectors[:start]
+        del ns.scales[:start]
+        del ns.responses[:start]
+        del ns.created_at[:start]
+
+    def _search(self, ns: _Namespace, vector: np.ndarray) -> tuple[int, float]:
+        if ns.index is not None:
+            query = vector.reshape(1, -1)
+            # The start + 1 nearest neighbours always include a live entry; try a few first
+            limit = min(ns.index.ntotal, ns.start + 1)
+            k = min(limit, 8)
+            while True:
+                scores, ids = ns.index.search(query, k)
+                for score, idx in zip(scores[0], ids[0]):
+                    if idx >= ns.start:
+                        return int(idx), float(score)
+                if k >= limit:
+                    return -1, 0.0
+                k = limit
+        if self.quantization == "int8":
+            codes, scale = quantize_int8(vector)
+            scores = int8_scores(ns.matrix[ns.start:], ns.scale_array[ns.start:], codes, scale)
+        else:
+            scores = cosine_scores(ns.matrix[ns.start:], vector)
+        best = int(np.argmax(scores))
+        return best + ns.start, float(scores[best])
+
+    async def lookup(self, query: str, namespace: str = "default") -> Optional[Any]:
+        """
+        Return the cached response for a semantically equivalent query.
+
+        Args:
+            query: Incoming query text
+            namespace: Cache partition the lookup is restricted to
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        ns = self._namespaces.get(namespace)
+        if ns is None or ns.start >= len(ns.vectors):
+            self.cache_stats["misses"] += 1
+            return None
+        self._namespaces.move_to_end(namespace)
+
+        vector = self._project(ns, await self._embed(query))
+        # A concurrent store or lookup may have evicted everything while we were embedding
+        if ns.start >= len(ns.vectors):
+            self.cache_stats["misses"] += 1
+            return None
+        if ns.index is None and ns.matrix is None:
+            self._rebuild(ns)
+        best, score = self._search(ns, vector)
+        if best < 0 or score < self.threshold:
+            self.cache_stats["misses"] += 1
+            return None
+
+        now = time.time()
+        if now - ns.created_at[best] >= self.ttl_seconds:
+            self._evict(ns, now)
+            self.cache_stats["misses"] += 1
+            return None
+
+        self.cache_stats["hits"] += 1
+        return ns.responses[best]
+
+    async def store(self, query: str, response: Any, namespace: str = "default") -> None:
+        """
+        Cache a response under the embedding of its query.
+
+        Args:
+            query: Query text the response answers
+            response: Response to return on future hits
+            namespace: Cache partition to store into
+        """
+        if not self.enabled:
+            return
+        ns = self._namespace_for_store(namespace)
+        vector = self._project(ns, await self._embed(query))
+        now = time.time()
+        self._append_vector(ns, vector)
+        ns.responses.append(response)
+        ns.created_at.append(now)
+        self.cache_stats["stores"] += 1
+        if ns.index is not None:
+            ns.index.add(vector.reshape(1, -1))
+        else:
+            ns.matrix = None
+        self._evict(ns, now)
+        if ns.pca is None and self.pca_components > 0:
+            self._maybe_fit_pca(ns)
+
+    def _namespace_for_store(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is not None:
+            self._namespaces.move_to_end(namespace)
+            return ns
+        ns = self._namespaces[namespace] = _Namespace()
+        if len(self._namespaces) > self.max_namespaces:
+            _, dropped = self._namespaces.popitem(last=False)
+            self.cache_stats["evictions"] += len(dropped.vectors) - dropped.start
+        return ns
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the number of cached entries."""
+        total = self.cache_stats["hits"] + self.cache_stats["misses"]
+        return {
+            **self.cache_stats,
+            "entries": sum(len(ns.vectors) - ns.start for ns in self._namespaces.values()),
+            "hit_rate": self.cache_stats["hits"] / total if total else 0.0,
+        }
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Clear one namespace or the whole cache."""
+        if namespace:
+            self._namespaces.pop(namespace, None)
+        else:
+            self._namespaces.clear()
@@ -1,22 +1,93 @@
 import os
+import hmac
+import json
+import time
 import asyncio
+import hashlib
 import logging
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 import httpx
 from datetime import datetime
 
+try:
+	import h2  # noqa: F401  (required by httpx for HTTP/2)
+except Exception:
+	h2 = None
+# Optional faster JSON encoder/decoder for request and response bodies
+try:
+	import orjson  # type: ignore
+except Exception:  # pragma: no cover
+	orjson = None  # type: ignore
+
 from .service_discovery import discover_service
+from auth.request_cache import request_memoize, token_hash
+from cache.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Largest batch sent in one bulk request; bigger batches are split and sent concurrently
+BULK_CHUNK_SIZE = int(os.getenv("OUTBOUND_BULK_CHUNK_SIZE", "100"))
+
+# Health probe sent by warmup() so the first request finds an open connection
+_WARMUP_PATH = "/" + os.getenv("OUTBOUND_WARMUP_PATH", "/healthz").lstrip("/")
+_WARMUP_TIMEOUT_SECONDS = float(os.getenv("OUTBOUND_WARMUP_TIMEOUT_SECONDS", "1.0"))
+
+# One pooled client per distinct TLS configuration, shared by every BaseAPIClient
+_CLIENT_BY_TLS: Dict[Tuple[Any, Any], httpx.AsyncClient] = {}
+_HTTP2_REQUESTED = os.getenv("OUTBOUND_HTTP2", "true").lower() in {"1", "true", "yes"}
+_HTTP2_ENABLED = h2 is not None and _HTTP2_REQUESTED
+if _HTTP2_REQUESTED and h2 is None:
+	logger.warning("OUTBOUND_HTTP2 is enabled but the h2 package is missing; REST service clients fall back to HTTP/1.1 (install httpx[http2])")
+# Connection-level retries only (failed connects); requests themselves are never replayed
+_CONNECT_RETRIES = int(os.getenv("OUTBOUND_HTTP_CONNECT_RETRIES", "0"))
+_SHARED_LIMITS = httpx.Limits(
+	max_connections=int(os.getenv("OUTBOUND_HTTP_MAX_CONNECTIONS", "200")),
+	max_keepalive_connections=int(os.getenv("OUTBOUND_HTTP_MAX_KEEPALIVE_CONNECTIONS", "100")),
+)
+
+# Short-lived caches of auth and rate-limit decisions. Denials (bad tokens, wrong
+# passwords, exhausted buckets) are kept longer than successes.
+_NEGATIVE_TTL_SECONDS = float(os.getenv("OUTBOUND_NEGATIVE_CACHE_TTL_SECONDS", "30"))
+_POSITIVE_TTL_SECONDS = float(os.getenv("OUTBOUND_POSITIVE_CACHE_TTL_SECONDS", "5"))
+# Allowed rate-limit decisions are not counted by the gateway while cached, so off by default
+_RATE_LIMIT_ALLOW_TTL_SECONDS = float(os.getenv("OUTBOUND_RATE_LIMIT_ALLOW_TTL_SECONDS", "0"))
+_DECISION_CACHE_MAX_ENTRIES = int(os.getenv("OUTBOUND_DECISION_CACHE_MAX_ENTRIES", "50000"))
+_negative_cache = TTLCache(_DECISION_CACHE_MAX_ENTRIES)
+_positive_cache = TTLCache(_DECISION_CACHE_MAX_ENTRIES)
+_DENIAL_STATUSES = frozenset({401, 403})
+# Failed logins are keyed by an HMAC under a per-process random key, never the password itself
+_password_cache_key = os.urandom(32)
+
+
+def _query_params(**params: Any) -> Dict[str, Any]:
+	"""Query parameters without empty filters (None or ""), so unset filters are not sent"""
+	return {key: value for key, value in params.items() if value is not None and value != ""}
+
+
+def _raise_cached_denial(exc: httpx.HTTPStatusError) -> None:
+	"""Raise a fresh copy of a cached denial so its traceback does not grow on every hit"""
+	raise httpx.HTTPStatusError(str(exc), request=exc.request, response=exc.response)
+
+
+async def aclose_shared_clients() -> None:
+	"""Close every shared HTTP client (call once on application shutdown)"""
+	clients = list(_CLIENT_BY_TLS.values())
+	_CLIENT_BY_TLS.clear()
+	for client in clients:
+		await client.aclose()
+
 
 class BaseAPIClient:
 	def __init__(self, service_name: str, default_env: Optional[str] = None, timeout_seconds: float = 5.0):
 		self.service_name = service_name
 		self.base_url = discover_service(service_name, default_env) or ""
 		self.timeout = timeout_seconds
-		self._client = None
-		self._connection_lock = asyncio.Lock()
+		# Per-call constants, computed once
+		self._base = self.base_url.rstrip("/")
+		self._default_headers = {
+			"User-Agent": f"{service_name}-client/1.0",
+			"Content-Type": "application/json",
+		}
 		
 		# TLS configuration
 		verify_env = os.getenv("OUTBOUND_TLS_VERIFY", "true").lower() in {"1", "true", "yes"}
@@ -33,33 +104,46 @@ class BaseAPIClient:
 		client_key = os.getenv("OUTBOUND_CLIENT_KEY")
 		cert = (client_cert, client_key) if client_cert and client_key else None
 		
-		# Store client configuration for lazy initialization
-		self._client_config = {
-			"timeout": self.timeout,
-			"verify": verify,
-			"cert": cert
-		}
+		self._tls_key = (verify, cert)
 
 	async def _get_client(self) -> httpx.AsyncClient:
-		"""Get or create HTTP client with lazy initialization"""
-		if self._client is None:
-			async with self._connection_lock:
-				if self._client is None:
-					self._client = httpx.AsyncClient(**self._client_config)
-		return self._client
+		"""Get the shared HTTP client for this TLS configuration, creating it on first use"""
+		client = _CLIENT_BY_TLS.get(self._tls_key)
+		if client is None:
+			verify, cert = self._tls_key
+			transport = httpx.AsyncHTTPTransport(
+				verify=verify,
+				cert=cert,
+				http2=_HTTP2_ENABLED,
+				limits=_SHARED_LIMITS,
+				retries=_CONNECT_RETRIES,
+			)
+			client = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+			_CLIENT_BY_TLS[self._tls_key] = client
+		return client
+
+	async def warmup(self) -> None:
+		"""Create the pooled HTTP client and open a connection to the service with a health probe; failures are logged, not raised"""
+		client = await self._get_client()
+		if not self._base:
+			return
+		try:
+			await client.get(f"{self._base}{_WARMUP_PATH}", timeout=_WARMUP_TIMEOUT_SECONDS)
+		except Exception as e:
+			logger.warning(f"{self.service_name} warmup probe failed: {e}")
 
 	async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
-		if not self.base_url:
+		if not self._base:
 			raise RuntimeError(f"Service URL for {self.service_name} not configured")
 		
-		url = self.base_url.rstrip("/") + "/" + path.lstrip("/")
+		url = f"{self._base}/{path.lstrip('/')}"
 		client = await self._get_client()
+		kwargs.setdefault("timeout", self.timeout)
 		
-		# Add default headers
-		headers = kwargs.get("headers", {})
-		headers.setdefault("User-Agent", f"{self.service_name}-client/1.0")
-		headers.setdefault("Content-Type", "application/json")
-		kwargs["headers"] = headers
+		# Add default headers (caller headers win)
+		headers = kwargs.get("headers")
+		kwargs["headers"] = {**self._default_headers, **headers} if headers else dict(self._default_headers)
+		self._json_request(kwargs)
 		
 		try:
 			response = await client.request(method, url, **kwargs)
@@ -72,11 +156,37 @@ class BaseAPIClient:
 			logger.error(f"Request error for {self.service_name}: {e}")
 			raise
 
+	async def _bulk_post(self, path: str, field: str, items: List[str], result_key: str) -> Dict[str, Any]:
+		"""POST items in chunks of BULK_CHUNK_SIZE and merge the keyed results"""
+		items = list(dict.fromkeys(items))
+		if not items:
+			return {}
+		chunks = [items[i:i + BULK_CHUNK_SIZE] for i in range(0, len(items), BULK_CHUNK_SIZE)]
+		responses = await asyncio.gather(*(self._request("POST", path, json={field: chunk}) for chunk in chunks))
+		merged: Dict[str, Any] = {}
+		for resp in responses:
+			merged.update(self._parse(resp).get(result_key, {}))
+		return merged
+
+	@staticmethod
+	def _json_request(kwargs: Dict[str, Any]) -> None:
+		"""Encode a json= body with orjson (httpx falls back to the stdlib encoder otherwise)"""
+		if orjson is None or "json" not in kwargs:
+			return
+		payload = kwargs.pop("json")
+		kwargs["content"] = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+		kwargs["headers"]["Content-Type"] = "application/json"
+
+	@staticmethod
+	def _parse(resp: httpx.Response) -> Any:
+		"""Decode a JSON response body"""
+		if orjson is not None:
+			return orjson.loads(resp.content)
+		return json.loads(resp.content)
+
 	async def aclose(self):
-		"""Close HTTP client"""
-		if self._client is not None:
-			await self._client.aclose()
-			self._client = None
+		"""Close the shared HTTP clients (they are shared, so this closes them for every service client)"""
+		await aclose_shared_clients()
 
 
 class UserServiceClient(BaseAPIClient):
@@ -86,7 +196,11 @@ class UserServiceClient(BaseAPIClient):
 	async def get_user(self, user_id: str) -> Dict[str, Any]:
 		"""Get user by ID"""
 		resp = await self._request("GET", f"/users/{user_id}")
-		return resp.json()
+		return self._parse(resp)
+
+	async def get_users_bulk(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+		"""Get several users by ID in one round-trip per chunk, keyed by ID (missing IDs are absent)"""
+		return await self._bulk_post("/users:batchGet", "ids", ids, "users")
 
 	async def create_user(self, email: str, username: str, password: str, 
 						 first_name: str = "", last_name: str = "", 
@@ -102,12 +216,12 @@ class UserServiceClient(BaseAPIClient):
 			"metadata": metadata or {}
 		}
 		resp = await self._request("POST", "/users", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def update_user(self, user_id: str, **kwargs) -> Dict[str, Any]:
 		"""Update user information"""
 		resp = await self._request("PUT", f"/users/{user_id}", json=kwargs)
-		return resp.json()
+		return self._parse(resp)
 
 	async def delete_user(self, user_id: str) -> bool:
 		"""Delete a user"""
@@ -118,46 +232,70 @@ class UserServiceClient(BaseAPIClient):
 						filter_str: str = "", sort_by: str = "created_at", 
 						sort_desc: bool = True) -> Dict[str, Any]:
 		"""List users with pagination"""
-		params = {
-			"page": page,
-			"page_size": page_size,
-			"filter": filter_str,
-			"sort_by": sort_by,
-			"sort_desc": sort_desc
-		}
+		params = _query_params(page=page, page_size=page_size, filter=filter_str,
+							   sort_by=sort_by, sort_desc=sort_desc)
 		resp = await self._request("GET", "/users", params=params)
-		return resp.json()
+		return self._parse(resp)
 
 	async def get_user_profile(self, user_id: str) -> Dict[str, Any]:
 		"""Get user profile with additional data"""
 		resp = await self._request("GET", f"/users/{user_id}/profile")
-		return resp.json()
+		return self._parse(resp)
 
 	async def update_user_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Dict[str, Any]:
 		"""Update user profile"""
 		resp = await self._request("PUT", f"/users/{user_id}/profile", json=profile_data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def authenticate_user(self, email: str, password: str) -> Dict[str, Any]:
-		"""Authenticate user and get tokens"""
+		"""Authenticate user and get tokens (repeated failures are answered from a short negative cache)"""
+		key = ("authenticate_user", email, hmac.new(_password_cache_key, password.encode("utf-8"), hashlib.sha256).digest())
+		denial = _negative_cache.get(key)
+		if denial is not None:
+			_raise_cached_denial(denial)
 		data = {"email": email, "password": password}
-		resp = await self._request("POST", "/auth/login", json=data)
-		return resp.json()
+		try:
+			resp = await self._request("POST", "/auth/login", json=data)
+		except httpx.HTTPStatusError as e:
+			if e.response.status_code in _DENIAL_STATUSES:
+				_negative_cache.set(key, e, _NEGATIVE_TTL_SECONDS)
+			raise
+		return self._parse(resp)
 
+	@request_memoize(lambda self, token: ("validate_token", token_hash(token)))
 	async def validate_token(self, token: str) -> Dict[str, Any]:
-		"""Validate JWT token"""
+		"""Validate JWT token (results are cached briefly, rejections a little longer)"""
+		key = ("validate_token", token_hash(token))
+		denial = _negative_cache.get(key)
+		if denial is not None:
+			_raise_cached_denial(denial)
+		cached = _positive_cache.get(key)
+		if cached is not None:
+			return cached
 		headers = {"Authorization": f"Bearer {token}"}
-		resp = await self._request("POST", "/auth/validate", headers=headers)
-		return resp.json()
+		try:
+			resp = await self._request("POST", "/auth/validate", headers=headers)
+		except httpx.HTTPStatusError as e:
+			if e.response.status_code in _DENIAL_STATUSES:
+				_negative_cache.set(key, e, _NEGATIVE_TTL_SECONDS)
+			raise
+		result = self._parse(resp)
+		_positive_cache.set(key, result, _POSITIVE_TTL_SECONDS)
+		return result
+
+	async def validate_tokens_bulk(self, tokens: List[str]) -> Dict[str, Dict[str, Any]]:
+		"""Validate several JWT tokens in one round-trip per chunk, keyed by token"""
+		return await self._bulk_post("/auth/validate:batch", "tokens", tokens, "results")
 
 	async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
 		"""Refresh access token"""
 		data = {"refresh_token": refresh_token}
 		resp = await self._request("POST", "/auth/refresh", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def revoke_token(self, token: str) -> bool:
 		"""Revoke a token"""
+		_positive_cache.pop(("validate_token", token_hash(token)))
 		headers = {"Authorization": f"Bearer {token}"}
 		resp = await self._request("POST", "/auth/revoke", headers=headers)
 		return resp.status_code == 200
@@ -170,7 +308,11 @@ class QuestionServiceClient(BaseAPIClient):
 	async def get_question(self, question_id: str) -> Dict[str, Any]:
 		"""Get question by ID"""
 		resp = await self._request("GET", f"/questions/{question_id}")
-		return resp.json()
+		return self._parse(resp)
+
+	async def get_questions_bulk(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+		"""Get several questions by ID in one round-trip per chunk, keyed by ID (missing IDs are absent)"""
+		return await self._bulk_post("/questions:batchGet", "ids", ids, "questions")
 
 	async def create_question(self, user_id: str, title: str, content: str,
 							type: str = "general", category: str = "general",
@@ -188,12 +330,12 @@ class QuestionServiceClient(BaseAPIClient):
 			"metadata": metadata or {}
 		}
 		resp = await self._request("POST", "/questions", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def update_question(self, question_id: str, **kwargs) -> Dict[str, Any]:
 		"""Update question"""
 		resp = await self._request("PUT", f"/questions/{question_id}", json=kwargs)
-		return resp.json()
+		return self._parse(resp)
 
 	async def delete_question(self, question_id: str) -> bool:
 		"""Delete a question"""
@@ -205,20 +347,11 @@ class QuestionServiceClient(BaseAPIClient):
 						   tags: List[str] = None, sort_by: str = "created_at",
 						   sort_desc: bool = True) -> Dict[str, Any]:
 		"""List questions with filters"""
-		params = {
-			"page": page,
-			"page_size": page_size,
-			"category": category,
-			"type": type,
-			"difficulty": difficulty,
-			"sort_by": sort_by,
-			"sort_desc": sort_desc
-		}
-		if tags:
-			params["tags"] = ",".join(tags)
-		
+		params = _query_params(page=page, page_size=page_size, category=category, type=type,
+							   difficulty=difficulty, tags=",".join(tags) if tags else None,
+							   sort_by=sort_by, sort_desc=sort_desc)
 		resp = await self._request("GET", "/questions", params=params)
-		return resp.json()
+		return self._parse(resp)
 
 	async def get_user_questions(self, user_id: str, page: int = 1, page_size: int = 10,
 							   sort_by: str = "created_at", sort_desc: bool = True) -> Dict[str, Any]:
@@ -230,28 +363,18 @@ class QuestionServiceClient(BaseAPIClient):
 			"sort_desc": sort_desc
 		}
 		resp = await self._request("GET", f"/users/{user_id}/questions", params=params)
-		return resp.json()
+		return self._parse(resp)
 
 	async def search_questions(self, query: str, page: int = 1, page_size: int = 10,
 							 category: str = "", type: str = "", difficulty: str = "",
 							 tags: List[str] = None, sort_by: str = "created_at",
 							 sort_desc: bool = True) -> Dict[str, Any]:
 		"""Search questions"""
-		params = {
-			"q": query,
-			"page": page,
-			"page_size": page_size,
-			"category": category,
-			"type": type,
-			"difficulty": difficulty,
-			"sort_by": sort_by,
-			"sort_desc": sort_desc
-		}
-		if tags:
-			params["tags"] = ",".join(tags)
-		
+		params = {"q": query, **_query_params(page=page, page_size=page_size, category=category, type=type,
+											  difficulty=difficulty, tags=",".join(tags) if tags else None,
+											  sort_by=sort_by, sort_desc=sort_desc)}
 		resp = await self._request("GET", "/questions/search", params=params)
-		return resp.json()
+		return self._parse(resp)
 
 	async def get_question_answers(self, question_id: str, page: int = 1, page_size: int = 10,
 								 sort_by: str = "created_at", sort_desc: bool = True) -> Dict[str, Any]:
@@ -263,7 +386,7 @@ class QuestionServiceClient(BaseAPIClient):
 			"sort_desc": sort_desc
 		}
 		resp = await self._request("GET", f"/questions/{question_id}/answers", params=params)
-		return resp.json()
+		return self._parse(resp)
 
 	async def create_answer(self, question_id: str, user_id: str, content: str,
 						  metadata: Dict[str, str] = None) -> Dict[str, Any]:
@@ -275,7 +398,7 @@ class QuestionServiceClient(BaseAPIClient):
 			"metadata": metadata or {}
 		}
 		resp = await self._request("POST", f"/questions/{question_id}/answers", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def update_answer(self, answer_id: str, content: str, metadata: Dict[str, str] = None) -> Dict[str, Any]:
 		"""Update an answer"""
@@ -284,7 +407,7 @@ class QuestionServiceClient(BaseAPIClient):
 			"metadata": metadata or {}
 		}
 		resp = await self._request("PUT", f"/answers/{answer_id}", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def delete_answer(self, answer_id: str) -> bool:
 		"""Delete an answer"""
@@ -299,7 +422,7 @@ class APIGatewayClient(BaseAPIClient):
 	async def proxy(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
 		"""Proxy request through API Gateway"""
 		resp = await self._request(method, path, **kwargs)
-		return resp.json()
+		return self._parse(resp)
 
 	async def route_request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
 		"""Route request through API Gateway with routing logic"""
@@ -309,7 +432,7 @@ class APIGatewayClient(BaseAPIClient):
 			**kwargs
 		}
 		resp = await self._request("POST", "/gateway/route", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def validate_request(self, method: str, path: str, user_id: str = "",
 							 user_roles: List[str] = None, user_permissions: List[str] = None) -> Dict[str, Any]:
@@ -322,28 +445,29 @@ class APIGatewayClient(BaseAPIClient):
 			"user_permissions": user_permissions or []
 		}
 		resp = await self._request("POST", "/gateway/validate", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 	async def get_service_health(self, service_name: str) -> Dict[str, Any]:
 		"""Get service health status through API Gateway"""
 		resp = await self._request("GET", f"/gateway/health/{service_name}")
-		return resp.json()
+		return self._parse(resp)
 
 	async def get_service_metrics(self, service_name: str, start_time: Optional[datetime] = None,
 								end_time: Optional[datetime] = None) -> Dict[str, Any]:
 		"""Get service metrics through API Gateway"""
-		params = {}
-		if start_time:
-			params["start_time"] = start_time.isoformat()
-		if end_time:
-			params["end_time"] = end_time.isoformat()
-		
+		params = _query_params(start_time=start_time.isoformat() if start_time else None,
+							   end_time=end_time.isoformat() if end_time else None)
 		resp = await self._request("GET", f"/gateway/metrics/{service_name}", params=params)
-		return resp.json()
+		return self._parse(resp)
 
+	@request_memoize(lambda self, user_id="", api_key="", endpoint="", service_name="": ("rate_limit", user_id, api_key, endpoint, service_name))
 	async def rate_limit_check(self, user_id: str = "", api_key: str = "",
 							 endpoint: str = "", service_name: str = "") -> Dict[str, Any]:
-		"""Check rate limit through API Gateway"""
+		"""Check rate limit through API Gateway (denials are cached until the bucket resets)"""
+		key = ("rate_limit", user_id, api_key, endpoint, service_name)
+		cached = _negative_cache.get(key) or _positive_cache.get(key)
+		if cached is not None:
+			return cached
 		data = {
 			"user_id": user_id,
 			"api_key": api_key,
@@ -351,7 +475,27 @@ class APIGatewayClient(BaseAPIClient):
 			"service_name": service_name
 		}
 		resp = await self._request("POST", "/gateway/rate-limit/check", json=data)
-		return resp.json()
+		result = self._parse(resp)
+		if result.get("is_allowed") is False:
+			ttl = _NEGATIVE_TTL_SECONDS
+			reset_time = result.get("reset_time")
+			if reset_time and float(reset_time) > time.time():
+				ttl = min(ttl, float(reset_time) - time.time())
+			_negative_cache.set(key, result, ttl)
+		elif result.get("is_allowed"):
+			_positive_cache.set(key, result, _RATE_LIMIT_ALLOW_TTL_SECONDS)
+		return result
+
+	async def preflight(self, user_id: str = "", api_key: str = "", endpoint: str = "",
+					  service_name: str = "", method: str = "GET", path: str = "/",
+					  user_roles: List[str] = None, user_permissions: List[str] = None) -> Dict[str, Any]:
+		"""Check rate limit and validate the request; REST has no combined call, so both run concurrently"""
+		rate_limit, validation = await asyncio.gather(
+			self.rate_limit_check(user_id, api_key, endpoint, service_name),
+			self.validate_request(method, path, user_id=user_id,
+								  user_roles=user_roles, user_permissions=user_permissions)
+		)
+		return {"rate_limit": rate_limit, "validation": validation}
 
 	async def load_balance_request(self, service_name: str, request_id: str = "",
 								 request_context: Dict[str, str] = None) -> Dict[str, Any]:
@@ -362,7 +506,7 @@ class APIGatewayClient(BaseAPIClient):
 			"request_context": request_context or {}
 		}
 		resp = await self._request("POST", "/gateway/load-balance", json=data)
-		return resp.json()
+		return self._parse(resp)
 
 
 
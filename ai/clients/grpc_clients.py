@@ -45,6 +45,8 @@ class BaseGRPCClient:
 
 	async def connect(self):
 		"""Establish gRPC connection"""
+		if self._connected:
+			return
 		if grpc is None:
 			raise RuntimeError("gRPC not available in this environment")
 		
@@ -92,6 +94,13 @@ class BaseGRPCClient:
 				logger.error(f"Failed to connect to {self.service_name} gRPC service: {e}")
 				raise
 
+	async def warmup(self) -> None:
+		"""Open the channel ahead of the first request; failures are logged, not raised"""
+		try:
+			await self.connect()
+		except Exception as e:
+			logger.warning(f"{self.service_name} gRPC warmup failed: {e}")
+
 	async def aclose(self):
 		"""Close gRPC connection"""
 		if self._channel is not None:
@@ -652,5 +661,60 @@ class APIGatewayGRPCClient(BaseGRPCClient):
 			logger.error(f"Error checking rate limit: {e}")
 			raise
 
+	async def preflight(self, user_id: str = "", api_key: str = "", endpoint: str = "",
+					  service_name: str = "", method: str = "GET", path: str = "/",
+					  user_roles: List[str] = None, user_permissions: List[str] = None) -> Dict[str, Any]:
+		"""Check rate limit and validate the request in a single round trip"""
+		try:
+			stub = await self._get_stub()
+			request = api_gateway_pb2.PreflightRequest(
+				rate_limit=api_gateway_pb2.RateLimitCheckRequest(
+					user_id=user_id,
+					api_key=api_key,
+					endpoint=endpoint,
+					service_name=service_name
+				),
+				validation=api_gateway_pb2.ValidateRequestMessage(
+					method=method,
+					path=path,
+					user_id=user_id,
+					user_roles=user_roles or [],
+					user_permissions=user_permissions or []
+				)
+			)
+			try:
+				response = await stub.Preflight(request)
+			except aio.AioRpcError as e:
+				if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+					raise
+				# Gateway predates Preflight: issue both RPCs concurrently instead
+				rate_limit, validation = await asyncio.gather(
+					self.rate_limit_check(user_id, api_key, endpoint, service_name),
+					self.validate_request(method, path, user_id=user_id,
+										  user_roles=user_roles, user_permissions=user_permissions)
+				)
+				return {"rate_limit": rate_limit, "validation": validation}
+			
+			return {
+				"rate_limit": {
+					"success": response.rate_limit.success,
+					"message": response.rate_limit.message,
+					"is_allowed": response.rate_limit.is_allowed,
+					"remaining_requests": response.rate_limit.remaining_requests,
+					"reset_time": response.rate_limit.reset_time,
+					"limit": response.rate_limit.limit
+				},
+				"validation": {
+					"success": response.validation.success,
+					"message": response.validation.message,
+					"is_authorized": response.validation.is_authorized,
+					"required_permissions": list(response.validation.required_permissions),
+					"missing_permissions": list(response.validation.missing_permissions)
+				}
+			}
+		except Exception as e:
+			logger.error(f"Error running preflight: {e}")
+			raise
+
 
 
@@ -1,167 +1,226 @@
 import os
+import json
+import time
+import base64
 import asyncio
 import logging
-from typing import Optional, Dict, List, Any
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Dict, List, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=256)
+def _etcd_key(service_name: str) -> str:
+    """etcd v3 JSON API key for a service (keys and values are base64-encoded)"""
+    return base64.b64encode(f"/services/{service_name}".encode()).decode()
+
+
+@dataclass(frozen=True)
+class _SDConfig:
+    """Service discovery settings, read from the environment once"""
+    cache_ttl: int
+    cache_max: int
+    istio_enabled: bool
+    istio_namespace: str
+    cluster_domain: str
+    consul_host: Optional[str]
+    consul_port: str
+    consul_token: Optional[str]
+    consul_timeout: float
+    etcd_host: Optional[str]
+    etcd_port: str
+    etcd_timeout: float
+    max_connections: int
+    max_keepalive_connections: int
+
+    @classmethod
+    def from_env(cls) -> "_SDConfig":
+        return cls(
+            cache_ttl=int(os.getenv("SERVICE_DISCOVERY_CACHE_TTL_SECONDS", "30")),
+            cache_max=int(os.getenv("SERVICE_DISCOVERY_CACHE_MAX", "512")),
+            istio_enabled=os.getenv("USE_ISTIO_DNS", "false").lower() in {"1", "true", "yes"},
+            istio_namespace=os.getenv("ISTIO_NAMESPACE", "default"),
+            cluster_domain=os.getenv("K8S_CLUSTER_DOMAIN", "cluster.local"),
+            consul_host=os.getenv("CONSUL_HOST"),
+            consul_port=os.getenv("CONSUL_PORT", "8500"),
+            consul_token=os.getenv("CONSUL_TOKEN"),
+            consul_timeout=float(os.getenv("CONSUL_HTTP_TIMEOUT_SECONDS", "2")),
+            etcd_host=os.getenv("ETCD_HOST"),
+            etcd_port=os.getenv("ETCD_PORT", "2379"),
+            etcd_timeout=float(os.getenv("ETCD_HTTP_TIMEOUT_SECONDS", "2")),
+            max_connections=int(os.getenv("SERVICE_DISCOVERY_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("SERVICE_DISCOVERY_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        )
+
+
 class ServiceDiscovery:
     """Enhanced service discovery with caching and multiple backends"""
     
     def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._cache_ttl = int(os.getenv("SERVICE_DISCOVERY_CACHE_TTL_SECONDS", "30"))
+        # service name -> (url, monotonic deadline, metadata), least recently used first
+        self._cache: "OrderedDict[str, Tuple[str, float, Dict[str, Any]]]" = OrderedDict()
+        self._cfg = _SDConfig.from_env()
         self._consul_client = None
-        self._istio_enabled = os.getenv("USE_ISTIO_DNS", "false").lower() in {"1", "true", "yes"}
+        # Discovery runs in progress, keyed by lookup arguments
+        self._inflight: Dict[Tuple[str, Optional[str], Optional[Tuple[str, ...]]], asyncio.Future] = {}
+        # Pooled HTTP client for Consul/etcd lookups, bound to the loop that created it
+        self._client = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self):
+        """Get or create the pooled HTTP client used for registry lookups"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            async with self._client_lock:
+                if self._client is None or self._client_loop is not loop:
+                    import httpx
+
+                    self._client = httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_keepalive_connections=self._cfg.max_keepalive_connections,
+                            max_connections=self._cfg.max_connections,
+                        ),
+                    )
+                    self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
         
     def _is_cache_valid(self, service_name: str) -> bool:
         """Check if cached service info is still valid"""
-        if service_name not in self._cache:
-            return False
-        
-        cached_time = self._cache[service_name].get("cached_at")
-        if not cached_time:
-            return False
-        
-        return datetime.now() - cached_time < timedelta(seconds=self._cache_ttl)
+        entry = self._cache.get(service_name)
+        return entry is not None and time.monotonic() < entry[1]
     
     def _cache_service(self, service_name: str, url: str, metadata: Dict[str, Any] = None):
-        """Cache service discovery result"""
-        self._cache[service_name] = {
-            "url": url,
-            "cached_at": datetime.now(),
-            "metadata": metadata or {}
-        }
+        """Cache service discovery result, evicting the least recently used entry when full"""
+        self._cache[service_name] = (url, time.monotonic() + self._cfg.cache_ttl, metadata or {})
+        self._cache.move_to_end(service_name)
+        if len(self._cache) > self._cfg.cache_max:
+            self._cache.popitem(last=False)
     
     def _get_cached_service(self, service_name: str) -> Optional[str]:
         """Get cached service URL if valid"""
-        if self._is_cache_valid(service_name):
-            return self._cache[service_name]["url"]
-        return None
+        entry = self._cache.get(service_name)
+        if entry is None or time.monotonic() >= entry[1]:
+            return None
+        self._cache.move_to_end(service_name)
+        return entry[0]
     
-    async def _discover_consul_service(self, service_name: str) -> Optional[str]:
-        """Discover service using Consul HTTP API"""
-        consul_host = os.getenv("CONSUL_HOST")
-        consul_port = os.getenv("CONSUL_PORT", "8500")
-        consul_token = os.getenv("CONSUL_TOKEN")
+    async def _discover_consul_service(self, service_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Discover service using Consul HTTP API; returns (url, metadata) without caching it"""
+        cfg = self._cfg
+        consul_host = cfg.consul_host
+        consul_port = cfg.consul_port
+        consul_token = cfg.consul_token
         
         if not consul_host:
             return None
         
         try:
-            import httpx
-            
             headers = {}
             if consul_token:
                 headers["X-Consul-Token"] = consul_token
             
-            async with httpx.AsyncClient(timeout=float(os.getenv("CONSUL_HTTP_TIMEOUT_SECONDS", "2"))) as client:
-                # Try health check endpoint first
-                url = f"http://{consul_host}:{consul_port}/v1/health/service/{service_name}?passing=true"
-                resp = await client.get(url, headers=headers)
-                
-                if resp.status_code == 200:
-                    services = resp.json()
-                    if services:
-                        # Get the first healthy service
-                        svc = services[0].get("Service", {})
-                        address = svc.get("Address") or "localhost"
-                        port = svc.get("Port") or 80
-                        service_url = f"http://{address}:{port}"
-                        
-                        # Cache the result
-                        self._cache_service(service_name, service_url, {
-                            "discovery_method": "consul_health",
-                            "service_id": svc.get("ID"),
-                            "service_tags": svc.get("Tags", [])
-                        })
-                        
-                        return service_url
-                
-                # Fallback to catalog service
-                url = f"http://{consul_host}:{consul_port}/v1/catalog/service/{service_name}"
-                resp = await client.get(url, headers=headers)
-                
-                if resp.status_code == 200:
-                    services = resp.json()
-                    if services:
-                        svc = services[0]
-                        address = svc.get("ServiceAddress") or svc.get("Address") or "localhost"
-                        port = svc.get("ServicePort") or svc.get("Port") or 80
-                        service_url = f"http://{address}:{port}"
-                        
-                        # Cache the result
-                        self._cache_service(service_name, service_url, {
-                            "discovery_method": "consul_catalog",
-                            "service_id": svc.get("ServiceID"),
-                            "service_tags": svc.get("ServiceTags", [])
-                        })
-                        
-                        return service_url
-                        
+            timeout = cfg.consul_timeout
+            client = await self._get_client()
+            # Try health check endpoint first
+            url = f"http://{consul_host}:{consul_port}/v1/health/service/{service_name}?passing=true"
+            resp = await client.get(url, headers=headers, timeout=timeout)
+            
+            if resp.status_code == 200:
+                services = resp.json()
+                if services:
+                    # Get the first healthy service
+                    svc = services[0].get("Service", {})
+                    address = svc.get("Address") or "localhost"
+                    port = svc.get("Port") or 80
+                    service_url = f"http://{address}:{port}"
+                    return service_url, {
+                        "discovery_method": "consul_health",
+                        "service_id": svc.get("ID"),
+                        "service_tags": svc.get("Tags", [])
+                    }
+            
+            # Fallback to catalog service
+            url = f"http://{consul_host}:{consul_port}/v1/catalog/service/{service_name}"
+            resp = await client.get(url, headers=headers, timeout=timeout)
+            
+            if resp.status_code == 200:
+                services = resp.json()
+                if services:
+                    svc = services[0]
+                    address = svc.get("ServiceAddress") or svc.get("Address") or "localhost"
+                    port = svc.get("ServicePort") or svc.get("Port") or 80
+                    service_url = f"http://{address}:{port}"
+                    return service_url, {
+                        "discovery_method": "consul_catalog",
+                        "service_id": svc.get("ServiceID"),
+                        "service_tags": svc.get("ServiceTags", [])
+                    }
+                    
         except Exception as e:
             logger.warning(f"Consul service discovery failed for {service_name}: {e}")
         
         return None
     
-    async def _discover_istio_service(self, service_name: str) -> Optional[str]:
-        """Discover service using Istio/Kubernetes DNS"""
-        if not self._istio_enabled:
+    async def _discover_istio_service(self, service_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Discover service using Istio/Kubernetes DNS; returns (url, metadata) without caching it"""
+        if not self._cfg.istio_enabled:
             return None
         
-        namespace = os.getenv("ISTIO_NAMESPACE", "default")
-        cluster_domain = os.getenv("K8S_CLUSTER_DOMAIN", "cluster.local")
+        namespace = self._cfg.istio_namespace
+        cluster_domain = self._cfg.cluster_domain
         
         # Standard Kubernetes service DNS
         service_url = f"http://{service_name}.{namespace}.svc.{cluster_domain}"
-        
-        # Cache the result
-        self._cache_service(service_name, service_url, {
+        return service_url, {
             "discovery_method": "istio_dns",
             "namespace": namespace,
             "cluster_domain": cluster_domain
-        })
-        
-        return service_url
+        }
     
-    async def _discover_etcd_service(self, service_name: str) -> Optional[str]:
-        """Discover service using etcd"""
-        etcd_host = os.getenv("ETCD_HOST")
-        etcd_port = os.getenv("ETCD_PORT", "2379")
+    async def _discover_etcd_service(self, service_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Discover service using etcd; returns (url, metadata) without caching it"""
+        cfg = self._cfg
+        etcd_host = cfg.etcd_host
+        etcd_port = cfg.etcd_port
         
         if not etcd_host:
             return None
         
         try:
-            import httpx
+            timeout = cfg.etcd_timeout
+            client = await self._get_client()
+            # etcd v3 API
+            url = f"http://{etcd_host}:{etcd_port}/v3/kv/range"
+            data = {
+                "key": _etcd_key(service_name)
+            }
             
-            async with httpx.AsyncClient(timeout=float(os.getenv("ETCD_HTTP_TIMEOUT_SECONDS", "2"))) as client:
-                # etcd v3 API
-                url = f"http://{etcd_host}:{etcd_port}/v3/kv/range"
-                data = {
-                    "key": f"/services/{service_name}".encode().hex()
-                }
-                
-                resp = await client.post(url, json=data)
-                if resp.status_code == 200:
-                    result = resp.json()
-                    if result.get("kvs"):
-                        # Parse service info from etcd
-                        service_info = result["kvs"][0]["value"]
-                        # Assuming service info is stored as JSON
-                        import json
-                        service_data = json.loads(bytes.fromhex(service_info).decode())
-                        service_url = service_data.get("url")
+            resp = await client.post(url, json=data, timeout=timeout)
+            if resp.status_code == 200:
+                result = resp.json()
+                if result.get("kvs"):
+                    # Parse service info from etcd
+                    service_info = result["kvs"][0]["value"]
+                    # Assuming service info is stored as JSON
+                    service_data = json.loads(base64.b64decode(service_info))
+                    service_url = service_data.get("url")
+                    
+                    if service_url:
+                        return service_url, {
+                            "discovery_method": "etcd",
+                            "service_data": service_data
+                        }
                         
-                        if service_url:
-                            self._cache_service(service_name, service_url, {
-                                "discovery_method": "etcd",
-                                "service_data": service_data
-                            })
-                            return service_url
-                            
         except Exception as e:
             logger.warning(f"etcd service discovery failed for {service_name}: {e}")
         
@@ -190,6 +249,23 @@ class ServiceDiscovery:
             logger.debug(f"Using cached service URL for {service_name}: {cached_url}")
             return cached_url
         
+        # Concurrent misses for the same lookup share one discovery run
+        key = (service_name, default_url_env, tuple(discovery_methods) if discovery_methods is not None else None)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._discover_uncached(service_name, default_url_env, discovery_methods))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller being cancelled does not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def _discover_uncached(
+        self,
+        service_name: str,
+        default_url_env: Optional[str],
+        discovery_methods: Optional[List[str]],
+    ) -> Optional[str]:
+        """Run the discovery chain for a cache miss"""
         # 1) Explicit URL environment variable
         explicit_url = os.getenv(f"{service_name.upper()}_URL")
         if explicit_url:
@@ -200,25 +276,38 @@ class ServiceDiscovery:
         if discovery_methods is None:
             discovery_methods = ["consul", "istio", "etcd"]
         
-        # Try each discovery method
+        # Query every method concurrently, but keep the order as a priority: a method's
+        # result is used (and cached) only once all methods listed before it have come
+        # back empty, so callers never see a lower-priority URL in the meantime
+        discoverers = {
+            "consul": self._discover_consul_service,
+            "istio": self._discover_istio_service,
+            "etcd": self._discover_etcd_service,
+        }
+        tasks = []
         for method in discovery_methods:
-            try:
-                if method == "consul":
-                    url = await self._discover_consul_service(service_name)
-                elif method == "istio":
-                    url = await self._discover_istio_service(service_name)
-                elif method == "etcd":
-                    url = await self._discover_etcd_service(service_name)
-                else:
-                    logger.warning(f"Unknown discovery method: {method}")
+            discover = discoverers.get(method)
+            if discover is None:
+                logger.warning(f"Unknown discovery method: {method}")
+                continue
+            tasks.append((method, asyncio.ensure_future(discover(service_name))))
+        try:
+            for method, task in tasks:
+                try:
+                    found = await task
+                except Exception as e:
+                    logger.warning(f"Service discovery method {method} failed for {service_name}: {e}")
                     continue
                 
-                if url:
+                if found:
+                    url, metadata = found
+                    self._cache_service(service_name, url, metadata)
                     logger.info(f"Discovered {service_name} via {method}: {url}")
                     return url
-                    
-            except Exception as e:
-                logger.warning(f"Service discovery method {method} failed for {service_name}: {e}")
+        finally:
+            for _, task in tasks:
+                if not task.done():
+                    task.cancel()
         
         # 4) Fallback to default URL environment variable
         if default_url_env:
@@ -230,11 +319,15 @@ class ServiceDiscovery:
         logger.error(f"Could not discover service: {service_name}")
         return None
     
+    def reload_config(self):
+        """Re-read settings from the environment (e.g. in tests) and drop cached lookups"""
+        self._cfg = _SDConfig.from_env()
+        self._cache.clear()
+
     def get_service_metadata(self, service_name: str) -> Dict[str, Any]:
         """Get cached service metadata"""
-        if service_name in self._cache:
-            return self._cache[service_name].get("metadata", {})
-        return {}
+        entry = self._cache.get(service_name)
+        return entry[2] if entry is not None else {}
     
     def clear_cache(self, service_name: Optional[str] = None):
         """Clear service discovery cache"""
@@ -277,6 +370,11 @@ def discover_service(
         return _discover_service_sync(service_name, default_url_env, consul_env_prefix, istio_namespace_env)
 
 
+async def aclose_service_discovery() -> None:
+    """Close the global service discovery HTTP client (call on application shutdown)"""
+    await _service_discovery.aclose()
+
+
 async def discover_service_async(
     service_name: str,
     default_url_env: Optional[str] = None,
@@ -296,6 +394,24 @@ async def discover_service_async(
     return await _service_discovery.discover_service_async(service_name, default_url_env, discovery_methods)
 
 
+_sync_session = None
+
+
+def _get_sync_session():
+    """Keep-alive requests session for the sync discovery path, created on first use"""
+    global _sync_session
+    if _sync_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sync_session = session
+    return _sync_session
+
+
 def _discover_service_sync(
     service_name: str,
     default_url_env: Optional[str] = None,
@@ -315,8 +431,7 @@ def _discover_service_sync(
     consul_port = os.getenv(f"{consul_env_prefix}_PORT", "8500")
     if consul_host:
         try:
-            import requests
-            resp = requests.get(
+            resp = _get_sync_session().get(
                 f"http://{consul_host}:{consul_port}/v1/health/service/{service_name}?passing=true",
                 timeout=float(os.getenv("CONSUL_HTTP_TIMEOUT_SECONDS", "2")),
             )
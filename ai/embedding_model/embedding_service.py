@@ -1,18 +1,34 @@
 import os
 import asyncio
-from typing import List, Optional, Union, Dict
+from collections import OrderedDict
+from functools import partial
+from typing import List, Optional, Union, Dict, Tuple
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import torch
 import logging
 from cache.redis_cache import (
     make_cache_key,
-    cache_get_json,
-    cache_set_json,
+    cache_get_bytes,
+    cache_set_bytes,
+    cache_mget_bytes,
+    cache_mset_bytes,
 )
 
 logger = logging.getLogger(__name__)
 
+# Cached embeddings are raw float16 bytes; bump the version if the encoding changes
+_EMBEDDING_CACHE_PREFIX = "emb:f16:v1"
+
+
+def _embedding_to_bytes(embedding) -> bytes:
+    return np.asarray(embedding, dtype=np.float16).tobytes()
+
+
+def _embedding_from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+
 class EmbeddingService:
     """
     Service for generating text embeddings using various embedding models.
@@ -22,6 +38,18 @@ class EmbeddingService:
     def __init__(self):
         self.models = {}
         self.default_model = "all-MiniLM-L6-v2"
+        self.batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self._redis_enabled = os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+        self.device = os.getenv("EMBEDDING_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
+        # Half precision weights on GPU; ignored on CPU where fp16 matmuls are slow
+        self.use_fp16 = os.getenv("EMBEDDING_USE_FP16", "true").lower() in {"1", "true", "yes"}
+        self.normalize_embeddings = os.getenv("EMBEDDING_NORMALIZE", "false").lower() in {"1", "true", "yes"}
+        # Single-text requests arriving within this window are encoded as one batch (0 disables)
+        self.coalesce_window = float(os.getenv("EMBEDDING_COALESCE_WINDOW_MS", "5")) / 1000
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        # Recently used embeddings by cache key, checked before Redis (0 disables)
+        self.inproc_cache_max = int(os.getenv("EMBEDDING_INPROC_CACHE_MAX_ENTRIES", "4096"))
+        self._inproc: "OrderedDict[str, np.ndarray]" = OrderedDict()
         self.available_models = {
             "all-MiniLM-L6-v2": "Sentence Transformers - MiniLM",
             "all-mpnet-base-v2": "Sentence Transformers - MPNet",
@@ -41,14 +69,25 @@ class EmbeddingService:
         if model_name not in self.models:
             try:
                 logger.info(f"Loading model: {model_name}")
-                self.models[model_name] = SentenceTransformer(model_name)
-                logger.info(f"Model {model_name} loaded successfully")
+                model_instance = SentenceTransformer(model_name, device=self.device)
+                if self.use_fp16 and self.device.startswith("cuda"):
+                    model_instance = model_instance.half()
+                self.models[model_name] = model_instance
+                logger.info(f"Model {model_name} loaded successfully on {self.device}")
             except Exception as e:
                 logger.error(f"Error loading model {model_name}: {str(e)}")
                 raise Exception(f"Failed to load model {model_name}: {str(e)}")
         
         return self.models[model_name]
     
+    async def warmup(self) -> None:
+        """Load the default model and run one encode so the first request does not pay for it."""
+        try:
+            model_instance = await self._load_model(self.default_model)
+            await self._encode(model_instance, ["warmup"])
+        except Exception as e:
+            logger.warning(f"Embedding model warmup failed: {str(e)}")
+    
     async def generate_embedding(self, text: str, model: Optional[str] = None) -> np.ndarray:
         """
         Generate embedding for a single text.
@@ -64,31 +103,30 @@ class EmbeddingService:
             model_name = model or self.default_model
             
             # Redis cache (optional)
-            import os
-            if os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}:
-                cache_key = make_cache_key("emb:single", {"text": text, "model": model_name})
-                cached = await cache_get_json(cache_key)
+            if self._redis_enabled:
+                cache_key = make_cache_key(_EMBEDDING_CACHE_PREFIX, {"text": text, "model": model_name})
+                local = self._inproc_get(cache_key)
+                if local is not None:
+                    return local
+                cached = await cache_get_bytes(cache_key)
                 if cached is not None:
-                    return np.array(cached)
+                    return self._inproc_put(cache_key, _embedding_from_bytes(cached))
 
             if model_name == "text-embedding-ada-002":
                 return await self._generate_openai_embedding(text)
             
             # Use sentence transformers
-            model_instance = await self._load_model(model_name)
-            
-            # Run embedding generation in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            embedding = await loop.run_in_executor(
-                None, 
-                model_instance.encode, 
-                text
-            )
+            if self.coalesce_window > 0:
+                embedding = await self._encode_coalesced(model_name, text)
+            else:
+                model_instance = await self._load_model(model_name)
+                embedding = await self._encode(model_instance, text)
             
             # Cache result
-            if os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}:
+            if self._redis_enabled:
+                self._inproc_put(cache_key, embedding)
                 try:
-                    await cache_set_json(cache_key, embedding.tolist())
+                    await cache_set_bytes(cache_key, _embedding_to_bytes(embedding))
                 except Exception:
                     pass
             return embedding
@@ -97,6 +135,55 @@ class EmbeddingService:
             logger.error(f"Error generating embedding: {str(e)}")
             raise Exception(f"Embedding generation failed: {str(e)}")
     
+    async def _encode(self, model_instance: SentenceTransformer, texts: Union[str, List[str]]) -> np.ndarray:
+        """Run model.encode in the thread pool with the service's batch size, normalization and device."""
+        loop = asyncio.get_event_loop()
+        embeddings = await loop.run_in_executor(
+            None,
+            partial(
+                model_instance.encode,
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize_embeddings,
+                show_progress_bar=False,
+            ),
+        )
+        # fp16 models may hand back float16 arrays; callers expect float32
+        return embeddings.astype(np.float32, copy=False)
+    
+    async def _encode_coalesced(self, model_name: str, text: str) -> np.ndarray:
+        """
+        Queue a text for the next batched encode of this model and wait for its embedding.
+        
+        The first queued text schedules a flush after `coalesce_window`, so concurrent
+        single-text calls share one model.encode call.
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(model_name)
+        if pending is None:
+            pending = self._pending[model_name] = []
+            asyncio.ensure_future(self._flush_pending(model_name))
+        pending.append((text, future))
+        return await future
+    
+    async def _flush_pending(self, model_name: str) -> None:
+        """Encode everything queued for a model in one batch and resolve the waiting calls."""
+        await asyncio.sleep(self.coalesce_window)
+        pending = self._pending.pop(model_name, [])
+        try:
+            model_instance = await self._load_model(model_name)
+            unique_texts = list(dict.fromkeys(text for text, _ in pending))
+            embeddings = await self._encode(model_instance, unique_texts)
+            by_text = dict(zip(unique_texts, embeddings))
+            for text, future in pending:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+    
     async def generate_batch_embeddings(self, texts: List[str], model: Optional[str] = None) -> List[np.ndarray]:
         """
         Generate embeddings for multiple texts in batch.
@@ -112,21 +199,26 @@ class EmbeddingService:
             model_name = model or self.default_model
             
             # Prepare cache lookup
-            import os
-            use_cache = os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+            use_cache = self._redis_enabled
             cached_results: Dict[int, np.ndarray] = {}
             missing_indices: List[int] = []
             cache_keys: List[str] = []
             if use_cache:
-                for idx, t in enumerate(texts):
-                    key = make_cache_key("emb:single", {"text": t, "model": model_name})
-                    cache_keys.append(key)
+                cache_keys = [make_cache_key(_EMBEDDING_CACHE_PREFIX, {"text": t, "model": model_name}) for t in texts]
+                remote_indices: List[int] = []
                 for idx, key in enumerate(cache_keys):
-                    cached = await cache_get_json(key)
-                    if cached is not None:
-                        cached_results[idx] = np.array(cached)
+                    local = self._inproc_get(key)
+                    if local is not None:
+                        cached_results[idx] = local
                     else:
-                        missing_indices.append(idx)
+                        remote_indices.append(idx)
+                if remote_indices:
+                    blobs = await cache_mget_bytes([cache_keys[i] for i in remote_indices])
+                    for idx, cached in zip(remote_indices, blobs):
+                        if cached is not None:
+                            cached_results[idx] = self._inproc_put(cache_keys[idx], _embedding_from_bytes(cached))
+                        else:
+                            missing_indices.append(idx)
             else:
                 # When cache disabled, compute all and return
                 if model_name == "text-embedding-ada-002":
@@ -134,13 +226,7 @@ class EmbeddingService:
                     return emb_list
                 # Sentence Transformers path, compute all
                 model_instance = await self._load_model(model_name)
-                loop = asyncio.get_event_loop()
-                embeddings = await loop.run_in_executor(
-                    None,
-                    model_instance.encode,
-                    texts,
-                )
-                return embeddings
+                return await self._encode(model_instance, texts)
 
             # If OpenAI path
             if model_name == "text-embedding-ada-002":
@@ -148,12 +234,8 @@ class EmbeddingService:
                     missing_texts = [texts[i] for i in missing_indices]
                     new_embeddings = await self._generate_openai_batch_embeddings(missing_texts)
                     for i, emb in zip(missing_indices, new_embeddings):
-                        if use_cache:
-                            try:
-                                await cache_set_json(cache_keys[i], emb.tolist())
-                            except Exception:
-                                pass
-                        cached_results[i] = np.array(emb)
+                        cached_results[i] = self._inproc_put(cache_keys[i], np.array(emb))
+                    await self._cache_embeddings(cache_keys, missing_indices, new_embeddings)
                 # Assemble in original order
                 return [cached_results[i] if i in cached_results else np.array([]) for i in range(len(texts))]
 
@@ -161,25 +243,40 @@ class EmbeddingService:
             model_instance = await self._load_model(model_name)
             if missing_indices:
                 missing_texts = [texts[i] for i in missing_indices]
-                loop = asyncio.get_event_loop()
-                new_embeddings = await loop.run_in_executor(
-                    None,
-                    model_instance.encode,
-                    missing_texts,
-                )
+                new_embeddings = await self._encode(model_instance, missing_texts)
                 for i, emb in zip(missing_indices, new_embeddings):
-                    if use_cache:
-                        try:
-                            await cache_set_json(cache_keys[i], emb.tolist())
-                        except Exception:
-                            pass
-                    cached_results[i] = np.array(emb)
+                    cached_results[i] = self._inproc_put(cache_keys[i], np.array(emb))
+                await self._cache_embeddings(cache_keys, missing_indices, new_embeddings)
             return [cached_results[i] if i in cached_results else np.array([]) for i in range(len(texts))]
             
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {str(e)}")
             raise Exception(f"Batch embedding generation failed: {str(e)}")
     
+    def _inproc_get(self, key: str) -> Optional[np.ndarray]:
+        embedding = self._inproc.get(key)
+        if embedding is not None:
+            self._inproc.move_to_end(key)
+        return embedding
+    
+    def _inproc_put(self, key: str, embedding: np.ndarray) -> np.ndarray:
+        """Keep an embedding in the in-process LRU and return it; cached arrays are shared, so read-only."""
+        if self.inproc_cache_max <= 0:
+            return embedding
+        embedding.setflags(write=False)
+        self._inproc[key] = embedding
+        self._inproc.move_to_end(key)
+        if len(self._inproc) > self.inproc_cache_max:
+            self._inproc.popitem(last=False)
+        return embedding
+    
+    async def _cache_embeddings(self, cache_keys: List[str], indices: List[int], embeddings) -> None:
+        """Write freshly computed embeddings back to Redis in one pipelined call (best effort)."""
+        try:
+            await cache_mset_bytes({cache_keys[i]: _embedding_to_bytes(emb) for i, emb in zip(indices, embeddings)})
+        except Exception:
+            pass
+    
     async def _generate_openai_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding using OpenAI's API.
@@ -264,18 +361,32 @@ class EmbeddingService:
             logger.error(f"Error getting embedding dimension: {str(e)}")
             raise Exception(f"Failed to get embedding dimension: {str(e)}")
     
-    async def compute_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+    async def compute_similarity(
+        self,
+        embedding1: np.ndarray,
+        embedding2: np.ndarray,
+        pre_normalized: Optional[bool] = None,
+    ) -> float:
         """
         Compute cosine similarity between two embeddings.
         
         Args:
             embedding1: First embedding
             embedding2: Second embedding
+            pre_normalized: Both inputs have unit length, so the similarity is a plain
+                dot product (defaults to True when EMBEDDING_NORMALIZE is enabled)
             
         Returns:
             Cosine similarity score
         """
         try:
+            if pre_normalized is None:
+                pre_normalized = self.normalize_embeddings
+            embedding1 = np.ascontiguousarray(embedding1, dtype=np.float32)
+            embedding2 = np.ascontiguousarray(embedding2, dtype=np.float32)
+            if pre_normalized:
+                return float(np.dot(embedding1, embedding2))
+            
             # Normalize embeddings
             norm1 = np.linalg.norm(embedding1)
             norm2 = np.linalg.norm(embedding2)
@@ -290,3 +401,39 @@ class EmbeddingService:
         except Exception as e:
             logger.error(f"Error computing similarity: {str(e)}")
             raise Exception(f"Similarity computation failed: {str(e)}")
+    
+    async def compute_similarities(
+        self,
+        query: np.ndarray,
+        matrix: np.ndarray,
+        pre_normalized: Optional[bool] = None,
+    ) -> np.ndarray:
+        """
+        Compute cosine similarity between one query and many candidates with a single matmul.
+        
+        Prefer this over calling compute_similarity per candidate when ranking results.
+        
+        Args:
+            query: Query embedding of shape (D,)
+            matrix: Candidate embeddings of shape (N, D), ideally contiguous float32
+            pre_normalized: Query and rows have unit length (defaults to True when
+                EMBEDDING_NORMALIZE is enabled)
+            
+        Returns:
+            Array of N similarity scores (0.0 for zero-length vectors)
+        """
+        try:
+            if pre_normalized is None:
+                pre_normalized = self.normalize_embeddings
+            query = np.ascontiguousarray(query, dtype=np.float32)
+            matrix = np.ascontiguousarray(matrix, dtype=np.float32).reshape(-1, query.shape[0])
+            scores = matrix @ query
+            if pre_normalized:
+                return scores
+            
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+            return np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0)
+            
+        except Exception as e:
+            logger.error(f"Error computing similarities: {str(e)}")
+            raise Exception(f"Similarity computation failed: {str(e)}")
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11\x61pi_gateway.proto\x12\x0b\x61pi_gateway\"\xdf\x02\n\x13ProxyRequestMessage\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12>\n\x07headers\x18\x03 \x03(\x0b\x32-.api_gateway.ProxyRequestMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x04 \x01(\t\x12G\n\x0cquery_params\x18\x05 \x03(\x0b\x32\x31.api_gateway.ProxyRequestMessage.QueryParamsEntry\x12\x16\n\x0etarget_service\x18\x06 \x01(\t\x12\x17\n\x0ftimeout_seconds\x18\x07 \x01(\x05\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a\x32\n\x10QueryParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xe6\x01\n\x14ProxyResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x13\n\x0bstatus_code\x18\x02 \x01(\x05\x12\x0f\n\x07message\x18\x03 \x01(\t\x12?\n\x07headers\x18\x04 \x03(\x0b\x32..api_gateway.ProxyResponseMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x05 \x01(\t\x12\x18\n\x10response_time_ms\x18\x06 \x01(\x03\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xae\x02\n\x13RouteRequestMessage\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12>\n\x07headers\x18\x03 \x03(\x0b\x32-.api_gateway.RouteRequestMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x04 \x01(\t\x12G\n\x0cquery_params\x18\x05 \x03(\x0b\x32\x31.api_gateway.RouteRequestMessage.QueryParamsEntry\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a\x32\n\x10QueryParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xd6\x01\n\x14RouteResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x16\n\x0etarget_service\x18\x02 \x01(\t\x12\x13\n\x0btarget_path\x18\x03 \x01(\t\x12?\n\x07headers\x18\x04 \x03(\x0b\x32..api_gateway.RouteResponseMessage.HeadersEntry\x12\x0f\n\x07message\x18\x05 \x01(\t\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xf6\x01\n\x16ValidateRequestMessage\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12\x41\n\x07headers\x18\x03 \x03(\x0b\x32\x30.api_gateway.ValidateRequestMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x04 \x01(\t\x12\x0f\n\x07user_id\x18\x05 \x01(\t\x12\x12\n\nuser_roles\x18\x06 \x03(\t\x12\x18\n\x10user_permissions\x18\x07 \x03(\t\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x8d\x01\n\x17ValidateResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x15\n\ris_authorized\x18\x03 \x01(\x08\x12\x1c\n\x14required_permissions\x18\x04 \x03(\t\x12\x1b\n\x13missing_permissions\x18\x05 \x03(\t\"/\n\x17GetServiceHealthRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\"\xfe\x01\n\x18GetServiceHealthResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0cservice_name\x18\x03 \x01(\t\x12\x0e\n\x06status\x18\x04 \x01(\t\x12\x12\n\nlast_check\x18\x05 \x01(\x03\x12P\n\x0ehealth_details\x18\x06 \x03(\x0b\x32\x38.api_gateway.GetServiceHealthResponse.HealthDetailsEntry\x1a\x34\n\x12HealthDetailsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"V\n\x18GetServiceMetricsRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\x12\x12\n\nstart_time\x18\x02 \x01(\x03\x12\x10\n\x08\x65nd_time\x18\x03 \x01(\x03\"\xc7\x02\n\x19GetServiceMetricsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0cservice_name\x18\x03 \x01(\t\x12\x15\n\rrequest_count\x18\x04 \x01(\x03\x12\x1d\n\x15\x61verage_response_time\x18\x05 \x01(\x01\x12\x13\n\x0b\x65rror_count\x18\x06 \x01(\x05\x12\x12\n\nerror_rate\x18\x07 \x01(\x01\x12Y\n\x12\x61\x64\x64itional_metrics\x18\x08 \x03(\x0b\x32=.api_gateway.GetServiceMetricsResponse.AdditionalMetricsEntry\x1a\x38\n\x16\x41\x64\x64itionalMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xd1\x01\n\x19LoadBalanceRequestMessage\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\t\x12S\n\x0frequest_context\x18\x03 \x03(\x0b\x32:.api_gateway.LoadBalanceRequestMessage.RequestContextEntry\x1a\x35\n\x13RequestContextEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x86\x01\n\x1aLoadBalanceResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x19\n\x11selected_instance\x18\x03 \x01(\t\x12\x14\n\x0cinstance_url\x18\x04 \x01(\t\x12\x15\n\rinstance_load\x18\x05 \x01(\x05\"a\n\x15RateLimitCheckRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x10\n\x08\x65ndpoint\x18\x03 \x01(\t\x12\x14\n\x0cservice_name\x18\x04 \x01(\t\"\x8d\x01\n\x16RateLimitCheckResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x12\n\nis_allowed\x18\x03 \x01(\x08\x12\x1a\n\x12remaining_requests\x18\x04 \x01(\x05\x12\x12\n\nreset_time\x18\x05 \x01(\x03\x12\r\n\x05limit\x18\x06 \x01(\x05\"R\n\x1a\x41uthenticateRequestMessage\x12\r\n\x05token\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x14\n\x0cservice_name\x18\x03 \x01(\t\"\xac\x01\n\x1b\x41uthenticateResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x18\n\x10is_authenticated\x18\x03 \x01(\x08\x12\x0f\n\x07user_id\x18\x04 \x01(\t\x12\x12\n\nuser_roles\x18\x05 \x03(\t\x12\x18\n\x10user_permissions\x18\x06 \x03(\t\x12\x12\n\nexpires_at\x18\x07 \x01(\x03\x32\x85\x06\n\nAPIGateway\x12S\n\x0cProxyRequest\x12 .api_gateway.ProxyRequestMessage\x1a!.api_gateway.ProxyResponseMessage\x12S\n\x0cRouteRequest\x12 .api_gateway.RouteRequestMessage\x1a!.api_gateway.RouteResponseMessage\x12\\\n\x0fValidateRequest\x12#.api_gateway.ValidateRequestMessage\x1a$.api_gateway.ValidateResponseMessage\x12_\n\x10GetServiceHealth\x12$.api_gateway.GetServiceHealthRequest\x1a%.api_gateway.GetServiceHealthResponse\x12\x62\n\x11GetServiceMetrics\x12%.api_gateway.GetServiceMetricsRequest\x1a&.api_gateway.GetServiceMetricsResponse\x12\x65\n\x12LoadBalanceRequest\x12&.api_gateway.LoadBalanceRequestMessage\x1a\'.api_gateway.LoadBalanceResponseMessage\x12Y\n\x0eRateLimitCheck\x12\".api_gateway.RateLimitCheckRequest\x1a#.api_gateway.RateLimitCheckResponse\x12h\n\x13\x41uthenticateRequest\x12\'.api_gateway.AuthenticateRequestMessage\x1a(.api_gateway.AuthenticateResponseMessageb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11\x61pi_gateway.proto\x12\x0b\x61pi_gateway\"\xdf\x02\n\x13ProxyRequestMessage\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12>\n\x07headers\x18\x03 \x03(\x0b\x32-.api_gateway.ProxyRequestMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x04 \x01(\t\x12G\n\x0cquery_params\x18\x05 \x03(\x0b\x32\x31.api_gateway.ProxyRequestMessage.QueryParamsEntry\x12\x16\n\x0etarget_service\x18\x06 \x01(\t\x12\x17\n\x0ftimeout_seconds\x18\x07 \x01(\x05\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a\x32\n\x10QueryParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xe6\x01\n\x14ProxyResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x13\n\x0bstatus_code\x18\x02 \x01(\x05\x12\x0f\n\x07message\x18\x03 \x01(\t\x12?\n\x07headers\x18\x04 \x03(\x0b\x32..api_gateway.ProxyResponseMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x05 \x01(\t\x12\x18\n\x10response_time_ms\x18\x06 \x01(\x03\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xae\x02\n\x13RouteRequestMessage\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12>\n\x07headers\x18\x03 \x03(\x0b\x32-.api_gateway.RouteRequestMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x04 \x01(\t\x12G\n\x0cquery_params\x18\x05 \x03(\x0b\x32\x31.api_gateway.RouteRequestMessage.QueryParamsEntry\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a\x32\n\x10QueryParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xd6\x01\n\x14RouteResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x16\n\x0etarget_service\x18\x02 \x01(\t\x12\x13\n\x0btarget_path\x18\x03 \x01(\t\x12?\n\x07headers\x18\x04 \x03(\x0b\x32..api_gateway.RouteResponseMessage.HeadersEntry\x12\x0f\n\x07message\x18\x05 \x01(\t\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xf6\x01\n\x16ValidateRequestMessage\x12\x0e\n\x06method\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12\x41\n\x07headers\x18\x03 \x03(\x0b\x32\x30.api_gateway.ValidateRequestMessage.HeadersEntry\x12\x0c\n\x04\x62ody\x18\x04 \x01(\t\x12\x0f\n\x07user_id\x18\x05 \x01(\t\x12\x12\n\nuser_roles\x18\x06 \x03(\t\x12\x18\n\x10user_permissions\x18\x07 \x03(\t\x1a.\n\x0cHeadersEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x8d\x01\n\x17ValidateResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x15\n\ris_authorized\x18\x03 \x01(\x08\x12\x1c\n\x14required_permissions\x18\x04 \x03(\t\x12\x1b\n\x13missing_permissions\x18\x05 \x03(\t\"/\n\x17GetServiceHealthRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\"\xfe\x01\n\x18GetServiceHealthResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0cservice_name\x18\x03 \x01(\t\x12\x0e\n\x06status\x18\x04 \x01(\t\x12\x12\n\nlast_check\x18\x05 \x01(\x03\x12P\n\x0ehealth_details\x18\x06 \x03(\x0b\x32\x38.api_gateway.GetServiceHealthResponse.HealthDetailsEntry\x1a\x34\n\x12HealthDetailsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"V\n\x18GetServiceMetricsRequest\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\x12\x12\n\nstart_time\x18\x02 \x01(\x03\x12\x10\n\x08\x65nd_time\x18\x03 \x01(\x03\"\xc7\x02\n\x19GetServiceMetricsResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0cservice_name\x18\x03 \x01(\t\x12\x15\n\rrequest_count\x18\x04 \x01(\x03\x12\x1d\n\x15\x61verage_response_time\x18\x05 \x01(\x01\x12\x13\n\x0b\x65rror_count\x18\x06 \x01(\x05\x12\x12\n\nerror_rate\x18\x07 \x01(\x01\x12Y\n\x12\x61\x64\x64itional_metrics\x18\x08 \x03(\x0b\x32=.api_gateway.GetServiceMetricsResponse.AdditionalMetricsEntry\x1a\x38\n\x16\x41\x64\x64itionalMetricsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xd1\x01\n\x19LoadBalanceRequestMessage\x12\x14\n\x0cservice_name\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\t\x12S\n\x0frequest_context\x18\x03 \x03(\x0b\x32:.api_gateway.LoadBalanceRequestMessage.RequestContextEntry\x1a\x35\n\x13RequestContextEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x86\x01\n\x1aLoadBalanceResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x19\n\x11selected_instance\x18\x03 \x01(\t\x12\x14\n\x0cinstance_url\x18\x04 \x01(\t\x12\x15\n\rinstance_load\x18\x05 \x01(\x05\"a\n\x15RateLimitCheckRequest\x12\x0f\n\x07user_id\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x10\n\x08\x65ndpoint\x18\x03 \x01(\t\x12\x14\n\x0cservice_name\x18\x04 \x01(\t\"\x8d\x01\n\x16RateLimitCheckResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x12\n\nis_allowed\x18\x03 \x01(\x08\x12\x1a\n\x12remaining_requests\x18\x04 \x01(\x05\x12\x12\n\nreset_time\x18\x05 \x01(\x03\x12\r\n\x05limit\x18\x06 \x01(\x05\"R\n\x1a\x41uthenticateRequestMessage\x12\r\n\x05token\x18\x01 \x01(\t\x12\x0f\n\x07\x61pi_key\x18\x02 \x01(\t\x12\x14\n\x0cservice_name\x18\x03 \x01(\t\"\xac\x01\n\x1b\x41uthenticateResponseMessage\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x18\n\x10is_authenticated\x18\x03 \x01(\x08\x12\x0f\n\x07user_id\x18\x04 \x01(\t\x12\x12\n\nuser_roles\x18\x05 \x03(\t\x12\x18\n\x10user_permissions\x18\x06 \x03(\t\x12\x12\n\nexpires_at\x18\x07 \x01(\x03\"\x83\x01\n\x10PreflightRequest\x12\x36\n\nrate_limit\x18\x01 \x01(\x0b\x32\".api_gateway.RateLimitCheckRequest\x12\x37\n\nvalidation\x18\x02 \x01(\x0b\x32#.api_gateway.ValidateRequestMessage\"\xa8\x01\n\x11PreflightResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x37\n\nrate_limit\x18\x03 \x01(\x0b\x32#.api_gateway.RateLimitCheckResponse\x12\x38\n\nvalidation\x18\x04 \x01(\x0b\x32$.api_gateway.ValidateResponseMessage2\xd1\x06\n\nAPIGateway\x12S\n\x0cProxyRequest\x12 .api_gateway.ProxyRequestMessage\x1a!.api_gateway.ProxyResponseMessage\x12S\n\x0cRouteRequest\x12 .api_gateway.RouteRequestMessage\x1a!.api_gateway.RouteResponseMessage\x12\\\n\x0fValidateRequest\x12#.api_gateway.ValidateRequestMessage\x1a$.api_gateway.ValidateResponseMessage\x12_\n\x10GetServiceHealth\x12$.api_gateway.GetServiceHealthRequest\x1a%.api_gateway.GetServiceHealthResponse\x12\x62\n\x11GetServiceMetrics\x12%.api_gateway.GetServiceMetricsRequest\x1a&.api_gateway.GetServiceMetricsResponse\x12\x65\n\x12LoadBalanceRequest\x12&.api_gateway.LoadBalanceRequestMessage\x1a\'.api_gateway.LoadBalanceResponseMessage\x12Y\n\x0eRateLimitCheck\x12\".api_gateway.RateLimitCheckRequest\x1a#.api_gateway.RateLimitCheckResponse\x12h\n\x13\x41uthenticateRequest\x12\'.api_gateway.AuthenticateRequestMessage\x1a(.api_gateway.AuthenticateResponseMessage\x12J\n\tPreflight\x12\x1d.api_gateway.PreflightRequest\x1a\x1e.api_gateway.PreflightResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -103,6 +103,10 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_AUTHENTICATEREQUESTMESSAGE']._serialized_end=2934
   _globals['_AUTHENTICATERESPONSEMESSAGE']._serialized_start=2937
   _globals['_AUTHENTICATERESPONSEMESSAGE']._serialized_end=3109
-  _globals['_APIGATEWAY']._serialized_start=3112
-  _globals['_APIGATEWAY']._serialized_end=3885
+  _globals['_PREFLIGHTREQUEST']._serialized_start=3112
+  _globals['_PREFLIGHTREQUEST']._serialized_end=3243
+  _globals['_PREFLIGHTRESPONSE']._serialized_start=3246
+  _globals['_PREFLIGHTRESPONSE']._serialized_end=3414
+  _globals['_APIGATEWAY']._serialized_start=3417
+  _globals['_APIGATEWAY']._serialized_end=4266
 # @@protoc_insertion_point(module_scope)
@@ -75,6 +75,11 @@ class APIGatewayStub(object):
                 request_serializer=api__gateway__pb2.AuthenticateRequestMessage.SerializeToString,
                 response_deserializer=api__gateway__pb2.AuthenticateResponseMessage.FromString,
                 _registered_method=True)
+        self.Preflight = channel.unary_unary(
+                '/api_gateway.APIGateway/Preflight',
+                request_serializer=api__gateway__pb2.PreflightRequest.SerializeToString,
+                response_deserializer=api__gateway__pb2.PreflightResponse.FromString,
+                _registered_method=True)
 
 
 class APIGatewayServicer(object):
@@ -129,6 +134,12 @@ class APIGatewayServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Preflight(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_APIGatewayServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -172,6 +183,11 @@ def add_APIGatewayServicer_to_server(servicer, server):
                     request_deserializer=api__gateway__pb2.AuthenticateRequestMessage.FromString,
                     response_serializer=api__gateway__pb2.AuthenticateResponseMessage.SerializeToString,
             ),
+            'Preflight': grpc.unary_unary_rpc_method_handler(
+                    servicer.Preflight,
+                    request_deserializer=api__gateway__pb2.PreflightRequest.FromString,
+                    response_serializer=api__gateway__pb2.PreflightResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'api_gateway.APIGateway', rpc_method_handlers)
@@ -399,3 +415,30 @@ class APIGateway(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def Preflight(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/api_gateway.APIGateway/Preflight',
+            api__gateway__pb2.PreflightRequest.SerializeToString,
+            api__gateway__pb2.PreflightResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
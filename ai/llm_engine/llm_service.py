@@ -1,7 +1,8 @@
 import os
 import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any, Type
+from typing import Optional, List, Dict, Any, Type, AsyncIterator
+import httpx
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_community.llms import LlamaCpp
@@ -20,6 +21,16 @@ from cache.redis_cache import (
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+def make_http_async_client() -> httpx.AsyncClient:
+    """Pooled HTTP client for LLM provider SDKs, sized via LLM_HTTP_* env vars"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "50")),
+        ),
+        timeout=float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "60")),
+    )
+
 class LLMProvider(Enum):
     """Supported LLM providers"""
     GROQ = "groq"
@@ -43,6 +54,10 @@ class BaseLLMProvider(ABC):
         """Get available models for this provider"""
         pass
 
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream generated text chunks; providers without streaming yield the full response"""
+        yield await self.generate_text(prompt, **kwargs)
+
 class GroqProvider(BaseLLMProvider):
     """Groq-specific implementation"""
     
@@ -52,7 +67,8 @@ class GroqProvider(BaseLLMProvider):
         self.client = ChatGroq(
             model_name=self.default_model,
             temperature=float(os.getenv("TEMPERATURE", 0.7)),
-            max_tokens=int(os.getenv("MAX_TOKENS", 1000))
+            max_tokens=int(os.getenv("MAX_TOKENS", 1000)),
+            http_async_client=make_http_async_client()
         )
         
     async def generate_text(self, prompt: str, **kwargs) -> str:
@@ -71,6 +87,12 @@ class GroqProvider(BaseLLMProvider):
         except Exception as e:
             logger.error(f"Groq chat completion error: {str(e)}")
             raise
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        messages = [HumanMessage(content=prompt)]
+        async for chunk in self.client.astream(messages):
+            if chunk.content:
+                yield chunk.content
             
     def get_available_models(self) -> Dict[str, str]:
         return {
@@ -114,6 +136,11 @@ class LlamaProvider(BaseLLMProvider):
         except Exception as e:
             logger.error(f"LLaMA chat completion error: {str(e)}")
             raise
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        async for chunk in self.client.astream(prompt):
+            if chunk:
+                yield chunk
             
     def get_available_models(self) -> Dict[str, str]:
         return {
@@ -259,6 +286,57 @@ class LLMService:
                 pass
         return result
     
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks as the provider produces them.
+        
+        Falls back to the next provider only if the current one fails before
+        emitting its first chunk; a stream that already started is not retried.
+        
+        Args:
+            prompt: The input prompt for text generation
+            **kwargs: Additional arguments passed to provider
+            
+        Yields:
+            Generated text chunks
+        """
+        current_provider = kwargs.pop("provider", self.default_provider)
+        retries = 0
+        
+        while retries < self.max_retries:
+            started = False
+            try:
+                async for chunk in self.providers[current_provider].astream(prompt, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                logger.error(f"Text streaming failed with {current_provider.value}: {str(e)}")
+                if started:
+                    raise
+                
+                next_provider = self._get_next_provider(current_provider)
+                if next_provider:
+                    logger.info(f"Falling back to {next_provider.value}")
+                    current_provider = next_provider
+                    retries += 1
+                else:
+                    raise Exception("All providers failed for Text streaming")
+        
+        raise Exception(f"Max retries ({self.max_retries}) exceeded for Text streaming")
+    
+    async def warmup(self) -> None:
+        """
+        Send a tiny request through each provider so connection pools, TLS
+        sessions and lazy imports are set up before the first user request.
+        Failures are logged and ignored.
+        """
+        for provider_enum, provider_instance in self.providers.items():
+            try:
+                await provider_instance.generate_text("ping")
+            except Exception as e:
+                logger.warning(f"Warmup failed for {provider_enum.value}: {str(e)}")
+    
     def get_available_models(self, provider: Optional[LLMProvider] = None) -> Dict[str, str]:
         """
         Get available models for specified provider or all providers.
@@ -1,13 +1,61 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Header
+from fastapi import FastAPI, HTTPException, Depends, status, Header, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 import uvicorn
-from typing import List, Optional
+try:
+    import uvloop  # noqa: F401  (selected through uvicorn's loop setting)
+except Exception:
+    uvloop = None
+from typing import List, Optional, AsyncIterator
 import os
+import json
+import base64
+import asyncio
+from collections import defaultdict
 from dotenv import load_dotenv
 import logging
 
+# Optional fast JSON serializer with native numpy support
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+# Optional LangChain exact-match cache for the agent LLM
+try:
+    from langchain_core.caches import InMemoryCache  # type: ignore
+except Exception:  # pragma: no cover
+    InMemoryCache = None  # type: ignore
+
+# Optional fast request decoder for hot-path search bodies
+try:
+    import msgspec  # type: ignore
+except Exception:  # pragma: no cover
+    msgspec = None  # type: ignore
+
+
+def _json_bytes(payload) -> bytes:
+    """Serialize a constant payload once so its endpoint can return the bytes as-is."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_template(payload, slot: str) -> tuple:
+    """
+    Pre-encode a payload whose `slot` key is filled per request.
+
+    Returns the (prefix, suffix) bytes around the slot's value, so a response is
+    prefix + _json_bytes(value) + suffix.
+    """
+    body = _json_bytes({**payload, slot: None})
+    marker = _json_bytes({slot: None})[1:-1]
+    prefix, suffix = body.split(marker, 1)
+    return prefix + marker[:-len(b"null")], suffix
+
 # Auth & RBAC
 from auth.dependencies import (
     require_roles, get_current_user, get_current_user_optional,
@@ -18,8 +66,17 @@ from auth.dependencies import (
 )
 from auth.api_key_middleware import APIKeyMiddleware, get_api_key_user, require_api_key_roles, require_api_key_permissions
 from auth.rbac_middleware import RBACMiddleware, rbac_protect, admin_only, teacher_or_admin, student_or_above
+from auth.request_cache import RequestCacheMiddleware
 from auth.models import User, UserRole, Permission, UserCreate, Token
 from auth.user_service import user_service_singleton
+from auth.passwords import shutdown_hash_pool
+from auth.auth_service import auth_service_singleton
+
+
+def _user_summary_response(template: tuple, user: User) -> Response:
+    prefix, suffix = template
+    summary = {"id": user.id, "email": user.email, "roles": user.role_values}
+    return Response(content=prefix + _json_bytes(summary) + suffix, media_type="application/json")
 
 # Import modules
 from llm_engine.llm_service import LLMService
@@ -27,13 +84,24 @@ from embedding_model.embedding_service import EmbeddingService
 from vector_db.vector_service import VectorService
 from vector_db.elasticsearch_service import ElasticBM25Service
 from vector_db.qdrant_service import QdrantVectorService
-from vector_db.hybrid_retriever import HybridRetriever
-from agent_executor.agent_service import AgentService
+from vector_db.hybrid_retriever import HybridRetriever, DEFAULT_ALPHA
+from vector_db.ingest_payload import (
+    IngestRequest,
+    INGEST_POOL_MIN_BYTES,
+    validate_ingest_body,
+    get_validation_pool,
+    shutdown_validation_pool,
+)
+from cache.semantic_cache import SemanticCache
+from langchain.schema import HumanMessage, SystemMessage
+from agent_executor.agent_service import AgentService, AgentError
 from tools.tool_registry import ToolRegistry
-from clients.api_clients import UserServiceClient, QuestionServiceClient, APIGatewayClient
+from clients.api_clients import UserServiceClient, QuestionServiceClient, APIGatewayClient, aclose_shared_clients
 from clients.grpc_clients import UserServiceGRPCClient, QuestionServiceGRPCClient, APIGatewayGRPCClient
+from clients.service_discovery import aclose_service_discovery
 from orchestrator_service import orchestrator_service, OrchestrationRequest, OrchestrationResponse
-from middleware.rate_limit import RateLimitMiddleware
+from middleware.clock import now_s, run_clock
+from middleware.rate_limit import RateLimitMiddleware, rate_limit_config, rate_limit_key, redis_rate_limiter
 from observability.otel_setup import configure_json_logging, init_tracing
 from metrics.prometheus import setup_metrics
 
@@ -155,13 +223,15 @@ app = FastAPI(
             "name": "external-api",
             "description": "External API endpoints requiring API key authentication"
         }
-    ]
+    ],
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
 )
 
 # Observability: logging and tracing
 SERVICE_NAME = os.getenv("SERVICE_NAME", "nlp-ai-microservice")
 configure_json_logging(SERVICE_NAME)
 init_tracing(SERVICE_NAME, app)
+logger = logging.getLogger(__name__)
 
 # Add CORS middleware
 origins = [
@@ -181,15 +251,27 @@ app.add_middleware(
 # Metrics endpoint for Prometheus
 setup_metrics(app)
 
+# Endpoints let errors propagate; map them to JSON responses here
+@app.exception_handler(AgentError)
+async def agent_error_handler(request: Request, exc: AgentError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+@app.exception_handler(Exception)
+async def unhandled_error_handler(request: Request, exc: Exception):
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
 # Add RBAC middleware for automatic route protection
 app.add_middleware(RBACMiddleware)
 
 # Add API key middleware for external routes
-app.add_middleware(APIKeyMiddleware)
+app.add_middleware(APIKeyMiddleware, state=app.state)
 
 # Rate limiting middleware (after API key, before handlers)
 app.add_middleware(RateLimitMiddleware)
 
+# Request-scoped memo for token validation / rate-limit calls; added last so it wraps every other middleware
+app.add_middleware(RequestCacheMiddleware)
+
 # Initialize services
 llm_service = LLMService()
 embedding_service = EmbeddingService()
@@ -197,6 +279,7 @@ vector_service = VectorService()
 bm25_service = ElasticBM25Service()
 qdrant_service = QdrantVectorService()
 agent_service = AgentService()
+semantic_cache = SemanticCache()
 tool_registry = ToolRegistry()
 user_client = UserServiceClient()
 question_client = QuestionServiceClient()
@@ -207,10 +290,22 @@ user_grpc_client = UserServiceGRPCClient()
 question_grpc_client = QuestionServiceGRPCClient()
 api_gateway_grpc_client = APIGatewayGRPCClient()
 
+# Shared hybrid retriever; callers pass their own alpha per search
+hybrid_retriever = HybridRetriever(bm25_service=bm25_service, vector_service=qdrant_service, alpha=DEFAULT_ALPHA)
+
+def get_hybrid_retriever() -> HybridRetriever:
+    return hybrid_retriever
+
 # Set up service dependencies
 vector_service.set_embedding_service(embedding_service)
 qdrant_service.set_embedding_service(embedding_service)
 agent_service.set_tool_registry(tool_registry)
+semantic_cache.set_embedding_service(embedding_service)
+agent_service.set_semantic_cache(semantic_cache)
+# Exact-match LLM cache, bounded and scoped to the temperature-0 agent model only;
+# llm_service samples (TEMPERATURE, default 0.7), so its completions are not cached
+if InMemoryCache is not None and os.getenv("LLM_EXACT_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}:
+    agent_service.set_llm_cache(InMemoryCache(maxsize=int(os.getenv("LLM_EXACT_CACHE_MAX_ENTRIES", "1024"))))
 
 # Pydantic models
 class TextRequest(BaseModel):
@@ -228,17 +323,43 @@ class VectorSearchRequest(BaseModel):
 class HybridSearchRequest(BaseModel):
     query: str
     top_k: Optional[int] = 10
-    alpha: Optional[float] = 0.6
+    alpha: Optional[float] = DEFAULT_ALPHA
     filter: Optional[dict] = None
 
-class IngestRequest(BaseModel):
-    texts: List[str]
-    metadata_list: Optional[List[dict]] = None
+if msgspec is not None:
+    class _HybridSearchStruct(msgspec.Struct, frozen=True):
+        query: str
+        top_k: Optional[int] = 10
+        alpha: Optional[float] = DEFAULT_ALPHA
+        filter: Optional[dict] = None
+
+# The search routes decode their body themselves, so the schema is declared explicitly
+_HYBRID_SEARCH_OPENAPI = {
+    "requestBody": {"content": {"application/json": {"schema": HybridSearchRequest.model_json_schema()}}, "required": True}
+}
+
+async def parse_hybrid_search_request(http_request: Request):
+    """Decode a hybrid search body with msgspec when available, skipping pydantic model construction."""
+    body = await http_request.body()
+    if msgspec is None:
+        try:
+            return HybridSearchRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+    try:
+        return msgspec.json.decode(body, type=_HybridSearchStruct)
+    except msgspec.DecodeError as e:
+        raise RequestValidationError([{"loc": ["body"], "msg": str(e), "type": "value_error"}])
 
 class AgentRequest(BaseModel):
     query: str
     tools: Optional[List[str]] = []
 
+class AgentChainRequest(BaseModel):
+    queries: List[str]
+    tools: Optional[List[str]] = []
+    max_concurrency: Optional[int] = 10
+
 class IndexUserQuestionsRequest(BaseModel):
     limit: Optional[int] = 10
     include_user: Optional[bool] = True
@@ -247,21 +368,52 @@ class OrchestrateUserAnswerRequest(BaseModel):
     user_id: str
     question: str
     limit: Optional[int] = 5
+    alpha: Optional[float] = None
+
+class BatchAuthorizeRequest(BaseModel):
+    user_ids: List[int]
+    permission: Permission
+
+class BatchGetUsersRequest(BaseModel):
+    user_ids: List[int]
 
 
 # Lifecycle events to clean up network clients
+@app.on_event("startup")
+async def _start_clock():
+    app.state.clock_task = asyncio.create_task(run_clock())
+
+@app.on_event("startup")
+async def _warmup_clients():
+    if os.getenv("STARTUP_WARMUP_ENABLED", "true").lower() not in {"1", "true", "yes"}:
+        return
+
+    await asyncio.gather(
+        agent_service.warmup(),
+        llm_service.warmup(),
+        user_client.warmup(),
+        question_client.warmup(),
+        api_gateway_client.warmup(),
+        qdrant_service.warmup(),
+        embedding_service.warmup(),
+        user_grpc_client.warmup(),
+        question_grpc_client.warmup(),
+        api_gateway_grpc_client.warmup(),
+    )
+
 @app.on_event("shutdown")
 async def _shutdown_clients():
+    clock_task = getattr(app.state, "clock_task", None)
+    if clock_task is not None:
+        clock_task.cancel()
+    shutdown_validation_pool()
+    shutdown_hash_pool()
     try:
-        await user_client.aclose()
-    except Exception:
-        pass
-    try:
-        await question_client.aclose()
+        await aclose_shared_clients()
     except Exception:
         pass
     try:
-        await api_gateway_client.aclose()
+        await aclose_service_discovery()
     except Exception:
         pass
     try:
@@ -280,6 +432,10 @@ async def _shutdown_clients():
         await orchestrator_service.cleanup()
     except Exception:
         pass
+    try:
+        await auth_service_singleton.aclose()
+    except Exception:
+        pass
 
 # Health check endpoint
 @app.get("/health", tags=["health"])
@@ -292,8 +448,31 @@ async def health_check():
     return {"status": "healthy", "service": "nlp-ai-microservice"}
 
 # LLM endpoints
+async def _sse_text_stream(text: str, model: Optional[str], namespace: str) -> AsyncIterator[str]:
+    """Yield LLM output as server-sent events, caching the full response once complete."""
+    try:
+        cached = await semantic_cache.lookup(text, namespace)
+        if cached is not None:
+            yield f"data: {json.dumps({'text': cached})}\n\n"
+        else:
+            chunks = []
+            async for chunk in llm_service.astream(text, model=model):
+                chunks.append(chunk)
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            await semantic_cache.store(text, "".join(chunks), namespace)
+        yield "data: [DONE]\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+def _sse_response(text: str, model: Optional[str], namespace: str) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_text_stream(text, model, namespace),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
 @app.post("/llm/generate", tags=["llm"])
-async def generate_text(request: TextRequest):
+async def generate_text(request: TextRequest, stream: bool = True):
     """
     Generate text using Large Language Models.
     
@@ -302,14 +481,19 @@ async def generate_text(request: TextRequest):
     
     - **text**: The input prompt or question
     - **model**: The LLM model to use (default: gpt-3.5-turbo)
+    - **stream**: Stream tokens as server-sent events (default: true); pass `?stream=false` for a single JSON response
     
     Returns the generated text response from the selected LLM.
     """
-    try:
-        response = await llm_service.generate_text(request.text, request.model)
-        return {"response": response}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    namespace = f"llm:generate:{request.model}"
+    if stream:
+        return _sse_response(request.text, request.model, namespace)
+    cached = await semantic_cache.lookup(request.text, namespace)
+    if cached is not None:
+        return {"response": cached}
+    response = await llm_service.generate_text(request.text, model=request.model)
+    await semantic_cache.store(request.text, response, namespace)
+    return {"response": response}
 
 # Sample external service integrations
 @app.get("/users/{user_id}")
@@ -322,46 +506,51 @@ async def get_user_via_user_service(user_id: str):
 
 @app.post("/users/{user_id}/index-questions")
 async def index_user_questions(user_id: str, body: IndexUserQuestionsRequest):
+    # Optionally fetch user profile; independent of ingest, so run it alongside
+    async def fetch_user():
+        if not body.include_user:
+            return None
+        try:
+            return await user_client.get_user(user_id)
+        except Exception:
+            return None
+
+    user_task = asyncio.create_task(fetch_user())
+
+    # Fetch latest questions for the user from Question Service
     try:
-        # Fetch latest questions for the user from Question Service
         q = await question_client.get_user_questions(user_id, limit=body.limit or 10)
-        questions = q.get("questions") or q.get("data") or q
-        if not isinstance(questions, list):
-            questions = []
-
-        # Ingest into both BM25 and Vector DB with metadata
-        texts = []
-        metas = []
-        for item in questions:
-            text = item.get("text") or item.get("title") or item.get("body") or ""
-            if not text:
-                continue
-            texts.append(text)
-            metas.append({
-                "type": "question",
-                "user_id": user_id,
-                "source": "question_service",
-                "question_id": item.get("id"),
-            })
-
-        ids_es = bm25_service.add_documents_batch(texts, metas)
-        ids_qdrant = await qdrant_service.add_documents_batch(texts, metas)
-
-        result = {"count": len(texts), "elastic_ids": ids_es, "qdrant_ids": ids_qdrant}
-
-        # Optionally fetch user profile
-        user_info = None
-        if body.include_user:
-            try:
-                user_info = await user_client.get_user(user_id)
-            except Exception:
-                user_info = None
-
-        return {"ingested": result, "user": user_info}
-    except HTTPException:
+    except Exception:
+        user_task.cancel()
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    questions = q.get("questions") or q.get("data") or q
+    if not isinstance(questions, list):
+        questions = []
+
+    # Ingest into both BM25 and Vector DB with metadata
+    texts = []
+    metas = []
+    for item in questions:
+        text = item.get("text") or item.get("title") or item.get("body") or ""
+        if not text:
+            continue
+        texts.append(text)
+        metas.append({
+            "type": "question",
+            "user_id": user_id,
+            "source": "question_service",
+            "question_id": item.get("id"),
+        })
+
+    # Both sinks are independent; the Elasticsearch client is synchronous
+    ids_es, ids_qdrant, user_info = await asyncio.gather(
+        asyncio.to_thread(bm25_service.add_documents_batch, texts, metas),
+        qdrant_service.add_documents_batch(texts, metas),
+        user_task,
+    )
+
+    result = {"count": len(texts), "elastic_ids": ids_es, "qdrant_ids": ids_qdrant}
+    return {"ingested": result, "user": user_info}
 
 @app.get("/gateway/proxy")
 async def gateway_proxy(path: str, method: str = "GET"):
@@ -371,33 +560,38 @@ async def gateway_proxy(path: str, method: str = "GET"):
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Gateway error: {str(e)}")
 
+ORCHESTRATE_SYSTEM_PROMPT = "You answer the user's question using the provided context. Be concise."
+
 @app.post("/orchestrate/answer")
-async def orchestrate_user_answer(body: OrchestrateUserAnswerRequest):
-    try:
-        # 1) Fetch user context
-        user = None
+async def orchestrate_user_answer(body: OrchestrateUserAnswerRequest, retriever: HybridRetriever = Depends(get_hybrid_retriever)):
+    # 1) Fetch user context
+    async def fetch_user():
         try:
-            user = await user_client.get_user(body.user_id)
+            return await user_client.get_user(body.user_id)
         except Exception:
-            user = None
+            return None
 
-        # 2) Use hybrid retrieval over user's questions/materials
-        retriever = HybridRetriever(bm25_service=bm25_service, vector_service=qdrant_service, alpha=0.6)
-        filt = {"user_id": body.user_id}
-        context_results = await retriever.search(body.question, top_k=body.limit or 5, filter_metadata=filt)
+    # 2) Use hybrid retrieval over user's questions/materials, alongside the user fetch
+    filt = {"user_id": body.user_id}
+    user, context_results = await asyncio.gather(
+        fetch_user(),
+        retriever.search(body.question, top_k=body.limit or 5, filter_metadata=filt, alpha=body.alpha),
+    )
 
-        # 3) Build prompt and call LLM
-        context_snippets = "\n\n".join([r.get("document", "") for r in context_results])
-        prompt = f"Answer the user's question using the provided context.\n\nUser: {user}\n\nContext:\n{context_snippets}\n\nQuestion: {body.question}\nAnswer:"
-        answer = await llm_service.generate_text(prompt)
+    # 3) Build messages and call LLM; the system prefix stays constant so
+    #    provider-side prompt caching can reuse it across requests
+    context_snippets = "\n\n".join([r.get("document", "") for r in context_results])
+    messages = [
+        SystemMessage(content=ORCHESTRATE_SYSTEM_PROMPT),
+        HumanMessage(content=f"User: {user}\n\nContext:\n{context_snippets}\n\nQuestion: {body.question}"),
+    ]
+    answer = await llm_service.chat_completion(messages)
 
-        return {
-            "user": user,
-            "retrieved": context_results,
-            "answer": answer,
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "user": user,
+        "retrieved": context_results,
+        "answer": answer,
+    }
 
 
 # =============================================================================
@@ -407,11 +601,8 @@ async def orchestrate_user_answer(body: OrchestrateUserAnswerRequest):
 @app.post("/orchestrate/query", response_model=OrchestrationResponse)
 async def orchestrate_comprehensive_query(request: OrchestrationRequest):
     """Comprehensive orchestration endpoint that coordinates all services"""
-    try:
-        response = await orchestrator_service.orchestrate_user_query(request)
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    response = await orchestrator_service.orchestrate_user_query(request)
+    return response
 
 
 @app.post("/orchestrate/index-questions/{user_id}")
@@ -421,56 +612,49 @@ async def index_user_questions_orchestrated(
     use_grpc: bool = False
 ):
     """Index user's questions into vector database using orchestrator"""
-    try:
-        result = await orchestrator_service.index_user_questions(user_id, limit, use_grpc)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await orchestrator_service.index_user_questions(user_id, limit, use_grpc)
+    return result
 
 
 @app.get("/orchestrate/health")
 async def orchestrator_health_check(use_grpc: bool = False):
     """Get health status of all orchestrated services"""
-    try:
-        health_status = await orchestrator_service.get_service_health(use_grpc)
-        return health_status
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    health_status = await orchestrator_service.get_service_health(use_grpc)
+    return health_status
 
 
 @app.get("/orchestrate/services/discover")
 async def discover_orchestrated_services():
     """Discover all services using service discovery"""
-    try:
-        services = await orchestrator_service.discover_services()
-        return services
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    services = await orchestrator_service.discover_services()
+    return services
 
 
 # =============================================================================
 # Enhanced Service Integration Endpoints
 # =============================================================================
 
+# Transport chosen per request by `use_grpc`; both clients expose the same methods.
+# gRPC clients connect lazily (and at startup warmup), so handlers never call connect()
+_USER_CLIENTS = {True: user_grpc_client, False: user_client}
+_QUESTION_CLIENTS = {True: question_grpc_client, False: question_client}
+_GATEWAY_CLIENTS = {True: api_gateway_grpc_client, False: api_gateway_client}
+
 @app.get("/services/user/{user_id}/profile")
 async def get_user_profile_comprehensive(user_id: str, use_grpc: bool = False):
     """Get comprehensive user profile using both API and gRPC"""
-    try:
-        if use_grpc:
-            await user_grpc_client.connect()
-            user_data = await user_grpc_client.get_user(user_id)
-            user_profile = await user_grpc_client.get_user_profile(user_id)
-        else:
-            user_data = await user_client.get_user(user_id)
-            user_profile = await user_client.get_user_profile(user_id)
+    client = _USER_CLIENTS[use_grpc]
+    # Independent lookups against the same service; run them concurrently
+    user_data, user_profile = await asyncio.gather(
+        client.get_user(user_id),
+        client.get_user_profile(user_id),
+    )
         
-        return {
-            "user_data": user_data,
-            "user_profile": user_profile,
-            "retrieved_via": "grpc" if use_grpc else "rest_api"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "user_data": user_data,
+        "user_profile": user_profile,
+        "retrieved_via": "grpc" if use_grpc else "rest_api"
+    }
 
 
 @app.get("/services/questions/user/{user_id}")
@@ -481,23 +665,14 @@ async def get_user_questions_comprehensive(
     use_grpc: bool = False
 ):
     """Get user questions using both API and gRPC"""
-    try:
-        if use_grpc:
-            await question_grpc_client.connect()
-            questions_data = await question_grpc_client.get_user_questions(
-                user_id, page, page_size
-            )
-        else:
-            questions_data = await question_client.get_user_questions(
-                user_id, page, page_size
-            )
+    questions_data = await _QUESTION_CLIENTS[use_grpc].get_user_questions(
+        user_id, page, page_size
+    )
         
-        return {
-            "questions": questions_data,
-            "retrieved_via": "grpc" if use_grpc else "rest_api"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "questions": questions_data,
+        "retrieved_via": "grpc" if use_grpc else "rest_api"
+    }
 
 
 @app.post("/services/gateway/proxy")
@@ -509,24 +684,20 @@ async def proxy_through_gateway(
     **kwargs
 ):
     """Proxy request through API Gateway using both protocols"""
-    try:
-        if use_grpc:
-            await api_gateway_grpc_client.connect()
-            result = await api_gateway_grpc_client.proxy_request(
-                method=method,
-                path=path,
-                target_service=target_service,
-                **kwargs
-            )
-        else:
-            result = await api_gateway_client.proxy(method, path, **kwargs)
+    if use_grpc:
+        result = await api_gateway_grpc_client.proxy_request(
+            method=method,
+            path=path,
+            target_service=target_service,
+            **kwargs
+        )
+    else:
+        result = await api_gateway_client.proxy(method, path, **kwargs)
         
-        return {
-            "result": result,
-            "proxied_via": "grpc" if use_grpc else "rest_api"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "result": result,
+        "proxied_via": "grpc" if use_grpc else "rest_api"
+    }
 
 
 @app.post("/services/gateway/validate")
@@ -534,54 +705,65 @@ async def validate_request_through_gateway(
     method: str = "GET",
     path: str = "/",
     user_id: str = "",
-    user_roles: List[str] = [],
-    user_permissions: List[str] = [],
+    user_roles: Optional[List[str]] = None,
+    user_permissions: Optional[List[str]] = None,
     use_grpc: bool = False
 ):
     """Validate request authorization through API Gateway"""
-    try:
-        if use_grpc:
-            await api_gateway_grpc_client.connect()
-            result = await api_gateway_grpc_client.validate_request(
-                method=method,
-                path=path,
-                user_id=user_id,
-                user_roles=user_roles,
-                user_permissions=user_permissions
-            )
-        else:
-            result = await api_gateway_client.validate_request(
-                method=method,
-                path=path,
-                user_id=user_id,
-                user_roles=user_roles,
-                user_permissions=user_permissions
-            )
+    result = await _GATEWAY_CLIENTS[use_grpc].validate_request(
+        method=method,
+        path=path,
+        user_id=user_id,
+        user_roles=user_roles,
+        user_permissions=user_permissions
+    )
         
-        return {
-            "validation_result": result,
-            "validated_via": "grpc" if use_grpc else "rest_api"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "validation_result": result,
+        "validated_via": "grpc" if use_grpc else "rest_api"
+    }
 
 
 @app.get("/services/gateway/health/{service_name}")
 async def get_service_health_through_gateway(service_name: str, use_grpc: bool = False):
     """Get service health through API Gateway"""
-    try:
-        if use_grpc:
-            await api_gateway_grpc_client.connect()
-            result = await api_gateway_grpc_client.get_service_health(service_name)
-        else:
-            result = await api_gateway_client.get_service_health(service_name)
+    result = await _GATEWAY_CLIENTS[use_grpc].get_service_health(service_name)
         
-        return {
-            "health_status": result,
-            "checked_via": "grpc" if use_grpc else "rest_api"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "health_status": result,
+        "checked_via": "grpc" if use_grpc else "rest_api"
+    }
+
+
+@app.post("/services/gateway/preflight")
+async def preflight_through_gateway(
+    user_id: str = "",
+    api_key: str = "",
+    endpoint: str = "",
+    service_name: str = "",
+    method: str = "GET",
+    path: str = "/",
+    user_roles: Optional[List[str]] = None,
+    user_permissions: Optional[List[str]] = None,
+    use_grpc: bool = False
+):
+    """Check rate limit and validate authorization through API Gateway in one call"""
+    result = await _GATEWAY_CLIENTS[use_grpc].preflight(
+        user_id=user_id,
+        api_key=api_key,
+        endpoint=endpoint,
+        service_name=service_name,
+        method=method,
+        path=path,
+        user_roles=user_roles,
+        user_permissions=user_permissions
+    )
+        
+    return {
+        "rate_limit_status": result["rate_limit"],
+        "validation_result": result["validation"],
+        "checked_via": "grpc" if use_grpc else "rest_api"
+    }
 
 
 @app.post("/services/gateway/rate-limit/check")
@@ -592,33 +774,45 @@ async def check_rate_limit_through_gateway(
     service_name: str = "",
     use_grpc: bool = False
 ):
-    """Check rate limit through API Gateway"""
-    try:
-        if use_grpc:
-            await api_gateway_grpc_client.connect()
-            result = await api_gateway_grpc_client.rate_limit_check(
-                user_id=user_id,
-                api_key=api_key,
-                endpoint=endpoint,
-                service_name=service_name
-            )
-        else:
-            result = await api_gateway_client.rate_limit_check(
-                user_id=user_id,
-                api_key=api_key,
-                endpoint=endpoint,
-                service_name=service_name
-            )
-        
+    """Check rate limit, locally and in Redis first, then through the API Gateway"""
+    limiter_key = rate_limit_key(user_id=user_id, api_key=api_key, endpoint=endpoint)
+    retry_after_ms = redis_rate_limiter.blocked_for_ms(limiter_key)
+    if retry_after_ms:
         return {
-            "rate_limit_status": result,
-            "checked_via": "grpc" if use_grpc else "rest_api"
+            "rate_limit_status": {"allowed": False, "retry_after_ms": retry_after_ms},
+            "checked_via": "local_cache"
+        }
+
+    limit, window = rate_limit_config.get_limit_for_user(user_id)
+    decision = await redis_rate_limiter.hit(limiter_key, limit, window)
+    if decision is not None:
+        allowed, count, retry_after_ms = decision
+        return {
+            "rate_limit_status": {
+                "allowed": allowed,
+                "current_count": count,
+                "limit": limit,
+                "window_seconds": window,
+                "retry_after_ms": retry_after_ms
+            },
+            "checked_via": "redis"
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    # Redis unavailable or the script failed: ask the gateway
+    result = await _GATEWAY_CLIENTS[use_grpc].rate_limit_check(
+        user_id=user_id,
+        api_key=api_key,
+        endpoint=endpoint,
+        service_name=service_name
+    )
+        
+    return {
+        "rate_limit_status": result,
+        "checked_via": "grpc" if use_grpc else "rest_api"
+    }
 
 @app.post("/llm/chat", tags=["llm"])
-async def chat_completion(request: TextRequest):
+async def chat_completion(request: TextRequest, stream: bool = True):
     """
     Chat completion using Large Language Models.
     
@@ -627,14 +821,19 @@ async def chat_completion(request: TextRequest):
     
     - **text**: The user's message or question
     - **model**: The LLM model to use (default: gpt-3.5-turbo)
+    - **stream**: Stream tokens as server-sent events (default: true); pass `?stream=false` for a single JSON response
     
     Returns a conversational response from the LLM.
     """
-    try:
-        response = await llm_service.chat_completion(request.text, request.model)
-        return {"response": response}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    namespace = f"llm:chat:{request.model}"
+    if stream:
+        return _sse_response(request.text, request.model, namespace)
+    cached = await semantic_cache.lookup(request.text, namespace)
+    if cached is not None:
+        return {"response": cached}
+    response = await llm_service.chat_completion(request.text, model=request.model)
+    await semantic_cache.store(request.text, response, namespace)
+    return {"response": response}
 
 # Embedding endpoints
 @app.post("/embedding/generate", tags=["embeddings"])
@@ -650,11 +849,10 @@ async def generate_embedding(request: EmbeddingRequest):
     
     Returns the embedding vector as a list of floating-point numbers.
     """
-    try:
-        embedding = await embedding_service.generate_embedding(request.text, request.model)
-        return {"embedding": embedding.tolist()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    embedding = await embedding_service.generate_embedding(request.text, request.model)
+    if orjson is not None:
+        return ORJSONResponse({"embedding": embedding})
+    return {"embedding": embedding.tolist()}
 
 @app.post("/embedding/batch", tags=["embeddings"])
 async def generate_batch_embeddings(request: List[EmbeddingRequest]):
@@ -668,69 +866,124 @@ async def generate_batch_embeddings(request: List[EmbeddingRequest]):
     
     Returns a list of embedding vectors for all input texts.
     """
-    try:
-        texts = [req.text for req in request]
-        model = request[0].model if request else "all-MiniLM-L6-v2"
-        embeddings = await embedding_service.generate_batch_embeddings(texts, model)
-        return {"embeddings": [emb.tolist() for emb in embeddings]}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Group by model so mixed-model batches are each encoded with the right model
+    buckets = defaultdict(list)
+    for i, req in enumerate(request):
+        buckets[req.model or embedding_service.default_model].append(i)
+
+    embeddings = [None] * len(request)
+    for model, indices in buckets.items():
+        texts = [request[i].text for i in indices]
+        for i, emb in zip(indices, await embedding_service.generate_batch_embeddings(texts, model)):
+            embeddings[i] = emb
+
+    if orjson is not None:
+        return ORJSONResponse({"embeddings": embeddings})
+    return {"embeddings": [emb.tolist() for emb in embeddings]}
 
 # Vector database endpoints
 @app.post("/vector/search")
 async def vector_search(request: VectorSearchRequest):
-    try:
-        results = await vector_service.search(request.query, request.top_k)
-        return {"results": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    results = await vector_service.search(request.query, request.top_k)
+    return {"results": results}
 
 @app.post("/vector/add")
 async def add_to_vector_db(request: TextRequest):
-    try:
-        result = await vector_service.add_document(request.text)
-        return {"status": "success", "id": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await vector_service.add_document(request.text)
+    return {"status": "success", "id": result}
 
 @app.get("/vector/get/{doc_id}")
 async def get_vector_document(doc_id: str):
+    doc = await vector_service.get_document(doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
+
+# Documents written per backend batch; bounds memory held by the ES/Qdrant/Chroma clients
+INGEST_CHUNK_SIZE = max(1, int(os.getenv("INGEST_CHUNK_SIZE", "1000")))
+
+async def _ingest_chunk(texts: List[str], metadata_list: Optional[List[dict]]):
+    # Elastic (BM25) and Qdrant (vectors) are independent sinks; the Elasticsearch
+    # client is synchronous, so it runs in a thread
+    ids_es, ids_qdrant = await asyncio.gather(
+        asyncio.to_thread(bm25_service.add_documents_batch, texts, metadata_list),
+        qdrant_service.add_documents_batch(texts, metadata_list),
+        return_exceptions=True,
+    )
+    for result in (ids_es, ids_qdrant):
+        if isinstance(result, BaseException):
+            raise result
+    return ids_es, ids_qdrant
+
+def _request_chunks(request: IngestRequest):
+    for start in range(0, len(request.texts), INGEST_CHUNK_SIZE):
+        end = start + INGEST_CHUNK_SIZE
+        metadata = request.metadata_list[start:end] if request.metadata_list is not None else None
+        yield start, request.texts[start:end], metadata
+
+async def _ingest_chunks(request: IngestRequest):
+    for start, texts, metadata in _request_chunks(request):
+        ids_es, ids_qdrant = await _ingest_chunk(texts, metadata)
+        yield start, ids_es, ids_qdrant
+
+async def _ingest_chroma(request: IngestRequest):
+    # The Chroma store is kept for backward-compat only and its ids are not returned,
+    # so it is written after the response instead of on the request path
+    for start, texts, metadata in _request_chunks(request):
+        try:
+            await vector_service.add_documents_batch(texts, metadata)
+        except Exception as e:
+            logger.warning(f"Chroma ingest failed at offset {start}: {str(e)}")
+
+async def _ingest_ndjson_stream(request: IngestRequest):
     try:
-        doc = await vector_service.get_document(doc_id)
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
-        return doc
-    except HTTPException:
-        raise
+        async for start, ids_es, ids_qdrant in _ingest_chunks(request):
+            yield _json_bytes({"offset": start, "elastic_ids": ids_es, "qdrant_ids": ids_qdrant}) + b"\n"
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        yield _json_bytes({"error": str(e)}) + b"\n"
 
-@app.post("/ingest", tags=["vector-search"])
-async def ingest_documents(request: IngestRequest):
+@app.post(
+    "/ingest",
+    tags=["vector-search"],
+    openapi_extra={"requestBody": {"content": {"application/json": {"schema": IngestRequest.model_json_schema()}}, "required": True}},
+)
+async def ingest_documents(http_request: Request, background_tasks: BackgroundTasks, stream: bool = False):
     """
     Ingest documents into the vector database for search.
     
     Adds documents to both BM25 (Elasticsearch) and semantic (Qdrant) search indexes.
     Essential for building the educational content database.
+    Documents are written in chunks of INGEST_CHUNK_SIZE (default: 1000).
     
     - **texts**: List of text documents to ingest
     - **metadata_list**: Optional metadata for each document
+    - **stream**: Return one NDJSON line per completed chunk (default: false)
     
     Returns the document IDs from both search indexes.
     """
-    try:
-        # Add to Elastic for BM25
-        ids_es = bm25_service.add_documents_batch(request.texts, request.metadata_list)
-        # Add to Qdrant for vectors
-        ids_qdrant = await qdrant_service.add_documents_batch(request.texts, request.metadata_list)
-        # Also keep in existing Chroma for backward-compat
-        await vector_service.add_documents_batch(request.texts, request.metadata_list)
-        return {"elastic_ids": ids_es, "qdrant_ids": ids_qdrant}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/search/hybrid", tags=["hybrid-search"])
-async def search_hybrid(request: HybridSearchRequest):
+    # Large bodies are parsed and validated in a worker process so they do not block the event loop
+    body = await http_request.body()
+    if len(body) >= INGEST_POOL_MIN_BYTES:
+        loop = asyncio.get_running_loop()
+        request, errors = await loop.run_in_executor(get_validation_pool(), validate_ingest_body, body)
+    else:
+        request, errors = validate_ingest_body(body)
+    if errors is not None:
+        raise RequestValidationError(errors)
+
+    if stream:
+        background_tasks.add_task(_ingest_chroma, request)
+        return StreamingResponse(_ingest_ndjson_stream(request), media_type="application/x-ndjson")
+    elastic_ids: List[str] = []
+    qdrant_ids: List[str] = []
+    async for _, ids_es, ids_qdrant in _ingest_chunks(request):
+        elastic_ids.extend(ids_es)
+        qdrant_ids.extend(ids_qdrant)
+    background_tasks.add_task(_ingest_chroma, request)
+    return {"elastic_ids": elastic_ids, "qdrant_ids": qdrant_ids}
+
+@app.post("/search/hybrid", tags=["hybrid-search"], openapi_extra=_HYBRID_SEARCH_OPENAPI)
+async def search_hybrid(request: HybridSearchRequest = Depends(parse_hybrid_search_request), retriever: HybridRetriever = Depends(get_hybrid_retriever)):
     """
     Perform hybrid search combining BM25 and semantic search.
     
@@ -739,20 +992,16 @@ async def search_hybrid(request: HybridSearchRequest):
     
     - **query**: The search query
     - **top_k**: Number of results to return (default: 10)
-    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: 0.6)
+    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: HYBRID_ALPHA, 0.6 if unset)
     - **filter**: Optional metadata filters
     
     Returns ranked search results with combined scores.
     """
-    try:
-        retriever = HybridRetriever(bm25_service=bm25_service, vector_service=qdrant_service, alpha=request.alpha)
-        results = await retriever.search(request.query, top_k=request.top_k, filter_metadata=request.filter)
-        return {"results": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    results = await retriever.search(request.query, top_k=request.top_k, filter_metadata=request.filter, alpha=request.alpha)
+    return {"results": results}
 
-@app.post("/search/questions", tags=["hybrid-search"])
-async def search_questions(request: HybridSearchRequest):
+@app.post("/search/questions", tags=["hybrid-search"], openapi_extra=_HYBRID_SEARCH_OPENAPI)
+async def search_questions(request: HybridSearchRequest = Depends(parse_hybrid_search_request), retriever: HybridRetriever = Depends(get_hybrid_retriever)):
     """
     Search specifically for questions in the educational database.
     
@@ -761,22 +1010,18 @@ async def search_questions(request: HybridSearchRequest):
     
     - **query**: The search query
     - **top_k**: Number of results to return (default: 10)
-    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: 0.6)
+    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: HYBRID_ALPHA, 0.6 if unset)
     - **filter**: Additional metadata filters (type=question is automatically added)
     
     Returns ranked question results.
     """
-    try:
-        retriever = HybridRetriever(bm25_service=bm25_service, vector_service=qdrant_service, alpha=request.alpha)
-        filt = request.filter or {}
-        filt.update({"type": "question"})
-        results = await retriever.search(request.query, top_k=request.top_k, filter_metadata=filt)
-        return {"results": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    filt = request.filter or {}
+    filt.update({"type": "question"})
+    results = await retriever.search(request.query, top_k=request.top_k, filter_metadata=filt, alpha=request.alpha)
+    return {"results": results}
 
-@app.post("/search/materials", tags=["hybrid-search"])
-async def search_materials(request: HybridSearchRequest):
+@app.post("/search/materials", tags=["hybrid-search"], openapi_extra=_HYBRID_SEARCH_OPENAPI)
+async def search_materials(request: HybridSearchRequest = Depends(parse_hybrid_search_request), retriever: HybridRetriever = Depends(get_hybrid_retriever)):
     """
     Search specifically for educational materials and study guides.
     
@@ -785,19 +1030,40 @@ async def search_materials(request: HybridSearchRequest):
     
     - **query**: The search query
     - **top_k**: Number of results to return (default: 10)
-    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: 0.6)
+    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: HYBRID_ALPHA, 0.6 if unset)
     - **filter**: Additional metadata filters (type=material is automatically added)
     
     Returns ranked material results.
     """
-    try:
-        retriever = HybridRetriever(bm25_service=bm25_service, vector_service=qdrant_service, alpha=request.alpha)
-        filt = request.filter or {}
-        filt.update({"type": "material"})
-        results = await retriever.search(request.query, top_k=request.top_k, filter_metadata=filt)
-        return {"results": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    filt = request.filter or {}
+    filt.update({"type": "material"})
+    results = await retriever.search(request.query, top_k=request.top_k, filter_metadata=filt, alpha=request.alpha)
+    return {"results": results}
+
+@app.post("/search/study", tags=["hybrid-search"], openapi_extra=_HYBRID_SEARCH_OPENAPI)
+async def search_study(request: HybridSearchRequest = Depends(parse_hybrid_search_request), retriever: HybridRetriever = Depends(get_hybrid_retriever)):
+    """
+    Search questions and materials for the same query in one call.
+
+    Both lookups go to Qdrant as one batched request and to Elasticsearch as one
+    _msearch request, and the query is embedded once.
+
+    - **query**: The search query
+    - **top_k**: Number of results per group (default: 10)
+    - **alpha**: Weight for BM25 vs semantic search (0.0-1.0, default: HYBRID_ALPHA, 0.6 if unset)
+    - **filter**: Additional metadata filters (type is set per group)
+
+    Returns ranked question and material results.
+    """
+    base = request.filter or {}
+    questions, materials = await retriever.search_batch(
+        [
+            (request.query, request.top_k, {**base, "type": "question"}),
+            (request.query, request.top_k, {**base, "type": "material"}),
+        ],
+        alpha=request.alpha,
+    )
+    return {"questions": questions, "materials": materials}
 
 # Agent endpoints
 @app.post("/agent/execute", tags=["agents"])
@@ -813,13 +1079,28 @@ async def execute_agent(request: AgentRequest, user=Depends(get_current_user)):
     
     Returns the agent's solution and reasoning process.
     """
-    try:
-        result = await agent_service.execute(request.query, request.tools)
-        return {"result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await agent_service.execute(request.query, request.tools)
+    return {"result": result}
+
+@app.post("/agent/chain", tags=["agents"])
+async def execute_agent_chain(request: AgentChainRequest, user=Depends(get_current_user)):
+    """
+    Execute AI agent over several independent queries.
+    
+    Queries run concurrently, bounded by max_concurrency to respect provider rate limits.
+    
+    - **queries**: The problems or questions for the agent to solve
+    - **tools**: List of tools the agent can use (optional)
+    - **max_concurrency**: Maximum number of queries in flight (default: 10)
+    
+    Returns the agent results in query order, each with its chain_position.
+    """
+    results = await agent_service.execute_chain(request.queries, request.tools, request.max_concurrency or 10)
+    return {"results": results}
 
 # Tools endpoints
+_tools_list_cache = {"version": -1, "body": b""}
+
 @app.get("/tools/list", tags=["tools"])
 async def list_tools(user=Depends(require_roles("admin", "teacher"))):
     """
@@ -830,11 +1111,11 @@ async def list_tools(user=Depends(require_roles("admin", "teacher"))):
     
     Returns a list of tool definitions with names and descriptions.
     """
-    try:
-        tools = tool_registry.list_tools()
-        return {"tools": tools}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # The listing only changes with the registry, so reuse its encoded body until then
+    if _tools_list_cache["version"] != tool_registry.version:
+        _tools_list_cache["body"] = _json_bytes({"tools": tool_registry.list_tools()})
+        _tools_list_cache["version"] = tool_registry.version
+    return Response(content=_tools_list_cache["body"], media_type="application/json")
 
 @app.post("/tools/execute", tags=["tools"])
 async def execute_tool(tool_name: str, parameters: dict, user=Depends(require_roles("admin"))):
@@ -849,11 +1130,8 @@ async def execute_tool(tool_name: str, parameters: dict, user=Depends(require_ro
     
     Returns the tool execution result.
     """
-    try:
-        result = await tool_registry.execute_tool(tool_name, parameters)
-        return {"result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await tool_registry.execute_tool(tool_name, parameters)
+    return {"result": result}
 
 # =============================================================================
 # RBAC PROTECTED ROUTES - Different Role Access Levels
@@ -873,15 +1151,19 @@ async def get_current_user_profile(user: User = Depends(get_current_user)):
     
     Returns user ID, email, username, roles, permissions, and metadata.
     """
-    return {
+    profile = {
         "user_id": user.id,
         "email": user.email,
         "username": user.username,
-        "roles": [role.value for role in user.roles],
-        "permissions": [perm.value for perm in user.get_all_permissions()],
+        "roles": user.role_values,
+        "permissions": user.permission_values,
         "is_active": user.is_active,
         "metadata": user.metadata
     }
+    # Plain str/int/tuple values: orjson encodes them directly, skipping jsonable_encoder
+    if orjson is not None:
+        return ORJSONResponse(profile)
+    return profile
 
 
 @app.get("/auth/refresh")
@@ -896,7 +1178,7 @@ async def refresh_token(refresh_token: str):
 
 
 @app.post("/auth/login", response_model=Token, tags=["authentication"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(background_tasks: BackgroundTasks, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     User login endpoint.
     
@@ -908,12 +1190,14 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     Returns JWT access and refresh tokens along with user information.
     """
     user = user_service_singleton.get_user_by_email(form_data.username)
-    if not user or not user_service_singleton.verify_password(form_data.password, user.hashed_password):
+    if not user or not await user_service_singleton.averify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if user_service_singleton.password_needs_rehash(user.hashed_password):
+        background_tasks.add_task(user_service_singleton.arehash_password, user.id, form_data.password)
     
     access_token = user_service_singleton.create_access_token(
         data={
@@ -950,7 +1234,8 @@ async def register(user_create: UserCreate):
         user = user_service_singleton.register_user(
             email=user_create.email,
             password=user_create.password,
-            username=user_create.username
+            username=user_create.username,
+            hashed_password=await user_service_singleton.ahash_password(user_create.password)
         )
         return User(id=user.id, email=user.email, username=user.username, is_active=user.is_active, roles=[UserRole(r) for r in user.roles.split(',')], permissions=user_service_singleton.get_user_permissions(user))
     except ValueError as e:
@@ -985,6 +1270,17 @@ async def logout(
 # Admin-Only Routes
 # =============================================================================
 
+_ADMIN_DASHBOARD_TEMPLATE = _json_template({
+    "message": "Welcome to admin dashboard",
+    "user": None,
+    "system_stats": {
+        "total_users": 1250,
+        "active_sessions": 89,
+        "system_health": "healthy"
+    }
+}, "user")
+
+
 @app.get("/admin/dashboard", tags=["admin"])
 async def admin_dashboard(user: User = Depends(require_admin)):
     """
@@ -995,31 +1291,57 @@ async def admin_dashboard(user: User = Depends(require_admin)):
     
     Returns system stats including total users, active sessions, and health status.
     """
-    return {
-        "message": "Welcome to admin dashboard",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "roles": [role.value for role in user.roles]
-        },
-        "system_stats": {
-            "total_users": 1250,
-            "active_sessions": 89,
-            "system_health": "healthy"
-        }
-    }
+    return _user_summary_response(_ADMIN_DASHBOARD_TEMPLATE, user)
+
+
+_ALL_USERS_BODY = _json_bytes({
+    "users": [
+        {"id": "1", "email": "user1@example.com", "role": "student"},
+        {"id": "2", "email": "user2@example.com", "role": "teacher"},
+        {"id": "3", "email": "user3@example.com", "role": "admin"}
+    ],
+    "total": 3
+})
 
 
 @app.get("/admin/users")
 async def list_all_users(user: User = Depends(require_user_management)):
     """List all users in the system (admin only)."""
+    return Response(content=_ALL_USERS_BODY, media_type="application/json")
+
+
+@app.post("/admin/users/authorize")
+async def batch_authorize_users(body: BatchAuthorizeRequest, user: User = Depends(require_user_management)):
+    """
+    Filter a list of user ids to those holding a permission through their roles (admin only).
+
+    Roles are read from a per-worker snapshot refreshed every AUTH_USER_MASK_TTL_SECONDS
+    (default 30s), so users created by another worker or role edits made outside the
+    service may take that long to be reflected.
+    """
+    allowed = await asyncio.to_thread(user_service_singleton.batch_authorize, body.user_ids, body.permission)
     return {
-        "users": [
-            {"id": "1", "email": "user1@example.com", "role": "student"},
-            {"id": "2", "email": "user2@example.com", "role": "teacher"},
-            {"id": "3", "email": "user3@example.com", "role": "admin"}
-        ],
-        "total": 3
+        "permission": body.permission.value,
+        "allowed_user_ids": [uid for uid, ok in zip(body.user_ids, allowed.tolist()) if ok],
+    }
+
+
+@app.post("/admin/users/batch-get")
+async def batch_get_users(body: BatchGetUsersRequest, user: User = Depends(require_user_management)):
+    """Fetch several users in one call, keyed by id (admin only)."""
+    db_users = await asyncio.to_thread(user_service_singleton.get_users_by_ids, body.user_ids)
+    return {
+        "users": {
+            str(db_user.id): {
+                "id": db_user.id,
+                "email": db_user.email,
+                "username": db_user.username,
+                "is_active": db_user.is_active,
+                "roles": [role for role in (db_user.roles or "").split(",") if role],
+                "permissions": user_service_singleton.get_user_permissions(db_user),
+            }
+            for db_user in db_users
+        }
     }
 
 
@@ -1049,16 +1371,10 @@ async def delete_user(
 
 
 @app.get("/admin/api-keys")
-async def list_api_keys(admin_user: User = Depends(require_admin)):
+async def list_api_keys(request: Request, admin_user: User = Depends(require_admin)):
     """List all API keys (admin only)."""
-    from auth.api_key_middleware import APIKeyMiddleware
-    
-    # Get API key middleware instance
-    middleware = None
-    for mw in app.user_middleware:
-        if isinstance(mw.cls, APIKeyMiddleware):
-            middleware = mw.cls(app)
-            break
+    # Live API key middleware instance, published on app.state when the stack is built
+    middleware = getattr(request.app.state, "api_key_middleware", None)
     
     if not middleware:
         raise HTTPException(status_code=500, detail="API key middleware not found")
@@ -1093,31 +1409,29 @@ async def create_api_key(
     admin_user: User = Depends(require_admin)
 ):
     """Create a new API key (admin only)."""
-    import secrets
-    import time
-    
     name = key_data.get("name", "New API Key")
     roles = key_data.get("roles", ["student"])
     permissions = key_data.get("permissions", ["external_api_access"])
     expires_days = key_data.get("expires_days", 365)  # Default 1 year
     metadata = key_data.get("metadata", {})
     
-    # Generate secure API key
-    api_key = f"ak_{secrets.token_urlsafe(32)}"
+    # Generate secure API key (same encoding as secrets.token_urlsafe)
+    api_key = "ak_" + base64.urlsafe_b64encode(os.urandom(32)).rstrip(b"=").decode("ascii")
     
-    # Calculate expiration
-    expires_at = int(time.time()) + (expires_days * 24 * 60 * 60)
+    # Calculate expiration from a single (coarse) clock read
+    now = now_s()
+    expires_at = now + expires_days * 86_400
     
     # Create API key info
     key_info = {
         "key": api_key,
-        "key_id": f"key-{int(time.time())}",
+        "key_id": f"key-{now}",
         "name": name,
         "roles": roles,
         "permissions": permissions,
         "is_active": True,
         "expires_at": expires_at,
-        "created_at": int(time.time()),
+        "created_at": now,
         "metadata": metadata
     }
     
@@ -1134,31 +1448,21 @@ async def create_api_key(
 
 @app.put("/admin/api-keys/{key_id}")
 async def update_api_key(
+    request: Request,
     key_id: str,
     update_data: dict,
     admin_user: User = Depends(require_admin)
 ):
     """Update an API key (admin only)."""
-    from auth.api_key_middleware import APIKeyMiddleware
-    
-    # Get API key middleware instance
-    middleware = None
-    for mw in app.user_middleware:
-        if isinstance(mw.cls, APIKeyMiddleware):
-            middleware = mw.cls(app)
-            break
+    # Live API key middleware instance, published on app.state when the stack is built
+    middleware = getattr(request.app.state, "api_key_middleware", None)
     
     if not middleware:
         raise HTTPException(status_code=500, detail="API key middleware not found")
     
     # Find the API key
-    key_info = None
-    target_key = None
-    for key, info in middleware.api_keys.items():
-        if info.key_id == key_id:
-            key_info = info
-            target_key = key
-            break
+    target_key = middleware.key_id_to_key.get(key_id)
+    key_info = middleware.api_keys.get(target_key) if target_key else None
     
     if not key_info:
         raise HTTPException(status_code=404, detail="API key not found")
@@ -1195,34 +1499,25 @@ async def update_api_key(
 
 @app.delete("/admin/api-keys/{key_id}")
 async def delete_api_key(
+    request: Request,
     key_id: str,
     admin_user: User = Depends(require_admin)
 ):
     """Delete an API key (admin only)."""
-    from auth.api_key_middleware import APIKeyMiddleware
-    
-    # Get API key middleware instance
-    middleware = None
-    for mw in app.user_middleware:
-        if isinstance(mw.cls, APIKeyMiddleware):
-            middleware = mw.cls(app)
-            break
+    # Live API key middleware instance, published on app.state when the stack is built
+    middleware = getattr(request.app.state, "api_key_middleware", None)
     
     if not middleware:
         raise HTTPException(status_code=500, detail="API key middleware not found")
     
     # Find and remove the API key
-    target_key = None
-    for key, info in middleware.api_keys.items():
-        if info.key_id == key_id:
-            target_key = key
-            break
+    target_key = middleware.key_id_to_key.pop(key_id, None)
     
     if not target_key:
         raise HTTPException(status_code=404, detail="API key not found")
     
     # Remove from middleware (in production, this would be persisted to database)
-    del middleware.api_keys[target_key]
+    middleware.api_keys.pop(target_key, None)
     
     return {
         "message": f"API key {key_id} deleted successfully",
@@ -1230,22 +1525,35 @@ async def delete_api_key(
     }
 
 
+_SYSTEM_STATUS_BODY = _json_bytes({
+    "status": "healthy",
+    "uptime": "7 days, 3 hours",
+    "memory_usage": "45%",
+    "cpu_usage": "23%",
+    "active_connections": 156
+})
+
+
 @app.get("/system/status")
 async def system_status(user: User = Depends(require_system_management)):
     """Get system status and health metrics."""
-    return {
-        "status": "healthy",
-        "uptime": "7 days, 3 hours",
-        "memory_usage": "45%",
-        "cpu_usage": "23%",
-        "active_connections": 156
-    }
+    return Response(content=_SYSTEM_STATUS_BODY, media_type="application/json")
 
 
 # =============================================================================
 # Teacher and Admin Routes
 # =============================================================================
 
+_TEACHER_DASHBOARD_TEMPLATE = _json_template({
+    "message": "Welcome to teacher dashboard",
+    "user": None,
+    "courses": [
+        {"id": "1", "name": "Mathematics 101", "students": 25},
+        {"id": "2", "name": "Physics 201", "students": 18}
+    ]
+}, "user")
+
+
 @app.get("/teacher/dashboard", tags=["rbac"])
 async def teacher_dashboard(user: User = Depends(require_teacher_or_admin)):
     """
@@ -1256,30 +1564,22 @@ async def teacher_dashboard(user: User = Depends(require_teacher_or_admin)):
     
     Returns course information and teaching statistics.
     """
-    return {
-        "message": "Welcome to teacher dashboard",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "roles": [role.value for role in user.roles]
-        },
-        "courses": [
-            {"id": "1", "name": "Mathematics 101", "students": 25},
-            {"id": "2", "name": "Physics 201", "students": 18}
-        ]
-    }
+    return _user_summary_response(_TEACHER_DASHBOARD_TEMPLATE, user)
+
+
+_COURSES_BODY = _json_bytes({
+    "courses": [
+        {"id": "1", "name": "Mathematics 101", "instructor": "Dr. Smith"},
+        {"id": "2", "name": "Physics 201", "instructor": "Dr. Johnson"},
+        {"id": "3", "name": "Chemistry 101", "instructor": "Dr. Brown"}
+    ]
+})
 
 
 @app.get("/courses")
 async def list_courses(user: User = Depends(require_student_or_above)):
     """List all courses (students, teachers, admins)."""
-    return {
-        "courses": [
-            {"id": "1", "name": "Mathematics 101", "instructor": "Dr. Smith"},
-            {"id": "2", "name": "Physics 201", "instructor": "Dr. Johnson"},
-            {"id": "3", "name": "Chemistry 101", "instructor": "Dr. Brown"}
-        ]
-    }
+    return Response(content=_COURSES_BODY, media_type="application/json")
 
 
 @app.post("/courses")
@@ -1320,16 +1620,19 @@ async def delete_course(
     }
 
 
+_CONTENT_BODY = _json_bytes({
+    "content": [
+        {"id": "1", "title": "Introduction to Calculus", "type": "lesson"},
+        {"id": "2", "title": "Physics Lab Manual", "type": "lab"},
+        {"id": "3", "title": "Chemistry Quiz", "type": "quiz"}
+    ]
+})
+
+
 @app.get("/content")
 async def list_content(user: User = Depends(require_student_or_above)):
     """List all content (students, teachers, admins)."""
-    return {
-        "content": [
-            {"id": "1", "title": "Introduction to Calculus", "type": "lesson"},
-            {"id": "2", "title": "Physics Lab Manual", "type": "lab"},
-            {"id": "3", "title": "Chemistry Quiz", "type": "quiz"}
-        ]
-    }
+    return Response(content=_CONTENT_BODY, media_type="application/json")
 
 
 @app.post("/content")
@@ -1349,32 +1652,34 @@ async def create_content(
 # Student Routes (Students, Teachers, Admins)
 # =============================================================================
 
+_STUDENT_DASHBOARD_TEMPLATE = _json_template({
+    "message": "Welcome to student dashboard",
+    "user": None,
+    "enrolled_courses": [
+        {"id": "1", "name": "Mathematics 101", "progress": "75%"},
+        {"id": "2", "name": "Physics 201", "progress": "45%"}
+    ]
+}, "user")
+
+
 @app.get("/student/dashboard")
 async def student_dashboard(user: User = Depends(require_student_or_above)):
     """Student dashboard with enrolled courses."""
-    return {
-        "message": "Welcome to student dashboard",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "roles": [role.value for role in user.roles]
-        },
-        "enrolled_courses": [
-            {"id": "1", "name": "Mathematics 101", "progress": "75%"},
-            {"id": "2", "name": "Physics 201", "progress": "45%"}
-        ]
-    }
+    return _user_summary_response(_STUDENT_DASHBOARD_TEMPLATE, user)
+
+
+_QUESTIONS_BODY = _json_bytes({
+    "questions": [
+        {"id": "1", "text": "What is the derivative of x²?", "type": "math"},
+        {"id": "2", "text": "Explain Newton's laws", "type": "physics"}
+    ]
+})
 
 
 @app.get("/questions")
 async def list_questions(user: User = Depends(require_student_or_above)):
     """List questions (students, teachers, admins)."""
-    return {
-        "questions": [
-            {"id": "1", "text": "What is the derivative of x²?", "type": "math"},
-            {"id": "2", "text": "Explain Newton's laws", "type": "physics"}
-        ]
-    }
+    return Response(content=_QUESTIONS_BODY, media_type="application/json")
 
 
 @app.post("/questions")
@@ -1458,11 +1763,8 @@ async def external_llm_generate(
     api_key_user = Depends(require_api_key_roles("admin", "teacher"))
 ):
     """External LLM generation endpoint (requires API key with admin/teacher role)."""
-    try:
-        response = await llm_service.generate_text(request.text, request.model)
-        return {"response": response, "generated_by": "external_api"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    response = await llm_service.generate_text(request.text, request.model)
+    return {"response": response, "generated_by": "external_api"}
 
 
 @app.post("/external/embedding/generate")
@@ -1471,11 +1773,10 @@ async def external_embedding_generate(
     api_key_user = Depends(require_api_key_permissions("external_api_access"))
 ):
     """External embedding generation endpoint (requires API key with external_api_access permission)."""
-    try:
-        embedding = await embedding_service.generate_embedding(request.text, request.model)
-        return {"embedding": embedding.tolist(), "generated_by": "external_api"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    embedding = await embedding_service.generate_embedding(request.text, request.model)
+    if orjson is not None:
+        return ORJSONResponse({"embedding": embedding, "generated_by": "external_api"})
+    return {"embedding": embedding.tolist(), "generated_by": "external_api"}
 
 
 # =============================================================================
@@ -1520,8 +1821,8 @@ async def get_my_permissions(user: User = Depends(get_current_user)):
     """Get current user's permissions and roles."""
     return {
         "user_id": user.id,
-        "roles": [role.value for role in user.roles],
-        "permissions": [perm.value for perm in user.get_all_permissions()],
+        "roles": user.role_values,
+        "permissions": user.permission_values,
         "can_manage_users": user.has_permission(Permission.CREATE_USER),
         "can_manage_courses": user.has_permission(Permission.CREATE_COURSE),
         "can_view_analytics": user.has_permission(Permission.READ_ANALYTICS),
@@ -1805,13 +2106,16 @@ async def get_available_features(user: User = Depends(get_current_user)):
         "available_features": available_features,
         "total_features": len(all_features),
         "available_count": len(available_features),
-        "user_permissions": [perm.value for perm in user.get_all_permissions()]
+        "user_permissions": user.permission_values
     }
 
 if __name__ == "__main__":
     cert_file = os.getenv("TLS_CERT_FILE")
     key_file = os.getenv("TLS_KEY_FILE")
+    # uvloop when installed (not available on Windows); UVLOOP_ENABLED=false keeps stock asyncio
+    use_uvloop = uvloop is not None and os.getenv("UVLOOP_ENABLED", "true").lower() in {"1", "true", "yes"}
+    loop = "uvloop" if use_uvloop else "asyncio"
     if cert_file and key_file:
-        uvicorn.run(app, host="0.0.0.0", port=8000, ssl_certfile=cert_file, ssl_keyfile=key_file)
+        uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, ssl_certfile=cert_file, ssl_keyfile=key_file)
     else:
-        uvicorn.run(app, host="0.0.0.0", port=8000)
+        uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop)
@@ -0,0 +1,31 @@
+import os
+import time
+import asyncio
+
+# Coarse wall clock for second-resolution timestamps on hot paths (API key
+# expiry, created/last-used stamps). While run_clock() is running, now_s()
+# lags the real clock by at most COARSE_CLOCK_REFRESH_SECONDS (100ms by
+# default); otherwise it reads the clock directly.
+REFRESH_SECONDS = float(os.getenv("COARSE_CLOCK_REFRESH_SECONDS", "0.1"))
+
+_now_s = int(time.time())
+_running = False
+
+
+def now_s() -> int:
+    """Current Unix time in whole seconds."""
+    if _running:
+        return _now_s
+    return int(time.time())
+
+
+async def run_clock() -> None:
+    """Refresh the cached time every REFRESH_SECONDS until cancelled."""
+    global _now_s, _running
+    _running = True
+    try:
+        while True:
+            _now_s = int(time.time())
+            await asyncio.sleep(REFRESH_SECONDS)
+    finally:
+        _running = False
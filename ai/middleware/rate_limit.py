@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 import time
 import hashlib
+import secrets
 from typing import Iterable, Optional, Dict, Any
 from enum import Enum
 
@@ -93,14 +94,104 @@ def _get_client_identifier(request: Request) -> str:
         return f"api_key:{api_key_hash}"
     
     # Fall back to IP address
-        client_ip = request.client.host if request.client else "unknown"
+    client_ip = request.client.host if request.client else "unknown"
     return f"ip:{client_ip}"
 
 
-async def _check_rate_limit_redis(client_id: str, limit: int, window: int) -> tuple[bool, int, int]:
-    """Check rate limit using Redis"""
+# Sliding window in one round trip: drop expired entries, count, admit and refresh the TTL.
+# Returns {allowed, count, retry_after_ms}
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return {1, count + 1, 0}
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local retry_after = window
+if oldest[2] then
+    retry_after = tonumber(oldest[2]) + window - now
+end
+return {0, count, retry_after}
+"""
+
+
+class RedisRateLimiter:
+    """
+    Sliding-window limiter backed by a Redis Lua script.
+
+    Rejections are remembered in-process until the window frees a slot, so a
+    key that is known to be limited is answered without a Redis round trip.
+    """
+
+    def __init__(self):
+        self.local_cache_max_entries = int(os.getenv("RATE_LIMIT_LOCAL_CACHE_MAX_ENTRIES", "10000"))
+        self._blocked_until: Dict[str, float] = {}  # key -> epoch ms
+        self._script = None
+        self._script_client = None
+
+    def blocked_for_ms(self, key: str) -> int:
+        """Milliseconds until `key` may be admitted again per the local cache, or 0."""
+        until = self._blocked_until.get(key)
+        if until is None:
+            return 0
+        remaining = int(until - time.time() * 1000)
+        if remaining <= 0:
+            self._blocked_until.pop(key, None)
+            return 0
+        return remaining
+
+    def _block(self, key: str, until_ms: float) -> None:
+        if len(self._blocked_until) >= self.local_cache_max_entries:
+            now_ms = time.time() * 1000
+            self._blocked_until = {k: v for k, v in self._blocked_until.items() if v > now_ms}
+            if len(self._blocked_until) >= self.local_cache_max_entries:
+                self._blocked_until.pop(next(iter(self._blocked_until)))
+        self._blocked_until[key] = until_ms
+
+    async def hit(self, key: str, limit: int, window: int) -> Optional[tuple[bool, int, int]]:
+        """
+        Record one request for `key` and decide whether it is admitted.
+
+        Returns:
+            (allowed, count, retry_after_ms), or None when Redis is not
+            configured or the script fails
+        """
         redis = get_redis_client()
         if redis is None:
+            return None
+        if self._script is None or self._script_client is not redis:
+            # register_script runs EVALSHA and loads the script on NOSCRIPT
+            self._script = redis.register_script(_SLIDING_WINDOW_LUA)
+            self._script_client = redis
+
+        now_ms = int(time.time() * 1000)
+        try:
+            allowed, count, retry_after_ms = await self._script(
+                keys=[f"ratelimit:sliding:{key}"],
+                args=[now_ms, window * 1000, limit, f"{now_ms}:{secrets.token_hex(4)}"],
+            )
+        except Exception as e:
+            log_with_context("warning", f"Rate limit script failed for {key}: {e}")
+            return None
+
+        if not allowed:
+            self._block(key, now_ms + int(retry_after_ms))
+        return bool(allowed), int(count), int(retry_after_ms)
+
+
+redis_rate_limiter = RedisRateLimiter()
+
+
+async def _check_rate_limit_redis(client_id: str, limit: int, window: int) -> tuple[bool, int, int]:
+    """Check rate limit using Redis"""
+    redis = get_redis_client()
+    if redis is None:
         return True, 0, 0  # Allow if Redis is unavailable
     
     current_time = int(time.time())
@@ -117,22 +208,14 @@ async def _check_rate_limit_redis(client_id: str, limit: int, window: int) -> tu
         return count <= limit, count, limit
     
     elif rate_limit_config.strategy == RateLimitStrategy.SLIDING_WINDOW:
-        # Sliding window using sorted sets
-        key = f"ratelimit:sliding:{client_id}"
-        
-        # Remove expired entries
-        await redis.zremrangebyscore(key, 0, current_time - window)
-        
-        # Count current entries
-        count = await redis.zcard(key)
-        
-        if count < limit:
-            # Add current request
-            await redis.zadd(key, {str(current_time): current_time})
-            await redis.expire(key, window)
-            return True, count + 1, limit
-        else:
-            return False, count, limit
+        # Sliding window using sorted sets, checked atomically by a Lua script
+        if redis_rate_limiter.blocked_for_ms(client_id):
+            return False, limit, limit
+        result = await redis_rate_limiter.hit(client_id, limit, window)
+        if result is None:
+            return True, 0, limit
+        allowed, count, _ = result
+        return allowed, count, limit
     
     elif rate_limit_config.strategy == RateLimitStrategy.TOKEN_BUCKET:
         # Token bucket algorithm
@@ -216,10 +299,10 @@ class EnhancedRateLimitMiddleware(BaseHTTPMiddleware):
                     user_id=user_id
                 )
                 
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "detail": "Rate limit exceeded",
+                return JSONResponse(
+                    status_code=429,
+                    content={
+                        "detail": "Rate limit exceeded",
                         "current_count": current_count,
                         "max_count": max_count,
                         "window_seconds": window,
@@ -258,6 +341,15 @@ def setup_rate_limiting(app):
     app.add_middleware(EnhancedRateLimitMiddleware)
 
 
+def rate_limit_key(user_id: str = "", api_key: str = "", endpoint: str = "") -> str:
+    """Composite limiter key for a caller and endpoint; API keys are hashed"""
+    if user_id:
+        caller = f"user:{user_id}"
+    else:
+        caller = f"api_key:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+    return f"{caller}:{endpoint}"
+
+
 def get_rate_limit_status(client_id: str = None) -> Dict[str, Any]:
     """Get current rate limit status for debugging"""
     if not client_id:
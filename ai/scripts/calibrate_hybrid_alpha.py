@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script to compute the hybrid search alpha (HYBRID_ALPHA) from a validation set
+
+Each line of the input file is a JSON object:
+    {"query": "...", "relevant_ids": ["id1", "id2"], "filter": {...}}
+
+BM25-only and semantic-only retrieval are scored separately (MRR or
+recall@k) and alpha is set to sem / (bm25 + sem). Run once offline and put
+the printed value in the environment instead of tuning alpha per request.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from embedding_model.embedding_service import EmbeddingService
+from vector_db.elasticsearch_service import ElasticBM25Service
+from vector_db.qdrant_service import QdrantVectorService
+from vector_db.hybrid_retriever import alpha_from_scores
+
+
+def score_results(result_ids, relevant_ids, metric, k):
+    """MRR or recall@k of one ranked id list"""
+    relevant = set(relevant_ids)
+    if not relevant:
+        return 0.0
+    if metric == "recall":
+        return len(relevant.intersection(result_ids[:k])) / len(relevant)
+    for rank, doc_id in enumerate(result_ids[:k], start=1):
+        if doc_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+async def calibrate(path, metric, k):
+    """Average each retriever's score over the validation set"""
+    bm25_service = ElasticBM25Service()
+    qdrant_service = QdrantVectorService()
+    qdrant_service.set_embedding_service(EmbeddingService())
+
+    bm25_total = 0.0
+    semantic_total = 0.0
+    count = 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            relevant_ids = [str(i) for i in example.get("relevant_ids", [])]
+            filt = example.get("filter")
+
+            bm25_results = bm25_service.search(example["query"], top_k=k, filter_metadata=filt)
+            semantic_results = await qdrant_service.search(example["query"], top_k=k, filter_metadata=filt)
+
+            bm25_total += score_results([str(r.get("id")) for r in bm25_results], relevant_ids, metric, k)
+            semantic_total += score_results([str(r.get("id")) for r in semantic_results], relevant_ids, metric, k)
+            count += 1
+
+    if count == 0:
+        print("No validation queries found")
+        return None
+
+    bm25_score = bm25_total / count
+    semantic_score = semantic_total / count
+    alpha = alpha_from_scores(bm25_score, semantic_score)
+    print(f"Queries: {count}")
+    print(f"BM25 {metric}@{k}: {bm25_score:.4f}")
+    print(f"Semantic {metric}@{k}: {semantic_score:.4f}")
+    print(f"HYBRID_ALPHA={alpha:.2f}")
+    return alpha
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute HYBRID_ALPHA from a validation query set")
+    parser.add_argument("validation_file", help="JSONL file with query and relevant_ids per line")
+    parser.add_argument("--metric", choices=["mrr", "recall"], default="mrr")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(calibrate(args.validation_file, args.metric, args.k))
+
+
+if __name__ == "__main__":
+    main()
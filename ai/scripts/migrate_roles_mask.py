@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration script for the users.roles_mask column
+
+Adds users.roles_mask to databases created before the column existed and
+recomputes it from the comma-separated users.roles column. Safe to re-run;
+run it after deploying, and again after any bulk or raw-SQL edit of roles
+that bypassed the ORM.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, inspect, select, text, update
+
+from auth.user_service import DBUser, roles_mask_from_csv
+
+
+def migrate(database_url):
+    engine = create_engine(database_url)
+    table = DBUser.__tablename__
+    columns = {column["name"] for column in inspect(engine).get_columns(table)}
+    with engine.begin() as conn:
+        if "roles_mask" not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN roles_mask BIGINT"))
+            print(f"Added {table}.roles_mask")
+        updated = 0
+        for (roles,) in conn.execute(select(DBUser.roles).distinct()).all():
+            result = conn.execute(
+                update(DBUser).where(DBUser.roles == roles).values(roles_mask=roles_mask_from_csv(roles or ""))
+            )
+            updated += result.rowcount
+    print(f"Recomputed roles_mask for {updated} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add and backfill users.roles_mask")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./test.db"))
+    args = parser.parse_args()
+
+    migrate(args.database_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from auth.models import User, UserRole, Permission, RolePermissions, ROLE_MASK, permission_mask
+
+ALL_ROLE_SETS = [[], [UserRole.STUDENT], [UserRole.TEACHER], [UserRole.ADMIN], [UserRole.STUDENT, UserRole.TEACHER]]
+
+
+def expected_permissions(roles, direct=()):
+    """The set-based answer the bitmasks must reproduce."""
+    perms = set(direct)
+    for role in roles:
+        perms |= RolePermissions.ROLE_PERMISSIONS[role]
+    return perms
+
+
+def make_user(roles, permissions=()):
+    return User(id=1, email="user@example.com", roles=list(roles), permissions=list(permissions))
+
+
+@pytest.mark.parametrize("roles", ALL_ROLE_SETS)
+def test_has_permission_matches_role_sets(roles):
+    user = make_user(roles)
+    expected = expected_permissions(roles)
+    for permission in Permission:
+        assert user.has_permission(permission) == (permission in expected)
+    assert user.get_all_permissions() == expected
+
+
+@pytest.mark.parametrize("role", list(UserRole))
+def test_role_has_permission_matches_role_sets(role):
+    for permission in Permission:
+        assert RolePermissions.has_permission(role, permission) == (permission in RolePermissions.get_permissions(role))
+
+
+@pytest.mark.parametrize("roles", ALL_ROLE_SETS)
+def test_has_any_permission_matches_role_sets(roles):
+    user = make_user(roles)
+    expected = expected_permissions(roles)
+    for permission in Permission:
+        others = [Permission.MANAGE_SYSTEM, permission]
+        assert user.has_any_permission(others) == bool(expected.intersection(others))
+    assert user.has_any_permission([]) is False
+
+
+def test_direct_permissions_are_granted():
+    user = make_user([UserRole.STUDENT], [Permission.MANAGE_SYSTEM])
+    assert user.has_permission(Permission.MANAGE_SYSTEM)
+    assert user.has_any_permission([Permission.DELETE_USER, Permission.MANAGE_SYSTEM])
+    assert not user.has_permission(Permission.DELETE_USER)
+    assert user.get_all_permissions() == expected_permissions([UserRole.STUDENT], [Permission.MANAGE_SYSTEM])
+
+
+def test_reassigning_roles_or_permissions_drops_cached_views():
+    user = make_user([UserRole.ADMIN])
+    assert user.has_permission(Permission.DELETE_USER)
+    assert user.has_role(UserRole.ADMIN)
+
+    user.roles = [UserRole.STUDENT]
+    assert not user.has_permission(Permission.DELETE_USER)
+    assert not user.has_role(UserRole.ADMIN)
+    assert user.role_values == ("student",)
+
+    user.permissions = [Permission.DELETE_USER]
+    assert user.has_permission(Permission.DELETE_USER)
+    assert Permission.DELETE_USER in user.get_all_permissions()
+
+
+def test_batch_check_matches_scalar_path():
+    role_masks = [0, *ROLE_MASK.values(), ROLE_MASK[UserRole.STUDENT] | permission_mask([Permission.MANAGE_SYSTEM])]
+    masks = np.array(role_masks, dtype=np.uint64)
+    for permission in Permission:
+        expected = [bool(mask & permission_mask([permission])) for mask in role_masks]
+        assert RolePermissions.batch_check(masks, permission).tolist() == expected
+    for role in UserRole:
+        for permission in Permission:
+            assert bool(RolePermissions.batch_check(np.array([ROLE_MASK[role]], dtype=np.uint64), permission)[0]) == (
+                RolePermissions.has_permission(role, permission)
+            )
@@ -0,0 +1,125 @@
+import pytest
+from unittest.mock import MagicMock
+
+import middleware.rate_limit as rate_limit
+from middleware.rate_limit import RedisRateLimiter, RateLimitStrategy
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class FakeSlidingWindowScript:
+    """In-memory stand-in for _SLIDING_WINDOW_LUA with the same arguments and reply."""
+
+    def __init__(self):
+        self.calls = 0
+        self.entries = {}
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        now, window, limit, member = args
+        scores = [s for s in self.entries.get(keys[0], []) if s > now - window]
+        if len(scores) < limit:
+            scores.append(now)
+            self.entries[keys[0]] = scores
+            return [1, len(scores), 0]
+        self.entries[keys[0]] = scores
+        return [0, len(scores), min(scores) + window - now]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def script(monkeypatch):
+    script = FakeSlidingWindowScript()
+    redis = MagicMock()
+    redis.register_script.return_value = script
+    monkeypatch.setattr(rate_limit, "get_redis_client", lambda: redis)
+    return script
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_limit_then_denies(clock, script):
+    limiter = RedisRateLimiter()
+    for expected_count in (1, 2, 3):
+        assert await limiter.hit("user:1", limit=3, window=60) == (True, expected_count, 0)
+    allowed, count, retry_after_ms = await limiter.hit("user:1", limit=3, window=60)
+    assert (allowed, count) == (False, 3)
+    assert retry_after_ms == 60_000
+    # Other keys have their own window
+    assert (await limiter.hit("user:2", limit=3, window=60))[0] is True
+
+
+@pytest.mark.asyncio
+async def test_denial_is_cached_locally_until_retry_after(clock, script):
+    limiter = RedisRateLimiter()
+    await limiter.hit("user:1", limit=1, window=10)
+    clock.now += 4
+    allowed, _, retry_after_ms = await limiter.hit("user:1", limit=1, window=10)
+    assert not allowed and retry_after_ms == 6_000
+    assert limiter.blocked_for_ms("user:1") == 6_000
+
+    clock.now += 5.5
+    assert limiter.blocked_for_ms("user:1") == 500
+
+    clock.now += 0.5
+    assert limiter.blocked_for_ms("user:1") == 0
+    assert "user:1" not in limiter._blocked_until
+    # The window has moved on, so Redis admits the key again
+    assert (await limiter.hit("user:1", limit=1, window=10))[0] is True
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_check_skips_redis_while_blocked(clock, script, monkeypatch):
+    limiter = RedisRateLimiter()
+    monkeypatch.setattr(rate_limit, "redis_rate_limiter", limiter)
+    monkeypatch.setattr(rate_limit.rate_limit_config, "strategy", RateLimitStrategy.SLIDING_WINDOW)
+    assert await rate_limit._check_rate_limit_redis("ip:1", 1, 60) == (True, 1, 1)
+    assert (await rate_limit._check_rate_limit_redis("ip:1", 1, 60))[0] is False
+    calls = script.calls
+    assert (await rate_limit._check_rate_limit_redis("ip:1", 1, 60))[0] is False
+    assert script.calls == calls
+
+
+@pytest.mark.asyncio
+async def test_script_failure_fails_open(clock, monkeypatch):
+    async def broken(keys, args):
+        raise ConnectionError("redis down")
+
+    redis = MagicMock()
+    redis.register_script.return_value = broken
+    monkeypatch.setattr(rate_limit, "get_redis_client", lambda: redis)
+    limiter = RedisRateLimiter()
+    assert await limiter.hit("user:1", limit=1, window=60) is None
+    assert limiter.blocked_for_ms("user:1") == 0
+
+
+def test_block_drops_expired_entries_before_evicting_live_ones(clock):
+    limiter = RedisRateLimiter()
+    limiter.local_cache_max_entries = 2
+    now_ms = clock.now * 1000
+    limiter._block("expired", now_ms - 1)
+    limiter._block("live", now_ms + 1_000)
+    limiter._block("new", now_ms + 1_000)
+    assert set(limiter._blocked_until) == {"live", "new"}
+
+
+def test_block_evicts_oldest_live_entry_when_full(clock):
+    limiter = RedisRateLimiter()
+    limiter.local_cache_max_entries = 2
+    now_ms = clock.now * 1000
+    limiter._block("first", now_ms + 1_000)
+    limiter._block("second", now_ms + 1_000)
+    limiter._block("third", now_ms + 1_000)
+    assert list(limiter._blocked_until) == ["second", "third"]
+    assert limiter.blocked_for_ms("first") == 0
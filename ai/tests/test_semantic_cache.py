@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import AsyncMock
+from cache.semantic_cache import SemanticCache
+
+VECTORS = {
+    "what is 2+2": [1.0, 0.0, 0.0],
+    "what's 2 + 2": [0.99, 0.05, 0.0],
+    "capital of france": [0.0, 1.0, 0.0],
+}
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    embedding_service = AsyncMock()
+    embedding_service.generate_embedding.side_effect = lambda text, model: VECTORS[text]
+    return SemanticCache(embedding_service=embedding_service, threshold=0.92, ttl_seconds=60, max_entries=2)
+
+@pytest.mark.asyncio
+async def test_lookup_hits_paraphrase(cache):
+    await cache.store("what is 2+2", "4")
+    assert await cache.lookup("what's 2 + 2") == "4"
+    assert await cache.lookup("capital of france") is None
+    assert cache.get_stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_lookup_is_namespaced(cache):
+    await cache.store("what is 2+2", "4", namespace="a")
+    assert await cache.lookup("what is 2+2", namespace="b") is None
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_evicted(cache):
+    cache.ttl_seconds = 0
+    await cache.store("what is 2+2", "4")
+    assert await cache.lookup("what is 2+2") is None
+    assert cache.get_stats()["evictions"] >= 1
+
+@pytest.mark.asyncio
+async def test_int8_quantization_keeps_hits(cache):
+    cache.quantization = "int8"
+    await cache.store("what is 2+2", "4")
+    assert cache._namespaces["default"].vectors[0].dtype.name == "int8"
+    assert await cache.lookup("what's 2 + 2") == "4"
+    assert await cache.lookup("capital of france") is None
+
+@pytest.mark.asyncio
+async def test_overflow_evicts_oldest_without_rebuilding_every_store(cache, monkeypatch):
+    vectors = {f"q{i}": [float(i + 1), 1.0, 0.5] for i in range(10)}
+    cache.embedding_service.generate_embedding.side_effect = lambda text, model: vectors[text]
+    cache.max_entries = 4
+    cache.compact_ratio = 0.5
+    rebuilds = []
+    original = cache._rebuild
+    monkeypatch.setattr(cache, "_rebuild", lambda ns: (rebuilds.append(1), original(ns)))
+    for i in range(10):
+        await cache.store(f"q{i}", i)
+    assert cache.get_stats()["entries"] == 4
+    assert cache.get_stats()["evictions"] == 6
+    assert len(rebuilds) < 6
+    cache.threshold = 0.0
+    # The evicted q0 is never returned, even though it is the closest match
+    assert await cache.lookup("q0") in {6, 7, 8, 9}
+
+@pytest.mark.asyncio
+async def test_least_recently_used_namespace_is_dropped(cache):
+    cache.max_namespaces = 2
+    await cache.store("what is 2+2", "4", namespace="conv:1")
+    await cache.store("what is 2+2", "4", namespace="conv:2")
+    assert await cache.lookup("what is 2+2", namespace="conv:1") == "4"
+    await cache.store("what is 2+2", "4", namespace="conv:3")
+    assert list(cache._namespaces) == ["conv:1", "conv:3"]
+
+@pytest.mark.asyncio
+async def test_lookup_misses_when_namespace_is_emptied_while_embedding(cache):
+    await cache.store("what is 2+2", "4")
+    ns = cache._namespaces["default"]
+
+    async def embed_then_expire(text, model):
+        # Another request evicts (and compacts away) every entry during the await
+        cache._evict(ns, float("inf"))
+        return VECTORS[text]
+
+    cache.embedding_service.generate_embedding.side_effect = embed_then_expire
+    assert await cache.lookup("what is 2+2") is None
+    assert cache.get_stats()["misses"] == 1
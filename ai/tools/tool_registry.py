@@ -1,8 +1,10 @@
 import os
+import time
 import asyncio
 import json
 import requests
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from langchain.tools import BaseTool, tool
 from langchain.schema import HumanMessage
 import logging
@@ -19,6 +21,7 @@ class ToolRegistry:
     
     def __init__(self):
         self.tools = []
+        self.version = 0  # Bumped on every change to the tool set
         self._register_default_tools()
     
     def _register_default_tools(self):
@@ -33,6 +36,7 @@ class ToolRegistry:
             MathTool(),
             TextProcessingTool()
         ]
+        self.version += 1
     
     def get_tools(self) -> List[BaseTool]:
         """
@@ -91,6 +95,7 @@ class ToolRegistry:
             tool: Tool instance to add
         """
         self.tools.append(tool)
+        self.version += 1
         logger.info(f"Added tool: {tool.name}")
     
     def remove_tool(self, tool_name: str) -> bool:
@@ -106,11 +111,103 @@ class ToolRegistry:
         for i, tool in enumerate(self.tools):
             if tool.name == tool_name:
                 del self.tools[i]
+                self.version += 1
                 logger.info(f"Removed tool: {tool_name}")
                 return True
         
         return False
 
+class ToolCallDeduplicator:
+    """
+    Collapses identical tool calls made by concurrent agents.
+
+    Calls are keyed by tool name and canonicalized input. While a call is in
+    flight, callers with the same key await the same future instead of running
+    the tool again. Results of idempotent tools are also kept for a short TTL.
+    """
+
+    # Tools whose output depends on when they are called
+    NON_IDEMPOTENT_TOOLS = {"datetime"}
+
+    def __init__(self):
+        self.ttl_seconds = float(os.getenv("TOOL_RESULT_CACHE_TTL_SECONDS", "60"))
+        self.max_entries = int(os.getenv("TOOL_RESULT_CACHE_MAX_ENTRIES", "1024"))
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._tool_result_cache: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+
+    @staticmethod
+    def _make_key(tool_name: str, tool_input: Any) -> Tuple[str, str]:
+        if isinstance(tool_input, str):
+            try:
+                tool_input = json.loads(tool_input)
+            except ValueError:
+                return tool_name, tool_input
+        return tool_name, json.dumps(tool_input, sort_keys=True, default=str)
+
+    def _get_cached(self, key: Tuple[str, str]) -> Optional[Tuple[float, Any]]:
+        entry = self._tool_result_cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl_seconds:
+            del self._tool_result_cache[key]
+            return None
+        self._tool_result_cache.move_to_end(key)
+        return entry
+
+    def _set_cached(self, key: Tuple[str, str], result: Any) -> None:
+        self._tool_result_cache[key] = (time.monotonic(), result)
+        self._tool_result_cache.move_to_end(key)
+        while len(self._tool_result_cache) > self.max_entries:
+            self._tool_result_cache.popitem(last=False)
+
+    async def run(self, tool: BaseTool, tool_input: Any) -> Any:
+        key = self._make_key(tool.name, tool_input)
+        cacheable = tool.name not in self.NON_IDEMPOTENT_TOOLS and self.ttl_seconds > 0
+        if cacheable:
+            cached = self._get_cached(key)
+            if cached is not None:
+                return cached[1]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await tool.arun(tool_input)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if cacheable:
+                self._set_cached(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._tool_result_cache.clear()
+
+
+class DedupTool(BaseTool):
+    """Wraps a registry tool so its calls go through a shared ToolCallDeduplicator."""
+
+    inner: BaseTool
+    dedup: Any
+
+    def __init__(self, inner: BaseTool, dedup: ToolCallDeduplicator):
+        super().__init__(name=inner.name, description=inner.description, inner=inner, dedup=dedup)
+
+    async def _arun(self, query: str) -> str:
+        return await self.dedup.run(self.inner, query)
+
 # Tool Implementations
 
 class CalculatorTool(BaseTool):
@@ -1,7 +1,8 @@
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from elasticsearch import Elasticsearch
 from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import streaming_bulk
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,8 @@ class ElasticBM25Service:
             self.client = Elasticsearch(es_host)
 
         self.index_name = os.getenv("ELASTIC_INDEX", "documents")
+        self.bulk_chunk_size = int(os.getenv("ELASTIC_BULK_CHUNK_SIZE", "500"))
+        self.bulk_max_chunk_bytes = int(os.getenv("ELASTIC_BULK_MAX_CHUNK_BYTES", str(10 * 1024 * 1024)))
 
     def ensure_index(self) -> None:
         if self.client.indices.exists(index=self.index_name):
@@ -51,27 +54,42 @@ class ElasticBM25Service:
 
     def add_documents_batch(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
         self.ensure_index()
+        actions = (
+            {
+                "_index": self.index_name,
+                "_source": {"text": text, "metadata": (metadatas[idx] if metadatas and idx < len(metadatas) else {})},
+            }
+            for idx, text in enumerate(texts)
+        )
+        # One _bulk request per chunk instead of one index request per document;
+        # results come back in input order
         ids: List[str] = []
-        for idx, text in enumerate(texts):
-            md = (metadatas[idx] if metadatas and idx < len(metadatas) else {})
-            body = {"text": text, "metadata": md}
-            result = self.client.index(index=self.index_name, document=body, refresh=(idx == len(texts) - 1))
-            ids.append(result.get("_id"))
+        for ok, item in streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=self.bulk_chunk_size,
+            max_chunk_bytes=self.bulk_max_chunk_bytes,
+        ):
+            ids.append(item.get("index", {}).get("_id"))
+        if ids:
+            self.client.indices.refresh(index=self.index_name)
         return ids
 
-    def search(self, query: str, top_k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        self.ensure_index()
+    @staticmethod
+    def _build_query(query: str, filter_metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         must_clauses: List[Dict[str, Any]] = [{"match": {"text": query}}]
         if filter_metadata:
             for key, value in filter_metadata.items():
                 must_clauses.append({"term": {f"metadata.{key}": value}})
 
-        query_body = {
+        return {
             "bool": {
                 "must": must_clauses
             }
         }
-        response = self.client.search(index=self.index_name, query=query_body, size=top_k)
+
+    @staticmethod
+    def _format_hits(response: Dict[str, Any]) -> List[Dict[str, Any]]:
         hits = response.get("hits", {}).get("hits", [])
         results: List[Dict[str, Any]] = []
         for h in hits:
@@ -84,6 +102,29 @@ class ElasticBM25Service:
             })
         return results
 
+    def search(self, query: str, top_k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self.ensure_index()
+        response = self.client.search(index=self.index_name, query=self._build_query(query, filter_metadata), size=top_k)
+        return self._format_hits(response)
+
+    def search_batch(self, queries: List[Tuple[str, int, Optional[Dict[str, Any]]]]) -> List[List[Dict[str, Any]]]:
+        """Run several (query, top_k, filter_metadata) searches in one _msearch request."""
+        if not queries:
+            return []
+        self.ensure_index()
+        searches: List[Dict[str, Any]] = []
+        for query, top_k, filter_metadata in queries:
+            searches.append({"index": self.index_name})
+            searches.append({"query": self._build_query(query, filter_metadata), "size": top_k})
+        response = self.client.msearch(searches=searches)
+
+        results: List[List[Dict[str, Any]]] = []
+        for item in response.get("responses", []):
+            if "error" in item:
+                raise Exception(f"Elasticsearch msearch failed: {item['error']}")
+            results.append(self._format_hits(item))
+        return results
+
     def delete(self, doc_id: str) -> bool:
         try:
             self.client.delete(index=self.index_name, id=doc_id, refresh=True)
@@ -1,16 +1,41 @@
 from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import math
 import os
+import numpy as np
 from cache.redis_cache import make_cache_key, cache_get_json, cache_set_json
+from vector_db.score_fusion_aot import fuse_scores_py
 
+# AOT-compiled fusion kernel (built by vector_db/score_fusion_aot.py); optional
+try:
+    from vector_db.score_fusion import fuse_scores  # type: ignore
+except Exception:  # pragma: no cover
+    fuse_scores = fuse_scores_py
 
-def _min_max_normalize(scores: List[float]) -> List[float]:
-    if not scores:
-        return []
-    min_s, max_s = min(scores), max(scores)
+# Semantic weight used when a caller does not pass one; set it from
+# scripts/calibrate_hybrid_alpha.py rather than tuning per request
+DEFAULT_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.6"))
+
+
+def alpha_from_scores(bm25_score: float, semantic_score: float) -> float:
+    """
+    Convex-combination weight from each retriever's standalone quality
+    (e.g. mean MRR or recall@k on a validation set): alpha = sem / (bm25 + sem).
+    """
+    total = bm25_score + semantic_score
+    if total <= 0:
+        return 0.5
+    return semantic_score / total
+
+
+def _min_max_normalize(scores: List[float]) -> np.ndarray:
+    arr = np.asarray(scores, dtype=np.float64)
+    if arr.size == 0:
+        return arr
+    min_s, max_s = arr.min(), arr.max()
     if math.isclose(min_s, max_s):
-        return [1.0 for _ in scores]
-    return [(s - min_s) / (max_s - min_s) for s in scores]
+        return np.ones_like(arr)
+    return (arr - min_s) / (max_s - min_s)
 
 
 class HybridRetriever:
@@ -18,7 +43,7 @@ class HybridRetriever:
     Combines BM25 (ElasticSearch) results with semantic vector results (Qdrant) and merges them.
     """
 
-    def __init__(self, bm25_service, vector_service, alpha: float = 0.5):
+    def __init__(self, bm25_service, vector_service, alpha: float = DEFAULT_ALPHA):
         """
         Args:
             bm25_service: Instance providing `search(query, top_k, filter_metadata)`
@@ -29,10 +54,26 @@ class HybridRetriever:
         self.vector_service = vector_service
         self.alpha = alpha
 
-    async def search(self, query: str, top_k: int = 10, filter_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    async def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        alpha: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            filter_metadata: Optional exact-match metadata filters
+            alpha: Per-call override of the semantic weight; defaults to `self.alpha`
+        """
+        # Quantize so near-identical weights share one cache entry
+        alpha = round(self.alpha if alpha is None else alpha, 2)
+
         # Cache lookup (optional)
         if os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}:
-            cache_key = make_cache_key("search:hybrid", {"q": query, "k": top_k, "a": self.alpha, "f": filter_metadata or {}})
+            cache_key = make_cache_key("search:hybrid", {"q": query, "k": top_k, "a": alpha, "f": filter_metadata or {}})
             cached = await cache_get_json(cache_key)
             if cached is not None:
                 return cached
@@ -41,6 +82,22 @@ class HybridRetriever:
         bm25_results = self.bm25_service.search(query, top_k=top_k, filter_metadata=filter_metadata)
         vector_results = await self.vector_service.search(query, top_k=top_k, filter_metadata=filter_metadata)
 
+        ranked = self._fuse(bm25_results, vector_results, top_k, alpha)
+
+        if os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}:
+            try:
+                await cache_set_json(cache_key, ranked)
+            except Exception:
+                pass
+        return ranked
+
+    @staticmethod
+    def _fuse(
+        bm25_results: List[Dict[str, Any]],
+        vector_results: List[Dict[str, Any]],
+        top_k: int,
+        alpha: float,
+    ) -> List[Dict[str, Any]]:
         # Normalize scores to 0..1
         bm25_scores = _min_max_normalize([r.get("score", 0.0) for r in bm25_results])
         vector_scores = _min_max_normalize([r.get("score", 0.0) for r in vector_results])
@@ -51,58 +108,88 @@ class HybridRetriever:
                 return str(r["id"])  # ES ids are string, Qdrant ids may be int/uuid
             return str(hash(r.get("document", "")))
 
-        bm25_map = {make_key(r): (r, bm25_scores[i]) for i, r in enumerate(bm25_results)}
-        vector_map = {make_key(r): (r, vector_scores[i]) for i, r in enumerate(vector_results)}
-
-        merged: Dict[str, Dict[str, Any]] = {}
-        for key, (item, norm_score) in bm25_map.items():
-            merged[key] = {
-                "id": item.get("id"),
-                "document": item.get("document"),
-                "metadata": item.get("metadata", {}),
-                "bm25": norm_score,
-                "semantic": 0.0,
-            }
-
-        for key, (item, norm_score) in vector_map.items():
-            if key in merged:
-                merged[key]["semantic"] = max(merged[key]["semantic"], norm_score)
+        # Row of each key in its result list (last occurrence wins)
+        bm25_rows = {make_key(r): i for i, r in enumerate(bm25_results)}
+        vector_rows = {make_key(r): i for i, r in enumerate(vector_results)}
+
+        # Candidate set: BM25 hits first, then semantic-only hits
+        items: List[Dict[str, Any]] = []
+        position: Dict[str, int] = {}
+        for key, row in bm25_rows.items():
+            item = bm25_results[row]
+            position[key] = len(items)
+            items.append({"id": item.get("id"), "document": item.get("document"), "metadata": item.get("metadata", {})})
+        for key, row in vector_rows.items():
+            item = vector_results[row]
+            if key in position:
                 # Prefer richer metadata or text if present
+                merged = items[position[key]]
                 if item.get("metadata"):
-                    merged[key]["metadata"] = item.get("metadata")
-                if item.get("document") and len(item.get("document", "")) > len(merged[key]["document"] or ""):
-                    merged[key]["document"] = item.get("document")
+                    merged["metadata"] = item.get("metadata")
+                if item.get("document") and len(item.get("document", "")) > len(merged["document"] or ""):
+                    merged["document"] = item.get("document")
             else:
-                merged[key] = {
-                    "id": item.get("id"),
-                    "document": item.get("document"),
-                    "metadata": item.get("metadata", {}),
-                    "bm25": 0.0,
-                    "semantic": norm_score,
-                }
-
-        # Compute final score and rank
-        results: List[Tuple[str, Dict[str, Any]]] = []
-        for key, item in merged.items():
-            final_score = self.alpha * item["semantic"] + (1.0 - self.alpha) * item["bm25"]
-            out = {
+                position[key] = len(items)
+                items.append({"id": item.get("id"), "document": item.get("document"), "metadata": item.get("metadata", {})})
+
+        # Scatter normalized scores into candidate-aligned arrays and fuse
+        n = len(items)
+        bm25 = np.zeros(n, dtype=np.float64)
+        semantic = np.zeros(n, dtype=np.float64)
+        bm25[:len(bm25_rows)] = bm25_scores[np.fromiter(bm25_rows.values(), dtype=np.intp, count=len(bm25_rows))]
+        semantic[np.fromiter((position[k] for k in vector_rows), dtype=np.intp, count=len(vector_rows))] = \
+            vector_scores[np.fromiter(vector_rows.values(), dtype=np.intp, count=len(vector_rows))]
+        final_scores = fuse_scores(semantic, bm25, float(alpha))
+
+        # Top-k selection in O(n), then sort only the selected candidates
+        if 0 < top_k < n:
+            top = np.argpartition(-final_scores, top_k - 1)[:top_k]
+            order = top[np.argsort(-final_scores[top], kind="stable")]
+        else:
+            order = np.argsort(-final_scores, kind="stable")[:top_k]
+
+        ranked = []
+        for i in order:
+            item = items[i]
+            ranked.append({
                 "id": item.get("id"),
                 "document": item.get("document"),
                 "metadata": item.get("metadata", {}),
-                "bm25_score": item["bm25"],
-                "semantic_score": item["semantic"],
-                "score": final_score,
-            }
-            results.append((key, out))
-
-        results.sort(key=lambda kv: kv[1]["score"], reverse=True)
-        ranked = [r for _, r in results[:top_k]]
-
-        if os.getenv("REDIS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}:
-            try:
-                await cache_set_json(cache_key, ranked)
-            except Exception:
-                pass
+                "bm25_score": float(bm25[i]),
+                "semantic_score": float(semantic[i]),
+                "score": float(final_scores[i]),
+            })
         return ranked
 
+    async def search_batch(
+        self,
+        queries: List[Tuple[str, int, Optional[Dict[str, Any]]]],
+        alpha: Optional[float] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Hybrid search for several (query, top_k, filter_metadata) tuples at once.
 
+        Each side goes to its backend as one batched call when the service
+        provides `search_batch` (Qdrant query_batch_points, Elasticsearch _msearch).
+        """
+        alpha = round(self.alpha if alpha is None else alpha, 2)
+        if hasattr(self.vector_service, "search_batch"):
+            vector_batches = await self.vector_service.search_batch(queries)
+        else:
+            vector_batches = await asyncio.gather(*[
+                self.vector_service.search(query, top_k=top_k, filter_metadata=filt)
+                for query, top_k, filt in queries
+            ])
+
+        if hasattr(self.bm25_service, "search_batch"):
+            bm25_batches = self.bm25_service.search_batch(queries)
+        else:
+            bm25_batches = [
+                self.bm25_service.search(query, top_k=top_k, filter_metadata=filt)
+                for query, top_k, filt in queries
+            ]
+
+        return [
+            self._fuse(bm25_results, vector_results, top_k, alpha)
+            for (_, top_k, _), bm25_results, vector_results in zip(queries, bm25_batches, vector_batches)
+        ]
@@ -0,0 +1,45 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+
+class IngestRequest(BaseModel):
+    texts: List[str]
+    metadata_list: Optional[List[dict]] = None
+
+
+# Bodies at least this large are validated in a worker process instead of on the event loop
+INGEST_POOL_MIN_BYTES = int(os.getenv("INGEST_VALIDATION_POOL_MIN_BYTES", str(1024 * 1024)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def validate_ingest_body(body: bytes) -> Tuple[Optional[IngestRequest], Optional[List[Any]]]:
+    """
+    Parse and validate a raw /ingest body.
+
+    Returns (request, None) on success or (None, errors) with JSON-safe error
+    details, so the result can cross a process boundary.
+    """
+    try:
+        return IngestRequest.model_validate_json(body), None
+    except ValidationError as e:
+        return None, json.loads(e.json())
+
+
+def get_validation_pool() -> ProcessPoolExecutor:
+    """Get or create the process pool used for large ingest bodies."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=int(os.getenv("INGEST_VALIDATION_WORKERS", str(os.cpu_count() or 1))))
+    return _pool
+
+
+def shutdown_validation_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -1,8 +1,9 @@
 import os
 import uuid
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue, QueryRequest
 import numpy as np
 import logging
 
@@ -52,6 +53,13 @@ class QdrantVectorService:
         )
         self._collection_ready = True
 
+    async def warmup(self) -> None:
+        """Open the connection to Qdrant ahead of the first request."""
+        try:
+            await asyncio.to_thread(self.client.get_collections)
+        except Exception as e:
+            logger.warning(f"Qdrant warmup failed: {str(e)}")
+
     async def add_document(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         if not self.embedding_service:
             raise Exception("Embedding service not initialized")
@@ -94,6 +102,27 @@ class QdrantVectorService:
         self.client.upsert(collection_name=self.collection_name, points=points)
         return ids
 
+    @staticmethod
+    def _build_filter(filter_metadata: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        if not filter_metadata:
+            return None
+        conditions = [FieldCondition(key=key, match=MatchValue(value=value)) for key, value in filter_metadata.items()]
+        return Filter(must=conditions)
+
+    @staticmethod
+    def _format_points(points) -> List[Dict[str, Any]]:
+        formatted: List[Dict[str, Any]] = []
+        for r in points:
+            payload = (r.payload or {}).copy()
+            text = payload.pop("text", "")
+            formatted.append({
+                "id": str(r.id),
+                "document": text,
+                "metadata": payload,
+                "score": float(r.score),
+            })
+        return formatted
+
     async def search(self, query: str, top_k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         if not self.embedding_service:
             raise Exception("Embedding service not initialized")
@@ -101,35 +130,43 @@ class QdrantVectorService:
 
         query_embedding = await self.embedding_service.generate_embedding(query)
 
-        qdrant_filter = None
-        if filter_metadata:
-            conditions = []
-            for key, value in filter_metadata.items():
-                conditions.append(FieldCondition(key=key, match=MatchValue(value=value)))
-            if conditions:
-                qdrant_filter = Filter(must=conditions)
-
         results = self.client.search(
             collection_name=self.collection_name,
             query_vector=np.asarray(query_embedding, dtype=np.float32).tolist(),
             limit=top_k,
-            query_filter=qdrant_filter,
+            query_filter=self._build_filter(filter_metadata),
             with_payload=True,
         )
+        return self._format_points(results)
 
-        formatted: List[Dict[str, Any]] = []
-        for r in results:
-            payload = (r.payload or {}).copy()
-            text = payload.pop("text", "")
-            formatted.append({
-                "id": str(r.id),
-                "document": text,
-                "metadata": payload,
-                "score": float(r.score),
-            })
-        return formatted
-
-
+    async def search_batch(self, queries: List[Tuple[str, int, Optional[Dict[str, Any]]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches in one Qdrant round trip.
 
+        Args:
+            queries: (query, top_k, filter_metadata) tuples
 
+        Returns:
+            One result list per query, in input order
+        """
+        if not self.embedding_service:
+            raise Exception("Embedding service not initialized")
+        if not queries:
+            return []
+        await self._ensure_collection()
 
+        # Embed each distinct query text once (e.g. one query searched under several filters)
+        texts = list(dict.fromkeys(q for q, _, _ in queries))
+        embeddings = await self.embedding_service.generate_batch_embeddings(texts)
+        vectors = {text: np.asarray(embeddings[idx], dtype=np.float32).tolist() for idx, text in enumerate(texts)}
+        requests = [
+            QueryRequest(
+                query=vectors[query],
+                filter=self._build_filter(filter_metadata),
+                limit=top_k,
+                with_payload=True,
+            )
+            for query, top_k, filter_metadata in queries
+        ]
+        responses = self.client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        return [self._format_points(response.points) for response in responses]
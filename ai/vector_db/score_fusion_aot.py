@@ -0,0 +1,40 @@
+"""
+Ahead-of-time compiled score fusion kernel for HybridRetriever.
+
+Build the extension module next to this file with:
+
+    python vector_db/score_fusion_aot.py
+
+This produces `vector_db/score_fusion*.so`, which HybridRetriever imports
+when present. Without it, the retriever falls back to the NumPy expression
+in `fuse_scores_py`, which computes the same result.
+"""
+import os
+
+import numpy as np
+
+
+def fuse_scores_py(semantic: np.ndarray, bm25: np.ndarray, alpha: float) -> np.ndarray:
+    """Final = alpha*semantic + (1-alpha)*bm25, element-wise."""
+    return alpha * semantic + (1.0 - alpha) * bm25
+
+
+def _build() -> None:
+    from numba.pycc import CC
+
+    cc = CC("score_fusion")
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+    @cc.export("fuse_scores", "f8[:](f8[:], f8[:], f8)")
+    def fuse_scores(semantic, bm25, alpha):
+        out = np.empty_like(semantic)
+        beta = 1.0 - alpha
+        for i in range(semantic.shape[0]):
+            out[i] = alpha * semantic[i] + beta * bm25[i]
+        return out
+
+    cc.compile()
+
+
+if __name__ == "__main__":
+    _build()